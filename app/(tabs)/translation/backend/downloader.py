@@ -0,0 +1,85 @@
+# //Soul/app/(tabs)/translation/backend/downloader.py
+# (v9 - 共用 async HTTP client: keep-alive + 連線池 + 串流下載影片)
+
+import os
+from collections import namedtuple
+import httpx
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", 30))
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", 100 * 1024 * 1024))  # 100 MB
+DOWNLOAD_MAX_CONNECTIONS = int(os.getenv("DOWNLOAD_MAX_CONNECTIONS", 20))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+http_client = None
+
+# 下載結果: 位元組數 + 快取驗證標頭 (供 url_cache 條件式重新驗證)
+DownloadInfo = namedtuple("DownloadInfo", ["size", "etag", "last_modified"])
+
+
+class DownloadError(Exception):
+    """下載失敗 (非 200、超過大小上限或連線錯誤)"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# ----------------------------------------------------
+# 2. 生命週期 (FastAPI startup / shutdown)
+# ----------------------------------------------------
+def open_http_client():
+    """建立跨請求共用的 AsyncClient"""
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(DOWNLOAD_TIMEOUT),
+            limits=httpx.Limits(max_connections=DOWNLOAD_MAX_CONNECTIONS,
+                                max_keepalive_connections=DOWNLOAD_MAX_CONNECTIONS),
+            follow_redirects=True,
+        )
+    return http_client
+
+
+async def close_http_client():
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+
+# ----------------------------------------------------
+# 3. 串流下載
+# ----------------------------------------------------
+async def download_to_file(url: str, file_path: str, max_bytes: int = DOWNLOAD_MAX_BYTES) -> DownloadInfo:
+    """
+    以 chunk 串流寫入 file_path，記憶體用量與影片大小無關。
+    回傳 DownloadInfo (寫入的位元組數 + ETag / Last-Modified)；失敗時拋出 DownloadError (並刪除不完整的檔案)。
+    """
+    client = open_http_client()
+    written = 0
+    try:
+        async with client.stream("GET", url) as r:
+            if r.status_code != 200:
+                raise DownloadError(f"下載影片失敗，狀態碼: {r.status_code}")
+
+            content_length = r.headers.get("Content-Length")
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                raise DownloadError(f"影片過大 ({content_length} bytes > {max_bytes})", status_code=413)
+
+            with open(file_path, "wb") as f:
+                async for chunk in r.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise DownloadError(f"影片過大 (> {max_bytes} bytes)", status_code=413)
+                    f.write(chunk)
+            validators = (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+    except httpx.HTTPError as e:
+        if os.path.exists(file_path): os.remove(file_path)
+        raise DownloadError(f"下載影片失敗: {e}")
+    except DownloadError:
+        if os.path.exists(file_path): os.remove(file_path)
+        raise
+    return DownloadInfo(written, *validators)
@@ -0,0 +1,163 @@
+# //Soul/app/(tabs)/translation/backend/feature_cache.py
+# (v9 - 以影片內容雜湊為鍵的特徵 / Top-3 磁碟快取: LRU (mtime) + 容量上限 + 命中統計)
+
+import os
+import json
+import hashlib
+import threading
+import uuid
+
+import numpy as np
+
+from feature_loader import FEATURE_PIPELINE_VERSION, POSE_DIMENSION
+from video_source import CAPTURE_DECODE, SAMPLER_VERSION
+from similarity import SSIM_BACKEND
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+FEATURE_CACHE = os.getenv("FEATURE_CACHE", "on")                     # on | off
+FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", os.path.join(os.path.dirname(__file__), "feature_cache"))
+FEATURE_CACHE_MAX_BYTES = int(os.getenv("FEATURE_CACHE_MAX_BYTES", 512 * 1024 * 1024))  # 512 MB
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """檔案內容的 sha256 (分塊讀取)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pipeline_id(source="capture"):
+    """
+    特徵管線識別字串: 版本 + 取樣規則 + 影格來源 + 取樣解碼模式 + SSIM 後端。
+    任何會改變 (T, 636) 特徵的設定都必須反映在這裡，否則會讀到舊管線的快取。
+    """
+    decode = CAPTURE_DECODE if source == "capture" else "-"
+    sampler = SAMPLER_VERSION if source == "capture" else "-"
+    return f"{FEATURE_PIPELINE_VERSION}/{sampler}/{source}/{decode}/{SSIM_BACKEND}"
+
+
+def _key(*parts):
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+# ----------------------------------------------------
+# 2. 磁碟快取
+# ----------------------------------------------------
+class FeatureCache:
+    """
+    features/<key>.npz: (T, 636) float32 特徵 + (T,) 取樣序號 (鍵 = 內容雜湊 + 管線)；全被過濾的影片存 (0, 636)
+    results/<key>.json: Top-3 結果 (鍵 = 內容雜湊 + 管線 + 模型雜湊)
+    命中時更新 mtime，超過 max_bytes 時從 mtime 最舊的檔案開始刪除 (LRU)。
+    寫入先寫暫存檔再 os.replace，多個 uvicorn worker 共用目錄也不會讀到半個檔案。
+    """
+
+    def __init__(self, directory=FEATURE_CACHE_DIR, max_bytes=FEATURE_CACHE_MAX_BYTES, enabled=FEATURE_CACHE == "on"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.counters = {"feature_hits": 0, "feature_misses": 0, "result_hits": 0, "result_misses": 0, "evictions": 0}
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, kind, key + (".npz" if kind == "features" else ".json"))
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _write(self, path, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+        self.evict()
+
+    # --- 特徵 ---
+    def get_features(self, content_hash, pipeline):
+        """回傳 (命中與否, 特徵或 None, 取樣序號或 None)"""
+        if not self.enabled: return False, None, None
+        path = self._path("features", _key(content_hash, pipeline))
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                features, indices = data["features"], data["indices"]
+        except (OSError, ValueError, KeyError):
+            self._count("feature_misses")
+            return False, None, None
+        self._touch(path)
+        self._count("feature_hits")
+        if features.shape[0] == 0: return True, None, None
+        return True, features, indices
+
+    def put_features(self, content_hash, pipeline, features, indices):
+        if not self.enabled: return
+        if features is None:
+            features, indices = np.zeros((0, POSE_DIMENSION), dtype=np.float32), np.zeros(0, dtype=np.int32)
+        arrays = dict(features=np.asarray(features, dtype=np.float32), indices=np.asarray(indices, dtype=np.int32))
+        self._write(self._path("features", _key(content_hash, pipeline)), lambda f: np.savez(f, **arrays))
+
+    # --- Top-3 結果 ---
+    def get_result(self, content_hash, pipeline, model_hash):
+        if not self.enabled or model_hash is None: return None
+        path = self._path("results", _key(content_hash, pipeline, model_hash))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self._count("result_misses")
+            return None
+        self._touch(path)
+        self._count("result_hits")
+        return result
+
+    def put_result(self, content_hash, pipeline, model_hash, top3):
+        if not self.enabled or model_hash is None: return
+        data = json.dumps(top3, ensure_ascii=False).encode("utf-8")
+        self._write(self._path("results", _key(content_hash, pipeline, model_hash)), lambda f: f.write(data))
+
+    # --- LRU 淘汰 ---
+    def evict(self):
+        entries, total = [], 0
+        for sub in ("features", "results"):
+            sub_dir = os.path.join(self.directory, sub)
+            if not os.path.isdir(sub_dir): continue
+            with os.scandir(sub_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".tmp"): continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_bytes: return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self._count("evictions")
+            if total <= self.max_bytes: break
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters["enabled"] = self.enabled
+        return counters
+
+
+feature_cache = FeatureCache()
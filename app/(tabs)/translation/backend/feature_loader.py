@@ -3,20 +3,23 @@
 
 import cv2
 import numpy as np
-import mediapipe as mp
-# 導入 Keras (適用於 TF 2.16+)
-import keras 
-from keras.preprocessing.sequence import pad_sequences
+# 💥 不在模組層級導入 mediapipe / keras: 兩者會連帶導入 TensorFlow (數秒)，
+# Holistic 由 holistic_pool 延遲建立，padding 改用 NumPy (pad_feature_batch)
 import math
 import os
-from skimage.metrics import structural_similarity as ssim # 💥 恢復 v9 的 ssim
+from time import perf_counter
+# 💥 v9 的 SSIM 重複影格過濾改由可替換的相似度後端計算 (SSIM_BACKEND，scikit-image 僅在 skimage 後端時導入)
+from similarity import get_similarity_backend, SSIM_BACKEND
+# 💥 預先建立的 Holistic 實例池 (取代每次請求重建計算圖)
+from holistic_pool import holistic_pool
+import metrics
+
+# 💥 影格來源與 10 Hz 時間戳取樣 (TARGET_FPS / SAMPLE_RATE 一併供外部導入)
+from video_source import iter_sampled_frames, CAPTURE_DECODE, TARGET_FPS, SAMPLE_RATE
 
 # ----------------------------------------------------
 # 1. 全局常數 (v9 版本)
 # ----------------------------------------------------
-mp_holistic = mp.solutions.holistic
-mp_hands = mp.solutions.hands
-
 # --- 1A. 索引 ---
 MOUTH_IDX = list(range(61, 89)) + list(range(308, 325))
 LEFT_EYE_IDX = list(range(33, 42)) + list(range(133, 144))
@@ -36,6 +39,8 @@ POSE_DIMENSION = 636            # (426 + 210)
 
 # 💥 關鍵: v9 訓練時的長度
 MAX_SEQ_LENGTH = 40 
+# 💥 特徵管線版本 (特徵快取鍵的一部分)；提取或過濾邏輯改變時必須遞增
+FEATURE_PIPELINE_VERSION = "v9-f.1"
 HAND_DIM = HAND_SPATIAL_DIM
 FACE_KEYPOINT_DIM = FACE_SPATIAL_DIM
 IMAGE_WIDTH = 320
@@ -50,55 +55,72 @@ CLASS_NAMES = [
 int_to_label = {i: label for i, label in enumerate(CLASS_NAMES)}
 label_to_int = {label: i for i, label in enumerate(CLASS_NAMES)}
 
+# --- 1D. 預先配置的空間特徵緩衝區列位置 (142 x 3 = 426) ---
+HAND_ROWS = 21
+FACE_ROWS = len(FACE_IDX)
+POSE_ROWS = len(POSE_IDX)
+LH_ROWS = slice(0, HAND_ROWS)
+RH_ROWS = slice(HAND_ROWS, HAND_ROWS * 2)
+FACE_ROWS_SLICE = slice(HAND_ROWS * 2, HAND_ROWS * 2 + FACE_ROWS)
+POSE_ROWS_SLICE = slice(HAND_ROWS * 2 + FACE_ROWS, HAND_ROWS * 2 + FACE_ROWS + POSE_ROWS)
+SPATIAL_ROWS = HAND_ROWS * 2 + FACE_ROWS + POSE_ROWS
+
 # ----------------------------------------------------
-# 2. 提取子函數 (v9 邏輯 - 保持不變)
+# 2. 提取子函數 (v9 邏輯 - 數值保持不變，改以 NumPy 陣列實作)
 # ----------------------------------------------------
+def landmarks_to_array(landmarks, indices=None, out=None):
+    """
+    MediaPipe landmark 列表 → (N, 3) float32 陣列 (x, y, z)。
+    indices: 只取指定索引 (FACE_IDX / POSE_IDX)；out: 寫入預先配置的緩衝區。
+    protobuf 的座標本身即為 float32，轉換不損失精度。
+    """
+    points = landmarks.landmark
+    if indices is not None:
+        points = [points[i] for i in indices]
+    count = len(points)
+    coords = np.fromiter((v for lm in points for v in (lm.x, lm.y, lm.z)), dtype=np.float32, count=count * 3)
+    if out is None:
+        return coords.reshape(count, 3)
+    out[:] = coords.reshape(count, 3)
+    return out
+
 def get_hand_points_list(landmarks):
-    if landmarks is None: return [(0.0, 0.0, 0.0)] * 21
-    points = [(lm.x, lm.y, lm.z) for lm in landmarks.landmark]
-    return points
+    """(21, 3) float32 手部座標；未偵測時為全 0"""
+    if landmarks is None: return np.zeros((HAND_ROWS, 3), dtype=np.float32)
+    return landmarks_to_array(landmarks)
 
 def calculate_mp_displacement_features(current_hand_pts, prev_hand_pts):
-    dx_dy_dz = []
-    for i in range(21):
-        prev_x, prev_y, prev_z = prev_hand_pts[i]
-        curr_x, curr_y, curr_z = current_hand_pts[i]
-        dx = curr_x - prev_x; dy = curr_y - prev_y; dz = curr_z - prev_z 
-        dx_dy_dz.extend([dx, dy, dz]) 
-    return np.array(dx_dy_dz)
+    """(63,) 3D 位移 [dx, dy, dz] x 21；以 float64 相減，與舊版逐點 Python 浮點運算結果一致"""
+    return (np.asarray(current_hand_pts, dtype=np.float64) - np.asarray(prev_hand_pts, dtype=np.float64)).reshape(-1)
+
+def hand_points_to_pixels(hand_pts, width, height):
+    """正規化座標 → 像素座標 (int 截斷，同舊版 int(x * w))，供 LK 光流使用: (21, 1, 2) float32"""
+    xy = np.trunc(np.asarray(hand_pts, dtype=np.float64)[:, :2] * (width, height))
+    return xy.astype(np.float32).reshape(-1, 1, 2)
 
 def extract_pose_landmarks(results):
-    keypoints = []
-    current_hand_pts_L, current_hand_pts_R = [(0.0, 0.0, 0.0)] * 21, [(0.0, 0.0, 0.0)] * 21
-    for landmarks, hand_type in [(results.left_hand_landmarks, 'L'), (results.right_hand_landmarks, 'R')]:
-        if landmarks:
-            pts = [item for lm in landmarks.landmark for item in (lm.x, lm.y, lm.z)]
-            hand_pts_list = [(lm.x, lm.y, lm.z) for lm in landmarks.landmark]
-            keypoints.extend(pts)
-            if hand_type == 'L': current_hand_pts_L = hand_pts_list
-            else: current_hand_pts_R = hand_pts_list
-        else:
-            keypoints.extend([0.0] * HAND_DIM) 
-            current_hand_pts_L = [(0.0, 0.0, 0.0)] * 21 if hand_type == 'L' else current_hand_pts_L
-            current_hand_pts_R = [(0.0, 0.0, 0.0)] * 21 if hand_type == 'R' else current_hand_pts_R
+    """
+    回傳 (426 維 float64 空間座標, 左手 (21, 3), 右手 (21, 3))。
+    所有關鍵點寫入同一個預先配置的 (142, 3) float32 緩衝區，臉部/姿態以 FACE_IDX / POSE_IDX 挑選。
+    """
+    spatial = np.zeros((SPATIAL_ROWS, 3), dtype=np.float32)
+    if results.left_hand_landmarks:
+        landmarks_to_array(results.left_hand_landmarks, out=spatial[LH_ROWS])
+    if results.right_hand_landmarks:
+        landmarks_to_array(results.right_hand_landmarks, out=spatial[RH_ROWS])
     if results.face_landmarks:
-        face_points = [item for i in FACE_IDX for item in (results.face_landmarks.landmark[i].x, results.face_landmarks.landmark[i].y, results.face_landmarks.landmark[i].z)]
-        keypoints.extend(face_points)
-    else: keypoints.extend([0.0] * FACE_KEYPOINT_DIM)
+        landmarks_to_array(results.face_landmarks, FACE_IDX, out=spatial[FACE_ROWS_SLICE])
     if results.pose_landmarks:
-        pose_points = [item for i in POSE_IDX for item in (results.pose_landmarks.landmark[i].x, results.pose_landmarks.landmark[i].y, results.pose_landmarks.landmark[i].z)]
-        keypoints.extend(pose_points)
-    else: keypoints.extend([0.0] * POSE_SPATIAL_DIM)
-    spatial_coords_raw = np.array(keypoints).flatten()
-    if spatial_coords_raw.size != TOTAL_SPATIAL_DIM:
-        return np.array([0.0] * TOTAL_SPATIAL_DIM), current_hand_pts_L, current_hand_pts_R
-    return spatial_coords_raw, current_hand_pts_L, current_hand_pts_R
+        landmarks_to_array(results.pose_landmarks, POSE_IDX, out=spatial[POSE_ROWS_SLICE])
+    current_hand_pts_L = spatial[LH_ROWS].copy()
+    current_hand_pts_R = spatial[RH_ROWS].copy()
+    return spatial.reshape(-1).astype(np.float64), current_hand_pts_L, current_hand_pts_R
 
 def normalize_landmarks(spatial_coords):
+    """身體中心化 + 肩寬縮放；整個 (142, 3) 陣列一次運算 (逐元素與舊版分段運算相同)"""
     if spatial_coords.size != TOTAL_SPATIAL_DIM: return spatial_coords 
-    lh_raw = spatial_coords[:HAND_DIM].reshape(21, 3); rh_raw = spatial_coords[HAND_DIM:HAND_DIM*2].reshape(21, 3)
-    face_raw = spatial_coords[HAND_DIM*2 : HAND_DIM*2 + FACE_KEYPOINT_DIM].reshape(len(FACE_IDX), 3)
-    pose_raw = spatial_coords[HAND_DIM*2 + FACE_KEYPOINT_DIM:].reshape(len(POSE_IDX), 3)
+    points = spatial_coords.reshape(SPATIAL_ROWS, 3)
+    lh_raw = points[LH_ROWS]; pose_raw = points[POSE_ROWS_SLICE]
     shoulder_left = pose_raw[1]; shoulder_right = pose_raw[2]; center_point = np.array([0.5, 0.5, 0.0])
     if np.all(shoulder_left != 0) and np.all(shoulder_right != 0): center_point = (shoulder_left + shoulder_right) / 2.0
     elif np.all(pose_raw[0] != 0): center_point = pose_raw[0]
@@ -107,133 +129,274 @@ def normalize_landmarks(spatial_coords):
     if np.all(shoulder_left != 0) and np.all(shoulder_right != 0):
         reference_dist = np.linalg.norm(shoulder_right - shoulder_left)
         if reference_dist > 1e-4: scale_factor = target_length / reference_dist
-    lh_norm = np.nan_to_num((lh_raw - center_point) * scale_factor); rh_norm = np.nan_to_num((rh_raw - center_point) * scale_factor)
-    face_norm = np.nan_to_num((face_raw - center_point) * scale_factor); pose_norm = np.nan_to_num((pose_raw - center_point) * scale_factor)
-    return np.concatenate([lh_norm.flatten(), rh_norm.flatten(), face_norm.flatten(), pose_norm.flatten()])
+    return np.nan_to_num((points - center_point) * scale_factor).reshape(-1)
 
 def draw_hand_skeleton(image, hand_landmarks):
     skeleton = np.zeros_like(image)
     if hand_landmarks is None: return skeleton
     h, w = image.shape[:2]
     points = [(int(lm.x * w), int(lm.y * h)) for lm in hand_landmarks.landmark]
-    if mp.solutions.hands:
-        for start_idx, end_idx in mp.solutions.hands.HAND_CONNECTIONS:
-            cv2.line(skeleton, points[start_idx], points[end_idx], (0, 0, 255), 1)
+    for start_idx, end_idx in HAND_CONNECTIONS:
+        cv2.line(skeleton, points[start_idx], points[end_idx], (0, 0, 255), 1)
     return skeleton
 
+# 💥 與 mp.solutions.hands.HAND_CONNECTIONS 相同 (手掌 + 五指)；寫死以免為了常數導入 mediapipe
+# (tools/profile_imports.py 會核對兩者一致)
+HAND_CONNECTIONS = frozenset([
+    (0, 1), (0, 5), (9, 13), (13, 17), (5, 9), (0, 17),
+    (1, 2), (2, 3), (3, 4),
+    (5, 6), (6, 7), (7, 8),
+    (9, 10), (10, 11), (11, 12),
+    (13, 14), (14, 15), (15, 16),
+    (17, 18), (18, 19), (19, 20),
+])
+# 💥 HAND_CONNECTIONS 轉為 (N, 2) 索引陣列，一次取出所有線段端點
+HAND_CONNECTION_IDX = np.array(sorted(HAND_CONNECTIONS), dtype=np.intp)
+
+class SkeletonCanvas:
+    """
+    單通道 uint8 手部骨架遮罩，跨影格重複使用。
+    取代「兩張全幅 BGR 畫布 + cv2.add + 取紅色通道」: 像素結果逐位元相同 (同樣的 1px LINE_8 線段)，
+    因此 min_skeleton_pixels 與 SSIM 的判斷完全不變。
+    """
+
+    def __init__(self, width=IMAGE_WIDTH, height=IMAGE_HEIGHT):
+        self.width = width
+        self.height = height
+        self.mask = np.zeros((height, width), dtype=np.uint8)
+
+    def render(self, *hands_pts):
+        """hands_pts: 每隻手 (21, 3) 正規化座標，未偵測的手傳 None；回傳共用的遮罩 (需保留時請 copy)"""
+        self.mask.fill(0)
+        for hand_pts in hands_pts:
+            if hand_pts is None: continue
+            points = np.trunc(np.asarray(hand_pts, dtype=np.float64)[:, :2] * (self.width, self.height)).astype(np.int32)
+            cv2.polylines(self.mask, points[HAND_CONNECTION_IDX], False, 255, 1)
+        return self.mask
+
 # ----------------------------------------------------
 # 3. 核心功能: 提取特徵序列 (💥 v9 原始訓練邏輯 💥)
 # ----------------------------------------------------
-def extract_feature_sequence(video_path):
+# 💥 v9 訓練參數
+MIN_SKELETON_PIXELS = 50
+SIMILARITY_THRESHOLD = 0.99
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+class SkeletonFilter:
     """
-    (v9 訓練邏輯: 固定採樣 + 像素過濾 + SSIM)
+    💥 [v9 關鍵] 圖像檢查 (Min Pixels + SSIM): keep(hands_pts) 決定該格特徵是否保留。
+    只依賴手部關鍵點與上一個保留格。
+    """
+
+    def __init__(self, similarity=SSIM_BACKEND, min_skeleton_pixels=MIN_SKELETON_PIXELS,
+                 similarity_threshold=SIMILARITY_THRESHOLD):
+        self.canvas = SkeletonCanvas() # 💥 單通道骨架遮罩，整支影片共用
+        self.backend = get_similarity_backend(similarity)
+        self.min_skeleton_pixels = min_skeleton_pixels
+        self.similarity_threshold = similarity_threshold
+        self.prev_skeleton = None # 💥 v9 獨有
+
+    def keep(self, hands_pts):
+        with metrics.stage("similarity"):
+            return self._keep(hands_pts)
+
+    def _keep(self, hands_pts):
+        red = self.canvas.render(*hands_pts)
+        if cv2.countNonZero(red) < self.min_skeleton_pixels:
+            metrics.count("frames_rejected_pixels")
+            return False
+
+        skeleton_state = self.backend.prepare(red, hands_pts)
+        if self.prev_skeleton is not None:
+            score = self.backend.score(self.prev_skeleton, skeleton_state)
+            if score >= self.similarity_threshold:
+                metrics.count("frames_rejected_similarity")
+                return False
+
+        self.prev_skeleton = skeleton_state
+        metrics.count("frames_kept")
+        return True
+
+# 💥 636 維特徵向量內的區段位置
+SPATIAL_SLICE = slice(0, TOTAL_SPATIAL_DIM)
+LK_SLICE = slice(TOTAL_SPATIAL_DIM, TOTAL_SPATIAL_DIM + LK_DISPLACEMENT_DIM)
+MP_SLICE = slice(TOTAL_SPATIAL_DIM + LK_DISPLACEMENT_DIM, POSE_DIMENSION)
+
+class FeatureExtractor:
+    """
+    v9 特徵管線的增量版本: 逐格 push() 已取樣 (10 Hz) 的 BGR 影格，
+    回傳通過像素/SSIM 過濾的 636 維特徵，被過濾時回傳 None。
+    跨影格狀態 (上一格灰階影像、上一格手部關鍵點、上一個保留骨架) 全部存在物件上，
+    縮放/RGB/灰階影像使用預先配置的緩衝區；檔案、ffmpeg 管線與 WebSocket 共用此實作。
+
+    holistic: 外部提供的 Holistic 實例；未提供時以 with 區塊從 pool (預設 holistic_pool) 借出。
+    """
+
+    def __init__(self, holistic=None, similarity=SSIM_BACKEND, width=IMAGE_WIDTH, height=IMAGE_HEIGHT, pool=None):
+        self.holistic = holistic
+        self.pool = holistic_pool if pool is None else pool
+        self.width = width
+        self.height = height
+        self.skeleton_filter = SkeletonFilter(similarity)
+        self._checkout = None
+
+        # 預先配置的影像緩衝區 (灰階兩張輪替: 本格 / 上一格)
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._prev_gray = np.empty((height, width), dtype=np.uint8)
+        self.reset(reset_holistic=False)
+
+    # --- Holistic 借用 (with FeatureExtractor() as extractor) ---
+    def __enter__(self):
+        if self.holistic is None:
+            self._checkout = self.pool.checkout()
+            self.holistic = self._checkout.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._checkout is not None:
+            checkout, self._checkout = self._checkout, None
+            self.holistic = None
+            return checkout.__exit__(*exc_info) # 歸還時由實例池 reset
+        return False
+
+    def reset(self, reset_holistic=True):
+        """開始新的影片/串流: 清除所有跨影格狀態 (含 Holistic 追蹤)"""
+        self.has_prev = False
+        self.prev_hand_pts_L = None
+        self.prev_hand_pts_R = None
+        self.skeleton_filter.prev_skeleton = None
+        if reset_holistic and self.holistic is not None:
+            self.holistic.reset()
+
+    def features(self, frame):
+        """
+        單格 v9 特徵 (不經過濾): 回傳 (636 維特徵, (左手, 右手))，未偵測的手為 None。
+        LK 光流與 MP 位移所需的上一格狀態在此更新 (不論該格之後是否被過濾)。
+        """
+        t0 = perf_counter()
+        if frame.shape[:2] == (self.height, self.width):
+            frame_resized = frame # (ffmpeg 管線已縮放)
+        else:
+            frame_resized = cv2.resize(frame, (self.width, self.height), dst=self._resized)
+        cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        t1 = perf_counter()
+        results = self.holistic.process(self._rgb)
+        t2 = perf_counter()
+        cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        # 1. 提取 426 維空間特徵
+        vector = np.zeros(POSE_DIMENSION, dtype=np.float64)
+        spatial_coords_raw, current_hand_pts_L, current_hand_pts_R = extract_pose_landmarks(results)
+        vector[SPATIAL_SLICE] = normalize_landmarks(spatial_coords_raw)
+        t3 = perf_counter()
+
+        # 2. 提取 210 維位移特徵 (第一格為 0)
+        if self.has_prev:
+            # (LK 2D 位移 - 84 維)
+            prev_pts_L_pix = hand_points_to_pixels(self.prev_hand_pts_L, self.width, self.height)
+            prev_pts_R_pix = hand_points_to_pixels(self.prev_hand_pts_R, self.width, self.height)
+            next_pts_L_pix, _, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, self._gray, prev_pts_L_pix, None, **LK_PARAMS)
+            next_pts_R_pix, _, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, self._gray, prev_pts_R_pix, None, **LK_PARAMS)
+            dx_L = (next_pts_L_pix[:, 0, 0] - prev_pts_L_pix[:, 0, 0]) / self.width
+            dy_L = (next_pts_L_pix[:, 0, 1] - prev_pts_L_pix[:, 0, 1]) / self.height
+            dx_R = (next_pts_R_pix[:, 0, 0] - prev_pts_R_pix[:, 0, 0]) / self.width
+            dy_R = (next_pts_R_pix[:, 0, 1] - prev_pts_R_pix[:, 0, 1]) / self.height
+            vector[LK_SLICE] = np.concatenate([dx_L, dy_L, dx_R, dy_R])
+
+            # (v9) RAW 3D MP 位移 (126 維)
+            vector[MP_SLICE] = np.concatenate([
+                calculate_mp_displacement_features(current_hand_pts_L, self.prev_hand_pts_L),
+                calculate_mp_displacement_features(current_hand_pts_R, self.prev_hand_pts_R),
+            ])
+
+        # 💥 各階段耗時 (請求 trace 內才累計)
+        t4 = perf_counter()
+        metrics.add_stage("preprocess", t1 - t0)
+        metrics.add_stage("holistic", t2 - t1)
+        metrics.add_stage("landmarks", t3 - t2)
+        metrics.add_stage("lk_flow", t4 - t3)
+
+        # 3. 更新跨影格狀態 (灰階緩衝區輪替，不複製整張影格)
+        self._gray, self._prev_gray = self._prev_gray, self._gray
+        self.prev_hand_pts_L = current_hand_pts_L
+        self.prev_hand_pts_R = current_hand_pts_R
+        self.has_prev = True
+
+        hands_pts = (
+            current_hand_pts_L if results.left_hand_landmarks is not None else None,
+            current_hand_pts_R if results.right_hand_landmarks is not None else None,
+        )
+        return vector, hands_pts
+
+    def push(self, frame):
+        """輸入一格取樣影格；通過 v9 過濾時回傳 636 維特徵，否則回傳 None"""
+        vector, hands_pts = self.features(frame)
+        return vector if self.skeleton_filter.keep(hands_pts) else None
+
+# ----------------------------------------------------
+# 4. 迭代器 / 整支影片的包裝
+# ----------------------------------------------------
+def iter_feature_vectors(sampled_frames, holistic, similarity=SSIM_BACKEND):
+    """逐格產生通過 v9 過濾的 636 維特徵"""
+    extractor = FeatureExtractor(holistic, similarity)
+    for frame in sampled_frames:
+        vector = extractor.push(frame)
+        if vector is not None:
+            yield vector
+
+def stack_pose_sequence(pose_seq, indices, with_indices=False):
+    """
+    with_indices: 一併回傳每個保留格的取樣序號 (T,) (第 i 個 10 Hz 取樣格 → i / 10 秒)，
+    供連續手語分段 (spotting) 換算時間軸。
     """
-    pose_seq = []
-    frame_idx = 0
-    prev_skeleton = None # 💥 v9 獨有
-    prev_frame = None
-    prev_hand_pts_L = None
-    prev_hand_pts_R = None
-    
-    lk_params = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
-    
-    # 💥 v9 訓練參數
-    ZERO_DISPLACEMENT_PAD = np.array([0.0] * TOTAL_DISPLACEMENT_DIM) 
-    min_skeleton_pixels = 50
-    sample_rate = 3
-    similarity_threshold = 0.99
-
-    if POSE_DIMENSION != 636: return None
-
-    with mp_holistic.Holistic(static_image_mode=False, model_complexity=1) as holistic:
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"錯誤: cv2.VideoCapture 無法開啟 {video_path}")
-            return None
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret: break
-
-            if frame_idx % sample_rate != 0:
-                frame_idx += 1
-                continue
-
-            frame_resized = cv2.resize(frame, (IMAGE_WIDTH, IMAGE_HEIGHT)) 
-            frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-            results = holistic.process(frame_rgb)
-            
-            # 1. 提取 426 維空間特徵
-            spatial_coords_raw, current_hand_pts_L, current_hand_pts_R = extract_pose_landmarks(results)
-            standardized_spatial_coords = normalize_landmarks(spatial_coords_raw)
-            
-            # 2. 提取 210 維位移特徵
-            displacement_features = ZERO_DISPLACEMENT_PAD 
-            if prev_hand_pts_L is not None and prev_hand_pts_R is not None:
-                if prev_frame is not None:
-                    prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-                    curr_gray = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)
-                    h_res, w_res = frame_resized.shape[:2]
-                    
-                    # (LK 2D 位移 - 84 維)
-                    prev_pts_L_pix = np.array([[int(x * w_res), int(y * h_res)] for x, y, z in prev_hand_pts_L], dtype=np.float32).reshape(-1, 1, 2)
-                    prev_pts_R_pix = np.array([[int(x * w_res), int(y * h_res)] for x, y, z in prev_hand_pts_R], dtype=np.float32).reshape(-1, 1, 2)
-                    next_pts_L_pix, _, _ = cv2.calcOpticalFlowPyrLK(prev_gray, curr_gray, prev_pts_L_pix, None, **lk_params)
-                    next_pts_R_pix, _, _ = cv2.calcOpticalFlowPyrLK(prev_gray, curr_gray, prev_pts_R_pix, None, **lk_params)
-                    dx_L = (next_pts_L_pix[:, 0, 0] - prev_pts_L_pix[:, 0, 0]) / w_res 
-                    dy_L = (next_pts_L_pix[:, 0, 1] - prev_pts_L_pix[:, 0, 1]) / h_res
-                    dx_R = (next_pts_R_pix[:, 0, 0] - prev_pts_R_pix[:, 0, 0]) / w_res
-                    dy_R = (next_pts_R_pix[:, 0, 1] - prev_pts_R_pix[:, 0, 1]) / h_res
-                    lk_displacement_features = np.concatenate([dx_L, dy_L, dx_R, dy_R]) 
-                    
-                    # (v9) RAW 3D MP 位移 (126 維)
-                    mp_disp_L = calculate_mp_displacement_features(current_hand_pts_L, prev_hand_pts_L)
-                    mp_disp_R = calculate_mp_displacement_features(current_hand_pts_R, prev_hand_pts_R) 
-                    mp_displacement_features = np.concatenate([mp_disp_L, mp_disp_R])
-                    
-                    displacement_features = np.concatenate([lk_displacement_features, mp_displacement_features])
-
-            # 3. 組合 636 維特徵
-            final_pose_vector = np.concatenate([standardized_spatial_coords, displacement_features])
-            
-            if final_pose_vector.shape[0] != POSE_DIMENSION:
-                 frame_idx += 1
-                 continue
-            
-            # 4. 💥 [v9 關鍵] 圖像檢查 (SSIM + Min Pixels)
-            left = draw_hand_skeleton(frame_resized, results.left_hand_landmarks)
-            right = draw_hand_skeleton(frame_resized, results.right_hand_landmarks)
-            hand_skeleton = cv2.add(left, right)
-            red = hand_skeleton[:, :, 2] 
-
-            if cv2.countNonZero(red) < min_skeleton_pixels:
-                frame_idx += 1
-                prev_frame = frame_resized.copy()
-                prev_hand_pts_L = current_hand_pts_L
-                prev_hand_pts_R = current_hand_pts_R
-                continue 
-
-            if prev_skeleton is not None:
-                score = ssim(prev_skeleton, red, data_range=255)
-                if score >= similarity_threshold:
-                    frame_idx += 1
-                    prev_frame = frame_resized.copy()
-                    prev_hand_pts_L = current_hand_pts_L
-                    prev_hand_pts_R = current_hand_pts_R
-                    continue 
-            
-            prev_skeleton = red.copy()
-            prev_frame = frame_resized.copy()
-            prev_hand_pts_L = current_hand_pts_L
-            prev_hand_pts_R = current_hand_pts_R
-            
-            pose_seq.append(final_pose_vector) 
-            frame_idx += 1
-
-        cap.release()
-    
     if not pose_seq:
         print("警告: 影片處理完成，但 pose_seq 為空。")
-        return None
+        return (None, None) if with_indices else None
+    features = np.array(pose_seq)
+    return (features, np.array(indices, dtype=np.int32)) if with_indices else features
+
+def pad_feature_batch(sequences, maxlen=MAX_SEQ_LENGTH):
+    """
+    (T, 636) 序列列表 → (N, maxlen, 636) float32，與 v9 訓練時的
+    pad_sequences(maxlen=40, padding='post', dtype='float32') 相同: 超過 maxlen 保留最後 maxlen 格 (truncating='pre')，
+    不足時在後面補 0。
+    """
+    batch = np.zeros((len(sequences), maxlen, POSE_DIMENSION), dtype=np.float32)
+    for i, features in enumerate(sequences):
+        features = features[-maxlen:]
+        batch[i, :len(features)] = features
+    return batch
+
+def extract_feature_sequence(video_path=None, frames=None, fps=None, timestamps=None, decode=CAPTURE_DECODE,
+                             similarity=SSIM_BACKEND, with_indices=False):
+    """
+    (v9 訓練邏輯: 固定採樣 + 像素過濾 + SSIM)
+    未提供 frames 時以 cv2.VideoCapture 讀取 video_path，依呈現時間取樣 (任意 FPS，不需轉檔)；
+    decode="grab" 時只 retrieve 被取樣的影格。
+    frames: 可選的 BGR 影格迭代器；搭配 timestamps (每格秒數) 或 fps (來源影格率)，
+            兩者皆未提供時視為 30 FPS (例如 video_source.iter_ffmpeg_frames)。
+    similarity: SSIM 後端名稱 (skimage | opencv) 或 similarity.py 的後端物件。
+    with_indices: 回傳 (特徵, 保留格的取樣序號)，見 stack_pose_sequence。
+    """
+    if POSE_DIMENSION != 636: return (None, None) if with_indices else None
+
+    sampled_frames = iter_sampled_frames(video_path, frames, fps=fps, timestamps=timestamps, decode=decode)
 
-    return np.array(pose_seq)
\ No newline at end of file
+    pose_seq, indices = [], []
+    sampled, decode_time = 0, 0.0 # 💥 decode: 等待下一個取樣影格的時間 (讀檔 + 解碼 + 取樣；ffmpeg 管線含轉檔)
+    with FeatureExtractor(similarity=similarity) as extractor: # 💥 借出已預熱的 Holistic，結束後 reset 歸還
+        start = perf_counter()
+        for index, frame in enumerate(sampled_frames):
+            decode_time += perf_counter() - start
+            sampled += 1
+            vector = extractor.push(frame)
+            if vector is not None:
+                pose_seq.append(vector)
+                indices.append(index)
+            start = perf_counter()
+        decode_time += perf_counter() - start
+    metrics.add_stage("decode", decode_time)
+    metrics.count("frames_sampled", sampled)
+    return stack_pose_sequence(pose_seq, indices, with_indices)
@@ -0,0 +1,134 @@
+# //Soul/app/(tabs)/translation/backend/holistic_pool.py
+# (v9 - 預先建立的 MediaPipe Holistic 實例池: 每個工作執行緒一個，影片之間 reset 而非重建)
+
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from inference_pool import INFER_WORKERS
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+# 池中 Holistic 實例上限 (0 = 與 INFER_WORKERS 相同)；超過時 checkout 會等待其他請求歸還
+HOLISTIC_POOL_SIZE = int(os.getenv("HOLISTIC_POOL_SIZE", 0)) or INFER_WORKERS
+HOLISTIC_ACQUIRE_TIMEOUT = float(os.getenv("HOLISTIC_ACQUIRE_TIMEOUT", 30)) # 所有實例都被借出時最多等待的秒數
+
+# 💥 v9 訓練時的 Holistic 參數
+HOLISTIC_OPTIONS = dict(static_image_mode=False, model_complexity=1)
+WARMUP_FRAME_SHAPE = (240, 320, 3)
+
+
+class HolisticPoolTimeoutError(Exception):
+    """等待 HOLISTIC_ACQUIRE_TIMEOUT 秒仍借不到 Holistic 實例，應回傳 503"""
+
+
+def create_holistic():
+    import mediapipe as mp # 💥 延遲導入 (mediapipe 會連帶導入 TensorFlow / matplotlib，數秒)
+    return mp.solutions.holistic.Holistic(**HOLISTIC_OPTIONS)
+
+
+# ----------------------------------------------------
+# 2. 實例池
+# ----------------------------------------------------
+class HolisticPool:
+    """
+    以佇列保存閒置的 Holistic 實例；checkout() 借出，離開 with 區塊時 reset() 後歸還。
+    reset() 只重啟計算圖 (清除追蹤/平滑狀態，下一支影片的結果與新建實例相同)，不重新解析圖與載入資源。
+    池未預熱時依需要建立，最多 size 個；全部借出時最多等待 timeout 秒。
+    """
+
+    def __init__(self, size=HOLISTIC_POOL_SIZE, factory=create_holistic, timeout=HOLISTIC_ACQUIRE_TIMEOUT, name="request"):
+        self.size = max(1, size)
+        self.factory = factory
+        self.timeout = timeout
+        self.name = name
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> int:
+        return self._created
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create: self._created += 1
+        if not create:
+            try:
+                return self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise HolisticPoolTimeoutError(
+                    f"Holistic 實例池 ({self.name}) 的 {self.size} 個實例皆使用中，等待 {self.timeout:g} 秒仍無空閒")
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _discard(self, holistic):
+        with self._lock:
+            self._created -= 1
+        try:
+            holistic.close()
+        except ValueError:
+            pass
+
+    @contextmanager
+    def checkout(self):
+        holistic = self._acquire()
+        try:
+            yield holistic
+        finally:
+            try:
+                holistic.reset()
+            except Exception as e:
+                print(f"警告: Holistic reset 失敗，捨棄此實例: {e}")
+                self._discard(holistic)
+            else:
+                self._idle.put(holistic)
+
+    def warm(self, count=None):
+        """建立 count 個實例 (預設補滿 size) 並各處理一張空白影格，讓圖與 TFLite 模型在啟動時載入"""
+        count = self.size if count is None else min(count, self.size)
+        blank = np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8)
+        warmed = []
+        while len(warmed) < count and (self._created < self.size or not self._idle.empty()):
+            holistic = self._acquire()
+            holistic.process(blank)
+            warmed.append(holistic)
+        for holistic in warmed:
+            holistic.reset()
+            self._idle.put(holistic)
+        return len(warmed)
+
+    def close(self):
+        while True:
+            try:
+                holistic = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(holistic)
+
+
+holistic_pool = HolisticPool()
+
+
+def warm_holistic_pool(count=None):
+    """FastAPI 啟動時 (或子行程 initializer 中) 預熱 Holistic 實例池"""
+    warmed = holistic_pool.warm(count)
+    print(f"✅ Holistic 實例池: 已預熱 {warmed} 個 (上限 {holistic_pool.size})")
+    return warmed
@@ -0,0 +1,165 @@
+# //Soul/app/(tabs)/translation/backend/inference_pool.py
+# (v9 - 推論工作池: 將 ffmpeg 轉檔 + 特徵提取 + model.predict 移出 asyncio event loop)
+
+import os
+import math
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+INFER_EXECUTOR = os.getenv("INFER_EXECUTOR", "thread")              # thread | process
+INFER_WORKERS = int(os.getenv("INFER_WORKERS", os.cpu_count() or 1))
+INFER_QUEUE_SIZE = int(os.getenv("INFER_QUEUE_SIZE", 8))            # 排隊中的請求上限 (不含執行中)
+INFER_TIMEOUT = float(os.getenv("INFER_TIMEOUT", 60))               # 單一請求的等待上限 (秒)
+# 💥 負載削減: 預估排隊時間超過此秒數時直接拒絕 (0 = 只依 INFER_QUEUE_SIZE)；預估會逾時的請求也一律拒絕
+INFER_WAIT_BUDGET = float(os.getenv("INFER_WAIT_BUDGET", 20))
+INFER_SERVICE_EWMA = float(os.getenv("INFER_SERVICE_EWMA", 0.2))    # 每筆處理時間的指數移動平均權重
+
+
+class QueueFullError(Exception):
+    """工作池與等待佇列皆已滿，應回傳 503"""
+
+
+class InferenceTimeoutError(Exception):
+    """請求超過 INFER_TIMEOUT 仍未完成，應回傳 504"""
+
+
+class LoadSheddingError(QueueFullError):
+    """預估排隊時間超過 INFER_WAIT_BUDGET (或必定逾時)，不排入佇列，應回傳 503"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WorkerNotReadyError(Exception):
+    """worker (process 模式的子行程) 未能載入模型，應回傳 503 而非「模型尚未載入」的 200"""
+
+
+def _worker_call(fn):
+    """回傳 (執行的行程 pid, fn())；用於確認每個子行程的狀態"""
+    return os.getpid(), fn()
+
+
+def _timed_call(fn, *args):
+    """在工作池中執行並量測處理時間 (不含排隊)；模組層級函式，process 模式可 pickle"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+# ----------------------------------------------------
+# 2. 有界工作池
+# ----------------------------------------------------
+class InferenceExecutor:
+    """
+    包裝 ThreadPoolExecutor / ProcessPoolExecutor，加上有界佇列與逾時。
+    名額在背景工作「真正結束」時才釋放，逾時的請求不會讓佇列被超額塞滿。
+    """
+
+    def __init__(self, kind=INFER_EXECUTOR, workers=INFER_WORKERS,
+                 queue_size=INFER_QUEUE_SIZE, timeout=INFER_TIMEOUT, initializer=None,
+                 wait_budget=INFER_WAIT_BUDGET):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self.timeout = timeout
+        self.wait_budget = wait_budget
+        self.service_time = None # 每筆處理時間的移動平均 (秒)；尚無完成的請求時為 None
+        self.shed = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        if kind == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=initializer)
+        elif kind == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="v9-infer",
+                                            initializer=initializer)
+        else:
+            raise ValueError(f"未知的 INFER_EXECUTOR: {kind} (可用: thread, process)")
+
+    @property
+    def pending(self) -> int:
+        """執行中 + 排隊中的請求數"""
+        return self._pending
+
+    def estimated_wait(self, pending=None):
+        """
+        新請求的預估排隊秒數: 前面還有 pending - workers + 1 筆要等空出的 worker，
+        每 workers 筆約需一個平均處理時間。尚無處理時間資料時為 0。
+        """
+        pending = self._pending if pending is None else pending
+        if self.service_time is None or pending < self.workers:
+            return 0.0
+        return math.ceil((pending - self.workers + 1) / self.workers) * self.service_time
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            elapsed = future.result()[0]
+            self.service_time = elapsed if self.service_time is None else (
+                INFER_SERVICE_EWMA * elapsed + (1 - INFER_SERVICE_EWMA) * self.service_time)
+
+    def _admit(self):
+        """佔用一個名額；佇列已滿或預估排隊時間超出預算時拋出例外 (呼叫端需持有 _lock)"""
+        if self._pending >= self.capacity:
+            raise QueueFullError(f"推論佇列已滿 ({self._pending}/{self.capacity})")
+        wait = self.estimated_wait()
+        if wait > 0:
+            if self.wait_budget and wait > self.wait_budget:
+                self.shed += 1
+                raise LoadSheddingError(f"預估排隊 {wait:.1f} 秒，超過上限 {self.wait_budget:.0f} 秒", wait)
+            if wait + self.service_time > self.timeout:
+                self.shed += 1
+                raise LoadSheddingError(f"預估 {wait + self.service_time:.1f} 秒才能完成，超過逾時 {self.timeout:.0f} 秒", wait)
+        self._pending += 1
+
+    async def run(self, fn, *args):
+        """在工作池中執行 fn(*args)；佇列滿時拋出 QueueFullError，逾時拋出 InferenceTimeoutError"""
+        with self._lock:
+            self._admit()
+
+        try:
+            future = self._pool.submit(_timed_call, fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            _, result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+            return result
+        except asyncio.TimeoutError:
+            raise InferenceTimeoutError(f"推論超過 {self.timeout:.0f} 秒未完成")
+
+    def call_each_worker(self, fn, timeout=300):
+        """
+        (阻塞) 讓每個 worker 至少執行一次 fn()，回傳 {pid: 結果}；不佔用佇列名額，也不計入處理時間。
+        process 模式: 子行程由哪個接手不固定，因此分批送出直到每個子行程都回報 (子行程會先跑完 initializer)。
+        超過 timeout 仍有子行程未回報時拋出 TimeoutError。
+        """
+        if self.kind != "process":
+            pid, result = self._pool.submit(_worker_call, fn).result(timeout=timeout)
+            return {pid: result}
+        results = {}
+        deadline = time.time() + timeout
+        while len(results) < self.workers:
+            futures = [self._pool.submit(_worker_call, fn) for _ in range(self.workers - len(results))]
+            for future in futures:
+                pid, result = future.result(timeout=max(0.0, deadline - time.time()))
+                results.setdefault(pid, result)
+            if len(results) < self.workers and time.time() > deadline:
+                raise TimeoutError(f"{self.workers - len(results)} 個子行程未在 {timeout:.0f} 秒內回報")
+            if len(results) < self.workers:
+                time.sleep(0.2) # 其餘子行程可能仍在執行 initializer (載入模型)
+        return results
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
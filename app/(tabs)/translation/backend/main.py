@@ -1,21 +1,36 @@
 # //Soul/app/(tabs)/translation/backend/main.py
-# (v9 - 💥 轉檔 30fps + 像素過濾 💥)
+# (v9 - 💥 依時間戳取樣 (免轉檔) + 像素過濾 💥)
 
-from fastapi import FastAPI, UploadFile, File, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Request, HTTPException, WebSocket, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import os
 import uuid
-import requests
-import ffmpeg # 💥 [v9] 導入 ffmpeg
+import math
+import time
+import shutil
+import asyncio
 import warnings
+import threading
 
 # 💥 導入 v9 的模型載入器和預測器
-from model_infer import load_v9_model, predict
+from model_infer import (load_v9_model, predict, spot, predict_features, get_model_hash, close_models,
+                         is_model_loaded, get_load_error, registry)
+from inference_pool import (InferenceExecutor, QueueFullError, InferenceTimeoutError, LoadSheddingError,
+                            WorkerNotReadyError, INFER_EXECUTOR)
+from downloader import open_http_client, close_http_client, download_to_file, DownloadError
+from video_source import iter_ffmpeg_frames, VideoOpenError # 💥 [v9] ffmpeg 解碼管線 (VIDEO_DECODER=ffmpeg)
+from feature_loader import IMAGE_WIDTH, IMAGE_HEIGHT
+from holistic_pool import warm_holistic_pool, holistic_pool, HolisticPoolTimeoutError
+from feature_cache import feature_cache, pipeline_id
+from url_cache import url_cache
+from streaming import StreamSession, StreamError, stream_holistic_pool, stream_executor
+from video_source import TARGET_FPS
+from model_registry import ModelVersionError
+import metrics # 💥 各階段耗時 / 影格與快取計數 (GET /metrics，Prometheus 文字格式)
 
 from dotenv import load_dotenv
-import motor.motor_asyncio
 from datetime import datetime
 
 load_dotenv()
@@ -30,18 +45,179 @@ app.add_middleware(
 )
 
 MONGO_URL = os.getenv("MONGO_URL")
+# capture: cv2 直接解碼原檔並依時間戳取樣 (預設，不經 ffmpeg)；ffmpeg: 經 ffmpeg 管線重採樣為 30 FPS
+VIDEO_DECODER = os.getenv("VIDEO_DECODER", "capture")
+TRANSLATE_MODES = ("single", "segments") # single: Top-3 / segments: 連續手語分段
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN", "")   # /models/routing 需要的 X-Admin-Token (空字串 = 停用)
 if MONGO_URL:
+    import motor.motor_asyncio # 💥 只有設定 MONGO_URL 時才導入
     mongo_client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
     db = mongo_client.tsl_app
     vocab_collection = db.vocabularies
 
 # ----------------------------------------------------
-# 1. 啟動時載入 v9 模型
+# 1. 啟動時載入 v9 模型 (💥 背景暖機: 不阻塞啟動，/health 立即可回應)
 # ----------------------------------------------------
+infer_executor = None
+STARTED_AT = time.time()
+warmup_state = {"state": "starting", "seconds": None, "error": None} # starting | warming | ready | failed
+worker_states = {} # process 模式: {子行程 pid: process_worker_status()}，由暖機時逐一回報
+process_worker_error = None # process 模式子行程的載入錯誤 (None = 成功)
+
+def init_process_worker():
+    """process 模式子行程的 initializer: 載入模型 + 預熱一個 Holistic 實例；失敗時記錄原因 (不可拋出，否則整個工作池損毀)"""
+    global process_worker_error
+    try:
+        if not load_v9_model():
+            process_worker_error = get_load_error() or "模型載入失敗"
+            return
+        warm_holistic_pool(1)
+    except Exception as e:
+        process_worker_error = str(e)
+
+def process_worker_status():
+    """(在子行程中執行) 回報模型是否載入、版本與 Holistic 實例數"""
+    active = registry.active
+    return {
+        "ok": process_worker_error is None and is_model_loaded() and holistic_pool.created > 0,
+        "version": active.version if active is not None else None,
+        "holistic": holistic_pool.created,
+        "error": process_worker_error,
+    }
+
+def warm_up_process_workers(executor: InferenceExecutor):
+    """
+    (背景執行緒) process 模式: 讓每個子行程執行一次 process_worker_status()，全部回報成功才就緒。
+    子行程在此時建立並執行 init_process_worker (載入模型 + 預熱 Holistic)。
+    """
+    warmup_state["state"] = "warming"
+    start = time.time()
+    try:
+        worker_states.update(executor.call_each_worker(process_worker_status))
+    except Exception as e:
+        print(f"❌ 子行程暖機失敗: {e}")
+        warmup_state.update(state="failed", error=str(e))
+        return
+    failed = {pid: state["error"] or "模型或 Holistic 未就緒" for pid, state in worker_states.items() if not state["ok"]}
+    if failed:
+        print(f"--- 警告: {len(failed)} 個子行程載入失敗，API 將無法正常運作 ---")
+        warmup_state.update(state="failed", error="; ".join(f"pid {pid}: {error}" for pid, error in failed.items()))
+        return
+    warmup_state.update(state="ready", seconds=round(time.time() - start, 2))
+    print(f"✅ {len(worker_states)} 個子行程暖機完成 ({warmup_state['seconds']} s)")
+
+def warm_up_backend(workers: int):
+    """
+    (背景執行緒) 載入 v9 模型 (此時才導入 TensorFlow) 並預熱 Holistic 實例池 (此時才導入 MediaPipe)。
+    完成前的翻譯請求會回傳「模型尚未載入」。
+    """
+    warmup_state["state"] = "warming"
+    start = time.time()
+    try:
+        if not load_v9_model():
+            print("--- 警告: v9 模型載入失敗，API 將無法正常運作 ---")
+            warmup_state.update(state="failed", error=get_load_error() or "模型載入失敗")
+            return
+        warm_holistic_pool(workers)
+        warmup_state.update(state="ready", seconds=round(time.time() - start, 2))
+        print(f"✅ 背景暖機完成 ({warmup_state['seconds']} s)")
+    except Exception as e:
+        print(f"❌ 背景暖機失敗: {e}")
+        warmup_state.update(state="failed", error=str(e))
+
 @app.on_event("startup")
 def startup_event():
-    if not load_v9_model():
-        print("--- 警告: v9 模型載入失敗，API 將無法正常運作 ---")
+    global infer_executor
+    if INFER_EXECUTOR == "process":
+        # 每個子行程各自載入模型與 Holistic，全部回報成功後才就緒
+        infer_executor = InferenceExecutor(initializer=init_process_worker)
+        threading.Thread(target=warm_up_process_workers, args=(infer_executor,), name="v9-warmup", daemon=True).start()
+    else:
+        infer_executor = InferenceExecutor()
+        threading.Thread(target=warm_up_backend, args=(infer_executor.workers,), name="v9-warmup", daemon=True).start()
+    metrics.INFER_QUEUE_DEPTH.set_function(lambda: infer_executor.pending)
+    metrics.INFER_ESTIMATED_WAIT.set_function(lambda: infer_executor.estimated_wait())
+    metrics.INFER_SERVICE_SECONDS.set_function(lambda: infer_executor.service_time)
+    print(f"✅ 推論工作池: {infer_executor.kind} x {infer_executor.workers} (容量 {infer_executor.capacity})")
+    metrics.start_flush() # 多個 worker 時定期寫出本行程的指標，/metrics 合併輸出
+    open_http_client()
+
+# ----------------------------------------------------
+# 1B. 就緒狀態 (💥 /readyz 與翻譯請求的准入條件)
+# ----------------------------------------------------
+FFMPEG_PATH = shutil.which("ffmpeg") # VIDEO_DECODER=ffmpeg 時為必要元件
+
+def readiness():
+    """
+    回傳 (是否可接受翻譯請求, 各元件狀態)。就緒 = 模型已載入 + Holistic 實例池已預熱 + (需要時) ffmpeg 可用。
+    佇列壅塞不影響就緒 (避免負載高時整個 worker 被移出負載平衡)，改由負載削減逐筆拒絕。
+    """
+    if worker_states:
+        # process 模式: 模型與 Holistic 實例在各子行程中，依暖機時的回報判斷
+        model_loaded = all(state["ok"] for state in worker_states.values())
+        versions = sorted({state["version"] for state in worker_states.values() if state["version"]})
+        version = versions[0] if len(versions) == 1 else versions or None
+        holistic_created = sum(state["holistic"] for state in worker_states.values())
+        holistic_ok = all(state["holistic"] > 0 for state in worker_states.values())
+    else:
+        active = registry.active
+        model_loaded = is_model_loaded()
+        version = active.version if active is not None else None
+        holistic_created = holistic_pool.created
+        holistic_ok = holistic_created > 0
+    checks = {
+        "model": {
+            "ok": warmup_state["state"] == "ready" and model_loaded,
+            "state": warmup_state["state"],
+            "version": version,
+            "warmup_seconds": warmup_state["seconds"],
+            "error": warmup_state["error"],
+        },
+        "holistic_pool": {
+            "ok": holistic_ok,
+            "created": holistic_created,
+            "idle": None if worker_states else holistic_pool.idle, # process 模式: 子行程各自持有，此行程無從得知
+            "size": holistic_pool.size,
+        },
+        "ffmpeg": {
+            "ok": VIDEO_DECODER != "ffmpeg" or FFMPEG_PATH is not None,
+            "available": FFMPEG_PATH is not None,
+            "required": VIDEO_DECODER == "ffmpeg",
+        },
+    }
+    ready = infer_executor is not None and all(check["ok"] for check in checks.values())
+    if infer_executor is not None:
+        checks["queue"] = {
+            "pending": infer_executor.pending,
+            "capacity": infer_executor.capacity,
+            "estimated_wait_seconds": round(infer_executor.estimated_wait(), 2),
+            "service_seconds": None if infer_executor.service_time is None else round(infer_executor.service_time, 3),
+            "wait_budget_seconds": infer_executor.wait_budget,
+            "shed": infer_executor.shed,
+        }
+    return ready, checks
+
+def not_ready_response():
+    """尚未就緒時回傳 503 (暖機中附 Retry-After)，否則 None"""
+    ready, checks = readiness()
+    if ready: return None
+    metrics.INFER_REJECTED.labels("not_ready").inc()
+    failed = [name for name, check in checks.items() if not check.get("ok", True)]
+    if warmup_state["state"] == "failed":
+        return JSONResponse(status_code=503, content={"error": f"模型載入失敗: {warmup_state['error']}", "failed": failed})
+    return JSONResponse(status_code=503, content={"error": "服務暖機中，請稍後再試", "failed": failed},
+                        headers={"Retry-After": "5"})
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_http_client()
+    if infer_executor is not None:
+        infer_executor.shutdown(wait=False)
+    close_models()
+    holistic_pool.close()
+    stream_holistic_pool.close()
+    stream_executor.shutdown(wait=False)
+    metrics.stop_flush()
 
 # ----------------------------------------------------
 # 2. 輔助函數：標準化模型輸出 (v9)
@@ -63,32 +239,106 @@ def format_model_output(top3: list) -> dict:
         "confidence_score": confidence_percent
     }
 
+def format_segments_output(result: dict) -> dict:
+    """(連續手語) 片段標籤依序串成 translation，並附上每段的時間區間"""
+    segments = result.get("segments", [])
+    output = {
+        "translation": " ".join(segment["label"] for segment in segments) if segments else "無法識別",
+        "segments": segments,
+    }
+    if "error" in result: output["error"] = result["error"]
+    return output
+
+def mode_error(mode: str):
+    """mode 不合法時回傳 400 回應，否則 None"""
+    if mode in TRANSLATE_MODES: return None
+    return JSONResponse(status_code=400, content={"error": f"未知的 mode: {mode} (可用: {', '.join(TRANSLATE_MODES)})"})
+
+def decode_and_predict(file_path: str, mode: str = "single", submitted_at: float = None):
+    """
+    (阻塞) 解碼 + 10 Hz 取樣 + v9 預測 (single: Top-3 / segments: 連續手語分段)，在推論工作池中執行。
+    回傳 (結果, 各階段耗時與計數的快照)；快照可跨行程傳回，由主行程寫入 /metrics。
+    """
+    if not is_model_loaded():
+        # 💥 process 模式的子行程載入失敗時回報錯誤 (503)，不回傳「模型尚未載入」的 200
+        raise WorkerNotReadyError(f"推論 worker (pid {os.getpid()}) 未載入模型: {process_worker_error or '暖機中'}")
+    run = spot if mode == "segments" else predict
+    with metrics.collect() as trace:
+        if submitted_at is not None:
+            metrics.add_stage("queue", max(time.time() - submitted_at, 0.0)) # 在工作池排隊的時間
+        if VIDEO_DECODER == "ffmpeg":
+            print(f"正在以 ffmpeg 管線解碼 {file_path} (30 FPS)...")
+            frames = iter_ffmpeg_frames(file_path, IMAGE_WIDTH, IMAGE_HEIGHT)
+            result = run(file_path, frames=frames, source="ffmpeg") # 💥 呼叫 v9 的 predict / spot
+        else:
+            result = run(file_path) # 💥 依時間戳取樣，不需 30 FPS 轉檔
+    return result, trace.snapshot()
+
+async def run_inference(file_path: str, mode: str = "single"):
+    """
+    將解碼與推論交給工作池；回傳 (結果, None) 或 (None, 錯誤回應)。
+    """
+    try:
+        top3, snapshot = await infer_executor.run(decode_and_predict, file_path, mode, time.time())
+        metrics.record(snapshot)
+        return top3, None
+    except LoadSheddingError as e:
+        # 💥 負載削減: 預估會等太久 (客戶端多半已放棄) 的請求不排隊，直接告知何時再試
+        print(f"⚠️ {e}")
+        metrics.INFER_REJECTED.labels("shed").inc()
+        return None, JSONResponse(status_code=503, content={"error": str(e)},
+                                  headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+    except QueueFullError as e:
+        print(f"⚠️ {e}")
+        metrics.INFER_REJECTED.labels("queue_full").inc()
+        return None, JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "5"})
+    except InferenceTimeoutError as e:
+        print(f"⚠️ {e}")
+        metrics.INFER_REJECTED.labels("timeout").inc()
+        return None, JSONResponse(status_code=504, content={"error": str(e)})
+    except HolisticPoolTimeoutError as e:
+        print(f"⚠️ {e}")
+        metrics.INFER_REJECTED.labels("holistic_busy").inc()
+        return None, JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "5"})
+    except WorkerNotReadyError as e:
+        print(f"❌ {e}")
+        metrics.INFER_REJECTED.labels("not_ready").inc()
+        return None, JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "5"})
+    except VideoOpenError as e:
+        # 💥 上傳 / 下載的檔案不是可解碼的影片: 用戶端錯誤，且不寫入特徵快取
+        print(f"❌ {e}")
+        return None, JSONResponse(status_code=400, content={"error": f"無法開啟影片: {e}"})
+
 # ----------------------------------------------------
 # 3. FastAPI 路由
 # ----------------------------------------------------
 
 @app.post("/translate")
-async def translate(file: UploadFile = File(...)):
-    # (此路由用於本地檔案上傳，假設也需要轉檔)
+async def translate(file: UploadFile = File(...), mode: str = Query("single")):
+    # (此路由用於本地檔案上傳；mode=segments 時回傳連續手語分段)
+    error_response = mode_error(mode) or not_ready_response()
+    if error_response is not None:
+        return error_response
     file_path = None
-    transcoded_path = None
+    started = time.perf_counter()
     try:
         filename = f"{uuid.uuid4()}.mp4"
         save_dir = "temp_videos"
         os.makedirs(save_dir, exist_ok=True)
         file_path = os.path.join(save_dir, filename)
-        transcoded_path = os.path.join(save_dir, f"30fps_{filename}")
 
+        upload_start = time.perf_counter()
         with open(file_path, "wb") as f:
             f.write(await file.read())
+        metrics.STAGE_SECONDS.labels("upload").observe(time.perf_counter() - upload_start)
 
-        # 💥 [v9] 執行 30 FPS 轉檔
-        print(f"正在將 {file_path} 轉檔為 30 FPS...")
-        ffmpeg.input(file_path).output(transcoded_path, r=30).run(overwrite_output=True, quiet=True)
-        print("轉檔完成。")
-
-        top3 = predict(transcoded_path) # 💥 呼叫 v9 的 predict
+        top3, error_response = await run_inference(file_path, mode)
+        if error_response is not None:
+            return error_response
 
+        if mode == "segments":
+            print("🔍 分段預測：", top3)
+            return JSONResponse(content=format_segments_output(top3))
         print("🔍 Top-3 預測：", top3)
         return JSONResponse(content=format_model_output(top3))
 
@@ -97,40 +347,57 @@ async def translate(file: UploadFile = File(...)):
         return JSONResponse(status_code=500, content={"error": str(e)})
     finally:
         if file_path and os.path.exists(file_path): os.remove(file_path)
-        if transcoded_path and os.path.exists(transcoded_path): os.remove(transcoded_path)
+        metrics.REQUEST_SECONDS.labels("/translate", mode).observe(time.perf_counter() - started)
 
 @app.post("/translate-by-url")
 async def translate_by_url(request: Request):
     file_path = None
-    transcoded_path = None
+    mode = None
+    started = time.perf_counter()
     try:
         data = await request.json()
         video_url = data.get("video_url")
 
         if not video_url:
             raise HTTPException(status_code=400, detail="video_url 缺失")
+        mode = data.get("mode", "single")
+        error_response = mode_error(mode) or not_ready_response()
+        if error_response is not None:
+            return error_response
+
+        # 💥 URL 結果快取 (TTL 內直接命中；過期則以 ETag / Last-Modified 條件式驗證；分段結果不快取)
+        pipeline = pipeline_id("ffmpeg" if VIDEO_DECODER == "ffmpeg" else "capture")
+        model_hash = await asyncio.to_thread(get_model_hash) # 💥 首次呼叫會計算模型檔 sha256，不阻塞 event loop
+        cached = await url_cache.lookup(video_url, pipeline, model_hash) if mode == "single" else None
+        if mode == "single" and url_cache.enabled:
+            metrics.count("url_cache_miss" if cached is None else "url_cache_hit")
+        if cached is not None:
+            print("⚡ URL 快取命中 Top-3：", cached)
+            return JSONResponse(content=format_model_output(cached))
 
         filename = f"{uuid.uuid4()}.mp4"
         save_dir = "temp_videos"
         os.makedirs(save_dir, exist_ok=True)
         file_path = os.path.join(save_dir, filename)
-        transcoded_path = os.path.join(save_dir, f"30fps_{filename}")
 
-        r = requests.get(video_url, timeout=30)
-        if r.status_code != 200:
-            raise HTTPException(status_code=400, detail=f"下載影片失敗，狀態碼: {r.status_code}")
-            
-        with open(file_path, "wb") as f:
-            f.write(r.content)
-
-        # 💥 [v9] 執行 30 FPS 轉檔
-        print(f"正在將 {file_path} 轉檔為 30 FPS...")
-        ffmpeg.input(file_path).output(transcoded_path, r=30).run(overwrite_output=True, quiet=True)
-        print("轉檔完成。")
-        
-        top3 = predict(transcoded_path) # 💥 呼叫 v9 的 predict
-        
+        # 串流下載 (共用連線池，不阻塞 event loop)
+        try:
+            download_start = time.perf_counter()
+            download_info = await download_to_file(video_url, file_path)
+            metrics.STAGE_SECONDS.labels("download").observe(time.perf_counter() - download_start)
+        except DownloadError as e:
+            print(f"❌ {e}")
+            return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+
+        top3, error_response = await run_inference(file_path, mode)
+        if error_response is not None:
+            return error_response
+
+        if mode == "segments":
+            print("🌐 Cloudinary URL 分段預測：", top3)
+            return JSONResponse(content=format_segments_output(top3))
         print("🌐 Cloudinary URL 翻譯 Top-3：", top3)
+        await asyncio.to_thread(url_cache.store, video_url, download_info, pipeline, model_hash, top3)
         return JSONResponse(content=format_model_output(top3))
 
     except Exception as e:
@@ -138,7 +405,152 @@ async def translate_by_url(request: Request):
         return JSONResponse(status_code=500, content={"error": str(e)})
     finally:
         if file_path and os.path.exists(file_path): os.remove(file_path)
-        if transcoded_path and os.path.exists(transcoded_path): os.remove(transcoded_path)
+        if mode in TRANSLATE_MODES:
+            metrics.REQUEST_SECONDS.labels("/translate-by-url", mode).observe(time.perf_counter() - started)
+
+@app.websocket("/ws/translate")
+async def translate_stream(websocket: WebSocket):
+    """
+    💥 串流辨識: ws://.../ws/translate?format=jpeg&fps=30 (raw 需加 width、height，BGR24)
+    二進位訊息 = 一格影像 (依拍攝順序)；文字訊息 "reset" = 開始新的一段，"end" = 結束並取得 final。
+    伺服器每保留一格就以最近 40 格回傳 {"type": "prediction", "translation", "confidence_score", "top3", "frames"}；
+    串流預測工作池 (stream_executor，不與翻譯請求共用) 壅塞時該格改回傳 {"type": "busy", "error", "frames"}。
+    """
+    await websocket.accept()
+    if not readiness()[0]:
+        await websocket.send_json({"type": "error", "error": "服務暖機中，請稍後再試"})
+        await websocket.close(code=1013) # Try Again Later
+        return
+    if infer_executor.kind == "process":
+        # 串流的 Holistic 與模型版本在此行程中，process 模式的子行程無法接手
+        await websocket.send_json({"type": "error", "error": "串流辨識需要 INFER_EXECUTOR=thread"})
+        await websocket.close(code=1008)
+        return
+    loop = asyncio.get_running_loop()
+    outbox = asyncio.Queue()
+    emit = lambda message: loop.call_soon_threadsafe(outbox.put_nowait, message)
+
+    def predict_in_pool(features, version):
+        """(串流執行緒) 每格預測經過串流專用的工作池: 有界佇列 + 逾時，不排在翻譯請求後面"""
+        try:
+            return asyncio.run_coroutine_threadsafe(
+                stream_executor.run(predict_features, features, version), loop).result()
+        except (QueueFullError, InferenceTimeoutError):
+            metrics.INFER_REJECTED.labels("stream").inc()
+            raise
+
+    params = websocket.query_params
+    try:
+        session = StreamSession(
+            emit,
+            frame_format=params.get("format", "jpeg"),
+            fps=float(params.get("fps", TARGET_FPS)),
+            width=int(params["width"]) if "width" in params else None,
+            height=int(params["height"]) if "height" in params else None,
+            predict=predict_in_pool,
+        )
+    except (StreamError, ValueError) as e:
+        await websocket.send_json({"type": "error", "error": str(e)})
+        await websocket.close(code=1008)
+        return
+    await websocket.send_json({"type": "ready", "fps": session.fps, "window": session.window.maxlen})
+
+    connected = True
+
+    async def receive_frames():
+        nonlocal connected
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                session.close()
+                return
+            if message.get("bytes") is not None:
+                session.submit(message["bytes"])
+            elif message.get("text") == "reset":
+                session.reset()
+            elif message.get("text") == "end":
+                session.finish()
+                return
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            message = await outbox.get()
+            if message is None: break
+            if message["type"] in ("prediction", "final"):
+                message.update(format_model_output(message["top3"]))
+            if connected:
+                await websocket.send_json(message)
+    except Exception as e:
+        print(f"❌ 串流連線錯誤: {e}")
+        connected = False
+        session.close()
+    finally:
+        receiver.cancel()
+    if connected:
+        await websocket.close()
+
+@app.get("/cache-stats")
+async def cache_stats():
+    # 💥 特徵 / Top-3 與 URL 快取的命中統計 (每個 worker 行程各自計數)
+    return JSONResponse(content={"features": feature_cache.stats(), "url": url_cache.stats()})
+
+def health_body(ready, checks):
+    return {
+        "status": "ok",
+        "ready": ready,
+        "model": warmup_state["state"],
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "checks": checks,
+    }
+
+@app.get("/health")
+@app.get("/healthz")
+async def healthz():
+    # 💥 存活檢查: 行程與 event loop 正常即回應 200 (不等待模型)；附上各元件狀態
+    return JSONResponse(content=health_body(*readiness()))
+
+@app.get("/readyz")
+async def readyz():
+    # 💥 就緒檢查: 模型 / Holistic 實例池 / ffmpeg 皆就緒才回應 200，否則 503 (負載平衡器不導入流量)
+    ready, checks = readiness()
+    return JSONResponse(status_code=200 if ready else 503, content=health_body(ready, checks))
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    # 💥 Prometheus 抓取端點: 請求 / 各階段耗時 histogram、影格與快取計數、佇列深度 (設定 METRICS_MULTIPROC_DIR 時合併所有 worker)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/models")
+async def list_models():
+    # 💥 模型登錄: 此行程已載入的 active / candidate、routing.json 與目錄內所有版本
+    content = registry.describe()
+    if registry.enabled:
+        try:
+            content["routing"] = registry.read_routing()
+        except (OSError, ValueError, KeyError) as e:
+            content["routing"] = {"error": str(e)}
+    return JSONResponse(content=content)
+
+@app.post("/models/routing")
+async def set_model_routing(request: Request):
+    """
+    💥 切換 active 版本 / 設定候選版本分流: {"active": "...", "candidate": "..." 或 null, "candidate_percent": 10}
+    寫入 routing.json；此行程立即在背景載入並切換，其他 worker 於下次檢查 (MODEL_REGISTRY_POLL) 時套用。
+    """
+    if not MODEL_ADMIN_TOKEN or request.headers.get("X-Admin-Token") != MODEL_ADMIN_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "需要有效的 X-Admin-Token"})
+    if not registry.enabled:
+        return JSONResponse(status_code=400, content={"error": "未設定 MODEL_REGISTRY_DIR"})
+    try:
+        data = await request.json()
+        routing = registry.write_routing(data.get("active"), data.get("candidate"), float(data.get("candidate_percent", 0)))
+    except (ModelVersionError, ValueError, TypeError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if INFER_EXECUTOR != "process":
+        registry.refresh_async()
+    return JSONResponse(content={"routing": routing})
 
 @app.post("/save-cloudinary-url")
 async def save_cloudinary_url(request: Request):
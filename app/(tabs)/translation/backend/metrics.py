@@ -0,0 +1,401 @@
+# //Soul/app/(tabs)/translation/backend/metrics.py
+# (v9 - 各階段耗時與計數: 請求內以 trace 累計，結束後寫入 Prometheus 格式的 histogram / counter，由 /metrics 輸出)
+#
+# 不依賴 prometheus_client: 只用到 counter / gauge / histogram 與文字輸出格式 (text/plain; version=0.0.4)。
+# process 模式下特徵提取與推論在子行程執行: 子行程回傳 trace 的快照，由主行程 record()，/metrics 才看得到。
+# 💥 多個 uvicorn worker (translation_server.py 的 WEB_CONCURRENCY > 1): 設定 METRICS_MULTIPROC_DIR 後，
+# 每個 worker 定期把自己的數值寫成 <目錄>/metrics_<pid>.json，/metrics 合併所有 worker 的檔案後輸出，
+# 不論由哪個 worker 回應都是整個服務的數值 (其他 worker 最多延遲 METRICS_FLUSH_INTERVAL 秒)。
+
+import os
+import json
+import math
+import glob
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")                # 空字串 = 只輸出本行程的數值
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1.0))      # worker 寫出數值的間隔 (秒)
+
+# ----------------------------------------------------
+# 2. 指標型別
+# ----------------------------------------------------
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs: return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf: return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: 需要 {len(self.labelnames)} 個標籤值 ({', '.join(self.labelnames)})")
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                child = self._children[values] = self._new_child()
+            return child
+
+    def collect(self):
+        """{標籤值: 資料}；資料可寫成 JSON (跨 worker 合併用)"""
+        with self._lock:
+            children = list(self._children.items())
+        return {values: child.data() for values, child in children}
+
+    def merge(self, collected, other, pid):
+        """把另一個 worker 的 collect() 結果加進 collected (counter / histogram 相加)"""
+        for values, data in other.items():
+            collected[values] = self._add(collected[values], data) if values in collected else data
+
+    @staticmethod
+    def _add(a, b):
+        return a + b
+
+    def render(self, collected=None):
+        collected = self.collect() if collected is None else collected
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, data in sorted(collected.items()):
+            lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples(values, data)]
+        return "\n".join(lines)
+
+    def _samples(self, values, value):
+        yield self.name, _format_labels(self.labelnames, values), value
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def data(self):
+        return self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = _Value
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """
+    set() 設定值，或 set_function() 在輸出時才取值 (例如佇列深度)。
+    multiprocess_mode: 多個 worker 時的合併方式 — sum (相加) / max (取最大) / all (各 worker 一列，加上 pid 標籤)；
+    已結束的 worker 不計入。
+    """
+    kind = "gauge"
+    _new_child = _Value
+
+    def __init__(self, name, documentation, labelnames=(), multiprocess_mode="all"):
+        if multiprocess_mode not in ("sum", "max", "all"):
+            raise ValueError(f"未知的 multiprocess_mode: {multiprocess_mode} (可用: sum, max, all)")
+        super().__init__(name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+        self._functions = {}
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().inc(-amount)
+
+    def set_function(self, function, *values):
+        self._functions[tuple(str(v) for v in values)] = function
+
+    def collect(self):
+        collected = super().collect()
+        for values, function in self._functions.items():
+            try:
+                value = function()
+            except Exception:
+                continue
+            if value is not None:
+                collected[values] = value
+        return collected
+
+    def merge(self, collected, other, pid):
+        if not _process_alive(pid): return
+        for values, value in other.items():
+            if self.multiprocess_mode == "all":
+                collected[values + (str(pid),)] = value
+            elif values not in collected:
+                collected[values] = value
+            else:
+                collected[values] = collected[values] + value if self.multiprocess_mode == "sum" else max(collected[values], value)
+
+    def _samples(self, values, value):
+        labelnames = self.labelnames
+        if len(values) > len(labelnames): labelnames += ("pid",) # 多個 worker 合併 (multiprocess_mode=all)
+        yield self.name, _format_labels(labelnames, values), value
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def data(self):
+        """[各桶計數 (非累計), 總和, 次數]"""
+        with self._lock:
+            return [list(self.counts), self.sum, self.count]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    @staticmethod
+    def _add(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def _samples(self, values, data):
+        counts, total, count = data
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            yield f"{self.name}_bucket", _format_labels(self.labelnames, values, [("le", _format_value(bound))]), cumulative
+        yield f"{self.name}_sum", _format_labels(self.labelnames, values), total
+        yield f"{self.name}_count", _format_labels(self.labelnames, values), count
+
+
+REGISTRY = []
+
+
+def render():
+    """Prometheus 文字格式；設定 METRICS_MULTIPROC_DIR 時為所有 worker 合併後的數值"""
+    if not METRICS_MULTIPROC_DIR:
+        return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+    dump() # 回應的 worker 先寫出自己最新的數值
+    merged = {metric.name: {} for metric in REGISTRY}
+    for pid, state in _read_dumps():
+        for metric in REGISTRY:
+            if metric.name in state:
+                metric.merge(merged[metric.name], state[metric.name], pid)
+    return "\n".join(metric.render(merged[metric.name]) for metric in REGISTRY) + "\n"
+
+# ----------------------------------------------------
+# 3. 多個 worker: 各自寫出數值，/metrics 合併
+# ----------------------------------------------------
+def _dump_path(pid):
+    return os.path.join(METRICS_MULTIPROC_DIR, f"metrics_{pid}.json")
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def dump():
+    """把本行程的數值寫成 <METRICS_MULTIPROC_DIR>/metrics_<pid>.json (先寫暫存檔再 os.replace)"""
+    if not METRICS_MULTIPROC_DIR: return
+    state = {metric.name: [[list(values), data] for values, data in metric.collect().items()] for metric in REGISTRY}
+    path = _dump_path(os.getpid())
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+
+def _read_dumps():
+    """產生 (pid, {指標名稱: {標籤值: 資料}})；已結束 worker 的檔案保留 (counter 不可倒退)"""
+    for path in glob.glob(os.path.join(METRICS_MULTIPROC_DIR, "metrics_*.json")):
+        try:
+            pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (ValueError, OSError):
+            continue
+        yield pid, {name: {tuple(values): data for values, data in entries} for name, entries in state.items()}
+
+
+_flush_stop = threading.Event()
+
+
+def start_flush(interval=METRICS_FLUSH_INTERVAL):
+    """(worker 啟動時) 背景執行緒每 interval 秒 dump() 一次；未設定 METRICS_MULTIPROC_DIR 時不啟動"""
+    if not METRICS_MULTIPROC_DIR: return
+
+    def flush():
+        while not _flush_stop.wait(interval):
+            try:
+                dump()
+            except OSError as e:
+                print(f"警告: 指標寫出失敗: {e}")
+
+    _flush_stop.clear()
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    dump()
+    threading.Thread(target=flush, name="v9-metrics-flush", daemon=True).start()
+
+
+def stop_flush():
+    """(worker 結束時) 停止背景執行緒並寫出最後的數值"""
+    if not METRICS_MULTIPROC_DIR: return
+    _flush_stop.set()
+    dump()
+
+# ----------------------------------------------------
+# 4. v9 指標
+# ----------------------------------------------------
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_SECONDS = Histogram("v9_request_seconds", "翻譯請求總耗時 (秒)", ("endpoint", "mode"), STAGE_BUCKETS)
+STAGE_SECONDS = Histogram("v9_stage_seconds", "每個請求在各階段累計的耗時 (秒)", ("stage",), STAGE_BUCKETS)
+FRAMES = Counter("v9_frames_total", "影格計數: read (解碼) / sampled (10 Hz 取樣) / rejected_pixels / rejected_similarity / kept", ("stage",))
+CACHE_REQUESTS = Counter("v9_cache_requests_total", "快取查詢次數", ("cache", "result"))
+CACHE_HIT_RATIO = Gauge("v9_cache_hit_ratio", "快取命中率 (啟動以來)", ("cache",))
+INFER_QUEUE_DEPTH = Gauge("v9_infer_queue_depth", "推論工作池中執行中 + 排隊中的請求數", multiprocess_mode="sum")
+STREAM_SESSIONS = Gauge("v9_stream_sessions", "進行中的串流連線數", multiprocess_mode="sum")
+INFER_REJECTED = Counter("v9_infer_rejected_total", "推論工作池拒絕 / 逾時 / 負載削減 / 尚未就緒 / Holistic 實例忙碌的請求", ("reason",))
+INFER_ESTIMATED_WAIT = Gauge("v9_infer_estimated_wait_seconds", "新請求的預估排隊秒數 (負載削減依據)", multiprocess_mode="max")
+INFER_SERVICE_SECONDS = Gauge("v9_infer_service_seconds", "每筆推論處理時間的移動平均 (秒)")
+
+# trace 計數名稱 → (指標, 標籤值)
+COUNT_METRICS = {
+    "frames_read": (FRAMES, ("read",)),
+    "frames_sampled": (FRAMES, ("sampled",)),
+    "frames_rejected_pixels": (FRAMES, ("rejected_pixels",)),
+    "frames_rejected_similarity": (FRAMES, ("rejected_similarity",)),
+    "frames_kept": (FRAMES, ("kept",)),
+    "feature_cache_hit": (CACHE_REQUESTS, ("features", "hit")),
+    "feature_cache_miss": (CACHE_REQUESTS, ("features", "miss")),
+    "result_cache_hit": (CACHE_REQUESTS, ("results", "hit")),
+    "result_cache_miss": (CACHE_REQUESTS, ("results", "miss")),
+    "url_cache_hit": (CACHE_REQUESTS, ("url", "hit")),
+    "url_cache_miss": (CACHE_REQUESTS, ("url", "miss")),
+}
+
+
+def _hit_ratio(cache):
+    hits = CACHE_REQUESTS.labels(cache, "hit").value
+    total = hits + CACHE_REQUESTS.labels(cache, "miss").value
+    return hits / total if total else None
+
+
+for _cache in ("features", "results", "url"):
+    CACHE_HIT_RATIO.set_function(lambda cache=_cache: _hit_ratio(cache), _cache)
+
+# ----------------------------------------------------
+# 5. 請求內的 trace
+# ----------------------------------------------------
+class RequestTrace:
+    """單一請求內各階段的累計秒數與計數 (逐格階段會累加成一個值)"""
+
+    def __init__(self):
+        self.stages = {}
+        self.counts = {}
+
+    def snapshot(self):
+        return {"stages": dict(self.stages), "counts": dict(self.counts)}
+
+
+_current = ContextVar("v9_request_trace", default=None)
+
+
+@contextmanager
+def collect():
+    """在此區塊內 (同一執行緒) 的 stage / add_stage / count 都累計到回傳的 trace"""
+    trace = RequestTrace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def add_stage(name, seconds):
+    """累加階段耗時；不在請求 trace 內 (例如串流) 時忽略"""
+    trace = _current.get()
+    if trace is not None:
+        trace.stages[name] = trace.stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(name, perf_counter() - start)
+
+
+def count(name, amount=1):
+    """請求 trace 內累計，否則直接寫入計數器"""
+    if amount == 0: return
+    trace = _current.get()
+    if trace is not None:
+        trace.counts[name] = trace.counts.get(name, 0) + amount
+    else:
+        metric, values = COUNT_METRICS[name]
+        metric.labels(*values).inc(amount)
+
+
+def record(snapshot):
+    """trace 快照 (可能來自子行程) → histogram / counter"""
+    if not snapshot: return
+    for name, seconds in snapshot["stages"].items():
+        STAGE_SECONDS.labels(name).observe(seconds)
+    for name, amount in snapshot["counts"].items():
+        metric, values = COUNT_METRICS[name]
+        metric.labels(*values).inc(amount)
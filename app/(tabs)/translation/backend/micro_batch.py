@@ -0,0 +1,109 @@
+# //Soul/app/(tabs)/translation/backend/micro_batch.py
+# (v9 - 動態微批次: 收集同時到達的 (40, 636) 序列，最多等 N 毫秒或湊滿 B 筆後一次 model.predict)
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+_STOP = object() # 佇列中的停止標記
+
+
+class BatcherClosedError(Exception):
+    """close() 之後才 submit (呼叫端應改為單筆執行)"""
+
+
+class MicroBatcher:
+    """
+    呼叫端 (推論工作池 / 串流執行緒) submit() 一筆輸入後立即拿到自己的 Future；
+    背景執行緒取出第一筆後最多再等 max_wait_ms，期間到達的輸入 (最多 max_batch 筆) 疊成一個 batch，
+    交給 run_batch(batch) → 每筆一列的輸出，再依序分回各 Future。
+    run_batch 拋出例外時，該批所有 Future 都會收到同一個例外。
+    close() 之後 submit() 拋出 BatcherClosedError，不會重新啟動背景執行緒。
+    """
+
+    def __init__(self, run_batch, max_batch=16, max_wait_ms=5.0, name="v9-batcher"):
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self.counters = {"items": 0, "batches": 0, "max_batch_seen": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def _ensure_started(self):
+        """(持有 _lock 時呼叫)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        # 💥 檢查 / 啟動 / 放入佇列在同一個鎖內: close() 之前放入的輸入一定排在停止標記前面 (會被處理)
+        with self._lock:
+            if self._closed:
+                raise BatcherClosedError(f"{self.name} 已關閉")
+            self._ensure_started()
+            self._queue.put((item, future))
+        return future
+
+    def close(self):
+        """處理完已排隊的輸入後停止背景執行緒；之後的 submit() 拋出 BatcherClosedError"""
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _collect(self):
+        """阻塞取得第一筆，再收集到 max_batch 筆或 max_wait 到期；遇到停止標記時回傳 (batch, True)"""
+        first = self._queue.get()
+        if first is _STOP: return [], True
+        pending = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(pending) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return pending, True
+            pending.append(entry)
+        return pending, False
+
+    def _run(self):
+        while True:
+            pending, stop = self._collect()
+            # 已被取消的 Future 不進 batch
+            pending = [(item, future) for item, future in pending if future.set_running_or_notify_cancel()]
+            if pending:
+                self._dispatch(pending)
+            if stop: return
+
+    def _dispatch(self, pending):
+        try:
+            outputs = self.run_batch(np.stack([item for item, _ in pending]))
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        for (_, future), output in zip(pending, outputs):
+            future.set_result(output)
+        with self._lock:
+            self.counters["items"] += len(pending)
+            self.counters["batches"] += 1
+            self.counters["max_batch_seen"] = max(self.counters["max_batch_seen"], len(pending))
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters["mean_batch"] = round(counters["items"] / counters["batches"], 2) if counters["batches"] else 0.0
+        counters["max_batch"] = self.max_batch
+        counters["max_wait_ms"] = self.max_wait * 1000
+        return counters
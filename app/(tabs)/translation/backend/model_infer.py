@@ -4,11 +4,9 @@
 import os
 import sys
 import json
+import time
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras.preprocessing.sequence import pad_sequences # 💥 確保導入
-import warnings
+# 💥 不在此導入 TensorFlow: 只有 MODEL_BACKEND=keras 的 KerasRunner 在載入模型時才導入 (啟動與 /health 不必等待)
 
 # 確保能找到 feature_loader.py
 sys.path.append(os.path.dirname(__file__))
@@ -17,77 +15,304 @@ sys.path.append(os.path.dirname(__file__))
 from feature_loader import (
     extract_feature_sequence, 
     MAX_SEQ_LENGTH, 
+    POSE_DIMENSION,
+    pad_feature_batch, # 💥 NumPy padding (取代 keras pad_sequences)
     CLASS_NAMES, # 💥 [FIX] 修正：名稱應為 CLASS_NAMES (原為 FINAL_CLASS_NAMES)
-    int_to_label
+    int_to_label,
+    TARGET_FPS,
+    SAMPLE_RATE,
 )
+# 💥 以影片內容雜湊為鍵的特徵 / Top-3 快取
+from feature_cache import feature_cache, hash_file, pipeline_id
+# 💥 Keras / TFLite / ONNX 執行後端 (MODEL_BACKEND)
+from model_runtime import model_path, check_variant, MODEL_BACKEND, MODEL_VARIANT
+# 💥 版本化模型登錄 (MODEL_REGISTRY_DIR): 背景載入 + 原子切換 + 候選版本分流
+from model_registry import ModelRegistry, load_version
+# 💥 各階段耗時 / 快取命中計數 (請求 trace → /metrics)
+import metrics
+# 💥 借不到 Holistic 實例 / 無法開啟影片時不轉成「推論失敗」的結果，交給 main 回應 503 / 400
+from holistic_pool import HolisticPoolTimeoutError
+from video_source import VideoOpenError
+
+# 💥 連續手語分段 (spotting) 參數
+SPOTTING_STRIDE = int(os.getenv("SPOTTING_STRIDE", 5))                      # 視窗間隔 (保留格)
+SPOTTING_MIN_CONFIDENCE = float(os.getenv("SPOTTING_MIN_CONFIDENCE", 0.5))  # 低於此信心的格視為無手語
+SPOTTING_MIN_FRAMES = int(os.getenv("SPOTTING_MIN_FRAMES", 3))              # 片段至少的保留格數
+SAMPLE_HZ = TARGET_FPS / SAMPLE_RATE # 取樣序號 → 秒
+
+# 💥 微批次參數 (INFER_BATCH=off 時每個請求各自 model.predict)
+INFER_BATCH = os.getenv("INFER_BATCH", "on")                            # on | off
+INFER_BATCH_SIZE = int(os.getenv("INFER_BATCH_SIZE", 16))               # 單一 batch 上限
+INFER_BATCH_WAIT_MS = float(os.getenv("INFER_BATCH_WAIT_MS", 5))        # 第一筆到達後最多等待 (毫秒)
 
 # ----------------------------------------------------
 # 2. 載入模型 (💥 TCN v9-f 模型)
 # ----------------------------------------------------
-# 💥 [v9 修正] 確保載入您「效果很好」的權重檔
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "final_best_TCN_v9_model_f.h5") 
-model = None
+# 💥 [v9 修正] 確保載入您「效果很好」的權重檔 (MODEL_BACKEND=tflite / onnx 時為匯出後的檔案，MODEL_VARIANT 為量化版本)
+# MODEL_REGISTRY_DIR 設定時改由登錄目錄的 routing.json 決定版本
+# 💥 路徑在 load_v9_model() 才決定: 設定錯誤 (例如 keras + 量化版本) 不在匯入時拋出，改由 /readyz 回報原因
+MODEL_PATH = None
+MODEL_SHA256 = None # 💥 模型檔內容雜湊 (Top-3 快取鍵的一部分；未使用登錄時)
+MODEL_LOAD_ERROR = None # 💥 最近一次 load_v9_model() 失敗的原因 (成功時為 None)
+registry = ModelRegistry(batch=INFER_BATCH == "on", batch_size=INFER_BATCH_SIZE, batch_wait_ms=INFER_BATCH_WAIT_MS)
+
+def resolve_model_path():
+    """
+    實際要載入的模型: 回傳 (路徑, 版本, 量化評估結果或 None)。
+    量化版本未通過評估門檻 (check_variant) 時改用 float 模型；MODEL_BACKEND / MODEL_VARIANT 無效時拋出 ValueError。
+    """
+    path = model_path(MODEL_BACKEND, MODEL_VARIANT)
+    if MODEL_VARIANT == "float" or not os.path.exists(path):
+        return path, MODEL_VARIANT, None
+    ok, reason = check_variant(path)
+    if not ok:
+        return model_path(MODEL_BACKEND, "float"), "float", f"❌ 拒絕載入量化模型 {path}: {reason}；改用 float 模型"
+    return path, MODEL_VARIANT, f"✅ 量化模型 ({MODEL_VARIANT}) 通過評估: {reason}"
 
 def load_v9_model():
-    """在 FastAPI 啟動時調用"""
-    global model
-    print(f"正在從 {MODEL_PATH} 載入模型...")
+    """在 FastAPI 啟動時調用；失敗時回傳 False，原因見 get_load_error()"""
+    global MODEL_PATH, MODEL_LOAD_ERROR
+    MODEL_LOAD_ERROR = None
+    if registry.enabled:
+        print(f"正在從模型登錄 {registry.directory} 載入模型...")
+        if not registry.start():
+            MODEL_LOAD_ERROR = f"模型登錄 {registry.directory} 載入失敗"
+            return False
+        return True
+
+    try:
+        MODEL_PATH, variant, variant_note = resolve_model_path()
+    except ValueError as e:
+        print(f"❌ 嚴重錯誤：模型設定無效: {e}")
+        MODEL_LOAD_ERROR = str(e)
+        return False
+    if variant_note: print(variant_note)
+    print(f"正在從 {MODEL_PATH} 載入模型 ({MODEL_BACKEND})...")
     if not os.path.exists(MODEL_PATH):
         print(f"❌ 嚴重錯誤：找不到模型檔案 {MODEL_PATH}")
+        MODEL_LOAD_ERROR = f"找不到模型檔案 {MODEL_PATH}"
         return False
         
     try:
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore") # 忽略 Keras 載入警告
-            model = keras.models.load_model(MODEL_PATH)
-        print("✅ Keras (v9) 模型載入成功。")
+        version = os.path.splitext(os.path.basename(MODEL_PATH))[0]
+        registry.install(load_version(version, MODEL_BACKEND, MODEL_PATH, {"backend": MODEL_BACKEND, "variant": variant},
+                                      **registry.batch_options))
+        print(f"✅ {MODEL_BACKEND} (v9) 模型載入成功。")
         return True
     except Exception as e:
         print(f"❌ 嚴重錯誤：無法載入模型 {MODEL_PATH}。")
         print(f"錯誤訊息: {e}")
+        MODEL_LOAD_ERROR = f"無法載入模型 {MODEL_PATH}: {e}"
         return False
 
 
+def get_load_error():
+    return MODEL_LOAD_ERROR
+
+
+def is_model_loaded():
+    return registry.active is not None
+
+
+def pick_model():
+    """本次請求使用的模型版本 (有候選版本時依比例分流)；未載入時為 None"""
+    return registry.pick()
+
+
+def get_model_hash():
+    """
+    URL 結果快取用的模型雜湊 (未在此行程載入模型時直接計算，例如 process 模式的主行程)。
+    使用登錄時為 active 版本的雜湊；候選版本分流中回傳 None (不快取)。
+    """
+    global MODEL_SHA256
+    if registry.enabled:
+        return registry.routing_hash()
+    if MODEL_SHA256 is None:
+        # 💥 與子行程相同的 float 退回規則，避免以被拒絕的量化檔雜湊快取 float 模型的結果
+        try:
+            path = MODEL_PATH or resolve_model_path()[0]
+        except ValueError:
+            return None
+        if os.path.exists(path):
+            MODEL_SHA256 = hash_file(path)
+    return MODEL_SHA256
+
+
+def close_models():
+    registry.close()
+
+
 # ----------------------------------------------------
 # 3. 主推論函數 (💥 v9 匹配版)
 # ----------------------------------------------------
 
-def predict(video_path: str) -> list:
+def predict_features(features, version=None) -> list:
+    """
+    (v9) 對 (T, 636) 特徵序列進行預測，返回 Top-3 結果列表。
+    version: pick_model() 取得的模型版本 (None 時在此挑選)。
+    """
+    if features is None or features.shape[0] == 0:
+        return [{"label": "影格不足或手部未偵測", "confidence": 0.0}]
+    version = version or pick_model()
+    if version is None:
+        return [{"label": "模型尚未載入", "confidence": 0.0}]
+    
+    # 💥 [v9 修正] 在此處執行 Padding (匹配 v9 腳本)
+    with metrics.stage("pad"):
+        padded_features = pad_feature_batch([features])
+    
+    # 預測 (💥 INFER_BATCH=on 時與同版本、同時到達的請求合併成一個 batch；含等待湊批的時間)
+    with metrics.stage("predict"):
+        outputs = version.predict_one(padded_features[0])
+    
+    # Top-3
+    probabilities = outputs
+    top3_indices = np.argsort(probabilities)[::-1][:3]
+    
+    return [
+        {
+            # 💥 [FIX] 修正：使用 CLASS_NAMES (原為 FINAL_CLASS_NAMES)
+            "label": CLASS_NAMES[idx],
+            "confidence": round(probabilities[idx].item(), 4)
+        }
+        for idx in top3_indices
+    ]
+
+def load_features(video_path, frames=None, content_hash=None, pipeline=None):
+    """
+    提取特徵序列 (先查特徵快取): 回傳 (features, 取樣序號)，全被過濾時為 (None, None)。
+    content_hash / pipeline 為 None 時不使用快取。
+    """
+    if content_hash:
+        with metrics.stage("cache"):
+            hit, features, indices = feature_cache.get_features(content_hash, pipeline)
+        metrics.count("feature_cache_hit" if hit else "feature_cache_miss")
+        if hit:
+            print(f"⚡ 快取命中 (特徵): {content_hash[:12]}")
+            return features, indices
+
+    with metrics.stage("extract"): # 💥 整段特徵提取 (decode / holistic / similarity ... 為其中的細項)
+        features, indices = extract_feature_sequence(video_path, frames=frames, with_indices=True)
+    if content_hash:
+        with metrics.stage("cache"):
+            feature_cache.put_features(content_hash, pipeline, features, indices)
+    return features, indices
+
+def predict(video_path: str, frames=None, source: str = "capture") -> list:
     """
     (v9 匹配版) 對影片路徑進行預測，返回 Top-3 結果列表。
+    frames: 可選的 BGR 影格迭代器 (例如 ffmpeg 管線)，提供時不再開啟 video_path。
+    source: 影格來源 (capture | ffmpeg)，決定特徵快取的管線鍵。
+    同一影片內容 (sha256) 再次請求時直接回傳快取的 Top-3 / 特徵。
     """
-    global model
-    if model is None:
+    version = pick_model() # 💥 整個請求使用同一個版本 (Top-3 快取鍵也用它的雜湊)
+    if version is None:
         return [{"label": "模型尚未載入", "confidence": 0.0}]
 
     try:
-        # 1. 提取特徵序列 (返回原始序列)
-        features = extract_feature_sequence(video_path)
-        
-        if features is None or features.shape[0] == 0:
-            return [{"label": "影格不足或手部未偵測", "confidence": 0.0}]
-        
-        # 2. 💥 [v9 修正] 在此處執行 Padding (匹配 v9 腳本)
-        padded_features = pad_sequences([features], maxlen=MAX_SEQ_LENGTH, padding='post', dtype='float32')
-        
-        # 3. 預測
-        outputs = model.predict(padded_features, verbose=0)[0]
-        
-        # 4. Top-3
-        probabilities = outputs
-        top3_indices = np.argsort(probabilities)[::-1][:3]
-        
-        top3_results = [
-            {
-                # 💥 [FIX] 修正：使用 CLASS_NAMES (原為 FINAL_CLASS_NAMES)
-                "label": CLASS_NAMES[idx],
-                "confidence": round(probabilities[idx].item(), 4)
-            }
-            for idx in top3_indices
-        ]
+        with metrics.stage("hash"):
+            content_hash = hash_file(video_path) if feature_cache.enabled else None
+        pipeline = pipeline_id(source)
+
+        # 0. 💥 快取: Top-3 (同內容 + 管線 + 模型)
+        if content_hash:
+            with metrics.stage("cache"):
+                cached = feature_cache.get_result(content_hash, pipeline, version.sha256)
+            metrics.count("result_cache_miss" if cached is None else "result_cache_hit")
+            if cached is not None:
+                print(f"⚡ 快取命中 (Top-3): {content_hash[:12]}")
+                return cached
+
+        # 1. 提取特徵序列 (返回原始序列；同內容 + 管線時讀取特徵快取)
+        features, _ = load_features(video_path, frames, content_hash, pipeline)
+
+        # 2. Padding + 預測 + Top-3
+        top3_results = predict_features(features, version)
+        if content_hash:
+            with metrics.stage("cache"):
+                feature_cache.put_result(content_hash, pipeline, version.sha256, top3_results)
 
         return top3_results
 
+    except (HolisticPoolTimeoutError, VideoOpenError):
+        raise
     except Exception as e:
         print(f"❌ 嚴重推論錯誤: {e}")
-        return [{"label": f"❌ 伺服器推論失敗: {str(e)}", "confidence": 0.0, "error": str(e)}]
\ No newline at end of file
+        return [{"label": f"❌ 伺服器推論失敗: {str(e)}", "confidence": 0.0, "error": str(e)}]
+
+# ----------------------------------------------------
+# 4. 連續手語分段 (💥 spotting: 滑動視窗 + 批次推論)
+# ----------------------------------------------------
+def predict_windows(features, version, stride=SPOTTING_STRIDE):
+    """
+    以 MAX_SEQ_LENGTH 格視窗、每 stride 格滑動一次 (最後一個視窗對齊序列結尾)；
+    所有視窗疊成一個 batch 一次 model.predict。回傳 (視窗起點, (W, 類別數) 機率)。
+    """
+    length = features.shape[0]
+    if length <= MAX_SEQ_LENGTH:
+        starts = [0]
+    else:
+        starts = list(range(0, length - MAX_SEQ_LENGTH + 1, max(1, stride)))
+        if starts[-1] != length - MAX_SEQ_LENGTH:
+            starts.append(length - MAX_SEQ_LENGTH)
+    with metrics.stage("pad"):
+        windows = pad_feature_batch([features[start:start + MAX_SEQ_LENGTH] for start in starts])
+    with metrics.stage("predict"):
+        return starts, version.predict_batch(windows)
+
+def spot_signs(features, indices, version, stride=SPOTTING_STRIDE, min_confidence=SPOTTING_MIN_CONFIDENCE,
+               min_frames=SPOTTING_MIN_FRAMES) -> list:
+    """
+    每個保留格的機率 = 涵蓋它的所有視窗機率平均；取最高類別，信心不足的格視為空白，
+    連續同類別的格合併為一個片段。回傳 [{"start", "end" (秒), "label", "confidence", "frames"}]。
+    """
+    starts, probabilities = predict_windows(features, version, stride)
+    length = features.shape[0]
+    frame_probabilities = np.zeros((length, len(CLASS_NAMES)))
+    coverage = np.zeros(length)
+    for start, window_probabilities in zip(starts, probabilities):
+        end = min(start + MAX_SEQ_LENGTH, length)
+        frame_probabilities[start:end] += window_probabilities
+        coverage[start:end] += 1
+    frame_probabilities /= coverage[:, None]
+
+    labels = frame_probabilities.argmax(axis=1)
+    confidences = frame_probabilities.max(axis=1)
+    labels[confidences < min_confidence] = -1
+
+    segments = []
+    boundaries = np.flatnonzero(np.diff(labels)) + 1
+    for first, last in zip(np.r_[0, boundaries], np.r_[boundaries, length]):
+        label = labels[first]
+        if label < 0 or last - first < min_frames: continue
+        segments.append({
+            "start": round(indices[first] / SAMPLE_HZ, 2),
+            "end": round((indices[last - 1] + 1) / SAMPLE_HZ, 2),
+            "label": CLASS_NAMES[label],
+            "confidence": round(float(confidences[first:last].mean()), 4),
+            "frames": int(last - first),
+        })
+    return segments
+
+def spot(video_path: str, frames=None, source: str = "capture") -> dict:
+    """
+    (連續手語) 對整支影片做分段辨識，返回 {"segments": [...]}；
+    與 predict 共用特徵快取，失敗時加上 "error"。
+    """
+    version = pick_model()
+    if version is None:
+        return {"segments": [], "error": "模型尚未載入"}
+
+    try:
+        with metrics.stage("hash"):
+            content_hash = hash_file(video_path) if feature_cache.enabled else None
+        features, indices = load_features(video_path, frames, content_hash, pipeline_id(source))
+        if features is None or features.shape[0] == 0:
+            return {"segments": [], "error": "影格不足或手部未偵測"}
+        return {"segments": spot_signs(features, indices, version)}
+
+    except (HolisticPoolTimeoutError, VideoOpenError):
+        raise
+    except Exception as e:
+        print(f"❌ 嚴重分段推論錯誤: {e}")
+        return {"segments": [], "error": str(e)}
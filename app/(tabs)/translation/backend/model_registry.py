@@ -0,0 +1,293 @@
+# //Soul/app/(tabs)/translation/backend/model_registry.py
+# (v9 - 版本化模型登錄: 目錄內多個版本、背景載入 + 暖機後原子切換、候選版本依比例分流 (canary))
+#
+# 目錄結構 (MODEL_REGISTRY_DIR):
+#   <目錄>/<版本>/manifest.json   {"backend": "keras", "file": "model.h5", "feature_pipeline": "v9-f.1",
+#                                  "input_shape": [40, 636], "variant": "float"}
+#   <目錄>/routing.json           {"active": "<版本>", "candidate": "<版本>" 或 null, "candidate_percent": 10}
+# 每個行程 (uvicorn worker / process 模式子行程) 定期檢查 routing.json，變更時在背景載入並暖機新版本，完成後才切換。
+
+import os
+import json
+import time
+import uuid
+import random
+import threading
+
+import numpy as np
+
+from feature_loader import FEATURE_PIPELINE_VERSION, MAX_SEQ_LENGTH, POSE_DIMENSION, CLASS_NAMES
+from feature_cache import hash_file
+from model_runtime import load_runner, check_variant, warm_up, MODEL_RUNNERS, QUANT_VARIANTS
+from micro_batch import MicroBatcher, BatcherClosedError
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "")                # 空字串 = 只使用 MODEL_PATH 的單一模型
+MODEL_REGISTRY_POLL = float(os.getenv("MODEL_REGISTRY_POLL", 5))        # routing.json 檢查間隔 (秒，0 = 只在啟動時讀取)
+ROUTING_FILE = "routing.json"
+MANIFEST_FILE = "manifest.json"
+
+
+class ModelVersionError(Exception):
+    """版本不存在、manifest 錯誤或與目前的特徵管線不相容"""
+
+# ----------------------------------------------------
+# 2. 單一版本 (執行後端 + 自己的微批次)
+# ----------------------------------------------------
+class ModelVersion:
+    """
+    已載入且暖機完成的一個版本。每個版本有自己的 MicroBatcher，
+    分流到不同版本的請求不會被合併進同一個 batch。
+    """
+
+    def __init__(self, version, runner, path, manifest=None, batch=True, batch_size=16, batch_wait_ms=5.0):
+        self.version = version
+        self.runner = runner
+        self.path = path
+        self.sha256 = hash_file(path) if path else None
+        self.manifest = manifest or {}
+        self.batch = batch
+        self.batcher = MicroBatcher(self.predict_batch, batch_size, batch_wait_ms, name=f"v9-batcher-{version}")
+        self.closed = False
+
+    def predict_batch(self, batch):
+        """(B, 40, 636) → (B, 類別數) 機率"""
+        return self.runner.predict(batch, verbose=0)
+
+    def predict_one(self, padded):
+        """單筆 (40, 636)；啟用微批次時與同版本、同時到達的請求合併"""
+        if self.batch and not self.closed:
+            try:
+                return self.batcher.submit(padded).result()
+            except BatcherClosedError:
+                pass # 檢查 closed 之後才被關閉 (切換中): 改為單筆執行
+        return self.predict_batch(padded[None])[0]
+
+    def close(self):
+        """切換後呼叫: 已排隊的請求會處理完；之後才到的請求直接單筆執行"""
+        self.closed = True
+        self.batcher.close()
+
+    def describe(self):
+        return {"version": self.version, "sha256": self.sha256, "path": self.path,
+                "backend": self.manifest.get("backend"), "variant": self.manifest.get("variant", "float"),
+                "feature_pipeline": self.manifest.get("feature_pipeline", FEATURE_PIPELINE_VERSION)}
+
+
+def check_manifest(version, manifest):
+    """v9 特徵固定為 40 格 x 636 維；版本必須綁定目前的特徵管線"""
+    if manifest.get("backend") not in MODEL_RUNNERS:
+        raise ModelVersionError(f"{version}: 未知的 backend {manifest.get('backend')} (可用: {', '.join(MODEL_RUNNERS)})")
+    if manifest.get("variant", "float") not in QUANT_VARIANTS:
+        raise ModelVersionError(f"{version}: 未知的 variant {manifest.get('variant')} (可用: {', '.join(QUANT_VARIANTS)})")
+    if manifest.get("feature_pipeline") != FEATURE_PIPELINE_VERSION:
+        raise ModelVersionError(f"{version}: 特徵管線 {manifest.get('feature_pipeline')} 與目前的 {FEATURE_PIPELINE_VERSION} 不符")
+    if list(manifest.get("input_shape", [])) != [MAX_SEQ_LENGTH, POSE_DIMENSION]:
+        raise ModelVersionError(f"{version}: 輸入形狀 {manifest.get('input_shape')} 應為 [{MAX_SEQ_LENGTH}, {POSE_DIMENSION}]")
+
+
+def load_version(version, backend, path, manifest=None, batch=True, batch_size=16, batch_wait_ms=5.0):
+    """載入 + 形狀檢查 + 暖機；量化版本需通過評估門檻 (check_variant)"""
+    variant = (manifest or {}).get("variant", "float")
+    if variant != "float":
+        ok, reason = check_variant(path)
+        if not ok:
+            raise ModelVersionError(f"{version}: 拒絕載入量化模型: {reason}")
+
+    start = time.perf_counter()
+    runner = load_runner(backend, path)
+    outputs = runner.predict(np.zeros((1, MAX_SEQ_LENGTH, POSE_DIMENSION), dtype=np.float32), verbose=0)
+    if np.shape(outputs) != (1, len(CLASS_NAMES)):
+        raise ModelVersionError(f"{version}: 輸出形狀 {np.shape(outputs)} 應為 (1, {len(CLASS_NAMES)})")
+    # 💥 暖機: 追蹤 / 編譯在切換前完成，第一個請求只付前向傳播的成本
+    sizes = warm_up(runner, (MAX_SEQ_LENGTH, POSE_DIMENSION), batch_size if batch else 1)
+    print(f"✅ 模型版本 {version} ({backend}) 載入並暖機完成: batch {sizes} ({time.perf_counter() - start:.2f} s)")
+    return ModelVersion(version, runner, path, manifest, batch, batch_size, batch_wait_ms)
+
+# ----------------------------------------------------
+# 3. 登錄 + 分流
+# ----------------------------------------------------
+class ModelRegistry:
+    """
+    active: 預設版本；candidate: 以 candidate_percent% 的機率分流的候選版本。
+    請求開始時呼叫 pick() 取得一個版本並全程使用 (快取鍵、批次都跟著該版本)。
+    切換只替換參考 (鎖內)，進行中的請求繼續使用舊版本直到結束。
+    """
+
+    def __init__(self, directory=MODEL_REGISTRY_DIR, poll_interval=MODEL_REGISTRY_POLL,
+                 batch=True, batch_size=16, batch_wait_ms=5.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.batch_options = dict(batch=batch, batch_size=batch_size, batch_wait_ms=batch_wait_ms)
+        self.active = None
+        self.candidate = None
+        self.candidate_percent = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._routing_mtime = None
+        self._hashes = {} # 路徑 → (mtime, sha256)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    # --- 分流 ---
+    def pick(self):
+        """回傳本次請求使用的 ModelVersion (尚未載入時為 None)"""
+        with self._lock:
+            active, candidate, percent = self.active, self.candidate, self.candidate_percent
+        if candidate is not None and random.random() * 100 < percent:
+            return candidate
+        return active
+
+    def install(self, active, candidate=None, candidate_percent=0.0):
+        """原子切換；不再被參考的舊版本關閉其微批次"""
+        with self._lock:
+            previous = {self.active, self.candidate}
+            self.active, self.candidate = active, candidate
+            self.candidate_percent = candidate_percent if candidate is not None else 0.0
+            current = {self.active, self.candidate}
+        for version in previous - current - {None}:
+            version.close()
+
+    # --- 目錄 ---
+    def _version_dir(self, version):
+        path = os.path.realpath(os.path.join(self.directory, version))
+        if os.path.dirname(path) != os.path.realpath(self.directory):
+            raise ModelVersionError(f"不合法的版本名稱: {version}")
+        return path
+
+    def read_manifest(self, version):
+        try:
+            with open(os.path.join(self._version_dir(version), MANIFEST_FILE), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ModelVersionError(f"{version}: 無法讀取 {MANIFEST_FILE} ({e})")
+        check_manifest(version, manifest)
+        return manifest
+
+    def available(self):
+        """目錄內所有版本的 manifest (不相容的版本附上錯誤原因)"""
+        if not self.enabled or not os.path.isdir(self.directory): return {}
+        versions = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not os.path.isdir(os.path.join(self.directory, name)): continue
+            try:
+                versions[name] = self.read_manifest(name)
+            except ModelVersionError as e:
+                versions[name] = {"error": str(e)}
+        return versions
+
+    def read_routing(self):
+        with open(os.path.join(self.directory, ROUTING_FILE), "r", encoding="utf-8") as f:
+            routing = json.load(f)
+        return {"active": routing["active"], "candidate": routing.get("candidate"),
+                "candidate_percent": float(routing.get("candidate_percent", 0))}
+
+    def write_routing(self, active, candidate=None, candidate_percent=0.0):
+        """先檢查 manifest，再以暫存檔 + os.replace 寫入；所有行程於下次檢查時套用"""
+        if not 0 <= candidate_percent <= 100:
+            raise ModelVersionError(f"candidate_percent 必須介於 0 與 100: {candidate_percent}")
+        for version in filter(None, (active, candidate)):
+            self.read_manifest(version)
+        routing = {"active": active, "candidate": candidate, "candidate_percent": candidate_percent if candidate else 0}
+        path = os.path.join(self.directory, ROUTING_FILE)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(routing, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+        return routing
+
+    def _load(self, version):
+        manifest = self.read_manifest(version)
+        path = os.path.join(self._version_dir(version), manifest["file"])
+        return load_version(version, manifest["backend"], path, manifest, **self.batch_options)
+
+    def refresh(self, force=False):
+        """
+        routing.json 有變更時: 載入尚未載入的版本 (已載入的沿用)，全部暖機完成後一次切換。
+        任何版本載入失敗則維持目前的路由。回傳是否切換。
+        """
+        with self._refresh_lock:
+            path = os.path.join(self.directory, ROUTING_FILE)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if not force and mtime == self._routing_mtime: return False
+                routing = self.read_routing()
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ 無法讀取模型路由 {path}: {e}")
+                return False
+            self._routing_mtime = mtime
+
+            with self._lock:
+                loaded = {v.version: v for v in (self.active, self.candidate) if v is not None}
+            try:
+                active = loaded.get(routing["active"]) or self._load(routing["active"])
+                candidate = None
+                if routing["candidate"]:
+                    candidate = loaded.get(routing["candidate"]) or self._load(routing["candidate"])
+            except Exception as e:
+                print(f"❌ 模型版本載入失敗，維持目前路由: {e}")
+                return False
+
+            self.install(active, candidate, routing["candidate_percent"])
+            print(f"🔀 模型路由: active={active.version}"
+                  + (f", candidate={candidate.version} ({routing['candidate_percent']:g}%)" if candidate else ""))
+            return True
+
+    def refresh_async(self):
+        threading.Thread(target=self.refresh, kwargs={"force": True}, name="v9-model-refresh", daemon=True).start()
+
+    def start(self):
+        """啟動時同步載入目前路由，之後由背景執行緒定期檢查"""
+        self.refresh(force=True)
+        if self.poll_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name="v9-model-registry", daemon=True)
+            self._thread.start()
+        return self.active is not None
+
+    def _poll(self):
+        while not self._stopped.wait(self.poll_interval):
+            self.refresh()
+
+    def routing_hash(self):
+        """
+        結果快取 (URL 快取) 用的模型識別: active 版本的 sha256；有候選版本分流時為 None (不快取)。
+        只讀 routing.json 與 manifest，不需在此行程載入模型 (process 模式的主行程)。
+        """
+        try:
+            routing = self.read_routing()
+            if routing["candidate"] and routing["candidate_percent"] > 0: return None
+            manifest = self.read_manifest(routing["active"])
+            return self._file_hash(os.path.join(self._version_dir(routing["active"]), manifest["file"]))
+        except (OSError, ValueError, KeyError, ModelVersionError):
+            return None
+
+    def _file_hash(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._hashes.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = self._hashes[path] = (mtime, hash_file(path))
+        return cached[1]
+
+    def describe(self):
+        with self._lock:
+            active, candidate, percent = self.active, self.candidate, self.candidate_percent
+        return {
+            "directory": self.directory or None,
+            "active": active.describe() if active else None,
+            "candidate": candidate.describe() if candidate else None,
+            "candidate_percent": percent,
+            "available": self.available(),
+        }
+
+    def close(self):
+        self._stopped.set()
+        self.install(None)
@@ -0,0 +1,210 @@
+# //Soul/app/(tabs)/translation/backend/model_runtime.py
+# (v9 - 模型執行後端: Keras (.h5) / TFLite / ONNX Runtime，輸出皆為 (B, 類別數) 機率)
+
+import os
+import json
+import threading
+import warnings
+
+import numpy as np
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "keras")     # keras | tflite | onnx (後兩者需先執行 tools/export_model.py)
+MODEL_STEM = os.path.join(BACKEND_DIR, "final_best_TCN_v9_model_f")
+MODEL_PATHS = {
+    "keras": os.getenv("KERAS_MODEL_PATH", MODEL_STEM + ".h5"),
+    "tflite": os.getenv("TFLITE_MODEL_PATH", MODEL_STEM + ".tflite"),
+    "onnx": os.getenv("ONNX_MODEL_PATH", MODEL_STEM + ".onnx"),
+}
+RUNTIME_THREADS = int(os.getenv("RUNTIME_THREADS", 0))   # TFLite / ONNX 的運算執行緒數 (0 = 由執行環境決定)
+
+# 💥 Keras 後端的呼叫方式與 TensorFlow 執行緒
+KERAS_CALL = os.getenv("KERAS_CALL", "function")                 # function (固定簽名 tf.function) | predict (model.predict)
+KERAS_JIT = os.getenv("KERAS_JIT", "off")                        # on: XLA 編譯 (batch 補齊到 2 的次方，避免每種大小重新編譯)
+TF_INTRA_OP_THREADS = int(os.getenv("TF_INTRA_OP_THREADS", 0))   # 單一運算內的執行緒數 (0 = TensorFlow 預設)
+TF_INTER_OP_THREADS = int(os.getenv("TF_INTER_OP_THREADS", 0))   # 可同時執行的運算數 (0 = TensorFlow 預設)
+MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", 2))       # 啟動時每種 batch 大小的暖機次數 (0 = 不暖機)
+
+# 💥 量化版本 (只適用 tflite): 需先以 tools/eval_quantized.py 評估，一致率達門檻才會載入
+QUANT_VARIANTS = ("float", "dynamic", "float16", "int8")
+MODEL_VARIANT = os.getenv("MODEL_VARIANT", "float")
+QUANT_MIN_TOP1 = float(os.getenv("QUANT_MIN_TOP1", 0.98))   # 與 float 模型 Top-1 相同的比例下限
+QUANT_MIN_TOP3 = float(os.getenv("QUANT_MIN_TOP3", 0.95))   # 與 float 模型 Top-3 集合相同的比例下限
+
+# ----------------------------------------------------
+# 2. 執行後端 (predict 與 keras Model.predict 相同的呼叫方式)
+# ----------------------------------------------------
+def configure_tf_threads():
+    """必須在 TensorFlow 執行第一個運算前設定；之後再設定會拋出 RuntimeError"""
+    import tensorflow as tf
+    try:
+        if TF_INTRA_OP_THREADS: tf.config.threading.set_intra_op_parallelism_threads(TF_INTRA_OP_THREADS)
+        if TF_INTER_OP_THREADS: tf.config.threading.set_inter_op_parallelism_threads(TF_INTER_OP_THREADS)
+    except RuntimeError as e:
+        print(f"⚠️ TensorFlow 執行緒設定未生效 (執行環境已初始化): {e}")
+
+
+class KerasRunner:
+    """
+    原始 .h5 (載入完整 TensorFlow + Keras)。
+    function: 以 (None, 40, 636) 固定簽名的 tf.function 直接呼叫 model(x, training=False)，
+    只追蹤一次，不再經過 model.predict 每次建立資料轉接器與 step 迴圈的成本。
+    """
+
+    def __init__(self, path, call=KERAS_CALL, jit=KERAS_JIT == "on"):
+        import tensorflow as tf
+        from tensorflow import keras
+        if call not in ("function", "predict"):
+            raise ValueError(f"未知的 KERAS_CALL: {call} (可用: function, predict)")
+        configure_tf_threads()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore") # 忽略 Keras 載入警告
+            self.model = keras.models.load_model(path)
+        self.call = call
+        self.jit = jit and call == "function"
+        self._forward = tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec((None,) + tuple(self.model.input_shape[1:]), tf.float32)],
+            jit_compile=self.jit,
+        )
+
+    def predict(self, batch, verbose=0):
+        if self.call == "predict":
+            return self.model.predict(batch, verbose=verbose)
+        batch = np.asarray(batch, dtype=np.float32)
+        count = batch.shape[0]
+        if self.jit and count & (count - 1):
+            # XLA 依輸入形狀編譯: 補 0 到 2 的次方，只會出現 log2(最大 batch) 種形狀
+            batch = np.concatenate([batch, np.zeros((bucket_size(count) - count,) + batch.shape[1:], np.float32)])
+        return self._forward(batch).numpy()[:count]
+
+
+def bucket_size(count):
+    return 1 << max(0, count - 1).bit_length()
+
+
+class TFLiteRunner:
+    """
+    tools/export_model.py 匯出的 .tflite (BN 已折疊進卷積 / Dense)。
+    優先使用只有直譯器的 tflite_runtime (選用套件，見 README)；未安裝時退回 tf.lite，
+    仍可推論，但會匯入完整 TensorFlow，省不到啟動時間與記憶體。
+    Interpreter 不是執行緒安全的，以鎖保護；batch 大小改變時才重新配置張量。
+    """
+
+    def __init__(self, path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            print("⚠️ 未安裝 tflite-runtime，改用 tensorflow 的 tf.lite (需匯入完整 TensorFlow，啟動時間與記憶體不會減少)")
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=RUNTIME_THREADS or None)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.batch_size = None
+        self._lock = threading.Lock()
+
+    def predict(self, batch, verbose=0):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape[0] != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self.batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self.input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+class OnnxRunner:
+    """tools/export_model.py 匯出的 .onnx，以 onnxruntime (選用套件，見 README) 在 CPU 執行 (InferenceSession.run 可多執行緒呼叫)"""
+
+    def __init__(self, path):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("MODEL_BACKEND=onnx 需要 onnxruntime (pip install onnxruntime)") from e
+        options = onnxruntime.SessionOptions()
+        if RUNTIME_THREADS: options.intra_op_num_threads = RUNTIME_THREADS
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch, verbose=0):
+        return self.session.run(None, {self.input_name: np.asarray(batch, dtype=np.float32)})[0]
+
+
+MODEL_RUNNERS = {
+    "keras": KerasRunner,
+    "tflite": TFLiteRunner,
+    "onnx": OnnxRunner,
+}
+
+
+def model_path(backend=MODEL_BACKEND, variant=MODEL_VARIANT):
+    """float: MODEL_PATHS；量化版本: <tflite 檔名>.<variant>.tflite"""
+    if backend not in MODEL_PATHS:
+        raise ValueError(f"未知的 MODEL_BACKEND: {backend} (可用: {', '.join(MODEL_RUNNERS)})")
+    if variant not in QUANT_VARIANTS:
+        raise ValueError(f"未知的 MODEL_VARIANT: {variant} (可用: {', '.join(QUANT_VARIANTS)})")
+    if variant == "float":
+        return MODEL_PATHS[backend]
+    if backend != "tflite":
+        raise ValueError(f"量化版本 {variant} 只支援 MODEL_BACKEND=tflite")
+    return f"{os.path.splitext(MODEL_PATHS['tflite'])[0]}.{variant}.tflite"
+
+
+def warm_up(runner, input_shape, max_batch, runs=MODEL_WARMUP_RUNS):
+    """
+    啟動時以全 0 batch 先跑幾次: tf.function 追蹤 / XLA 編譯、TFLite 張量配置、oneDNN 核心選擇
+    都發生在第一次呼叫，不該由第一個真實請求負擔。回傳暖機的 batch 大小。
+    """
+    if runs <= 0: return []
+    if isinstance(runner, KerasRunner) and runner.jit:
+        sizes = sorted({bucket_size(n) for n in range(1, max_batch + 1)})
+    else:
+        sizes = sorted({1, max_batch})
+    for size in sizes:
+        batch = np.zeros((size,) + tuple(input_shape), dtype=np.float32)
+        for _ in range(runs):
+            runner.predict(batch)
+    return sizes
+
+
+def eval_report_path(path):
+    return path + ".eval.json"
+
+
+def check_variant(path, min_top1=QUANT_MIN_TOP1, min_top3=QUANT_MIN_TOP3):
+    """
+    量化版本的載入門檻: 需有 tools/eval_quantized.py 寫下的評估報告，報告對應同一個檔案 (sha256)，
+    且與 float 模型的 Top-1 / Top-3 一致率不低於門檻。回傳 (可否載入, 原因)。
+    """
+    from feature_cache import hash_file
+    try:
+        with open(eval_report_path(path), "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return False, "找不到評估報告 (請先執行 tools/eval_quantized.py)"
+    # 💥 截斷或手動修改過的報告 (缺欄位 / 型別錯誤) 視同未通過，不在暖機執行緒中拋出
+    try:
+        if report.get("model_sha256") != hash_file(path):
+            return False, "評估報告與模型檔不符 (模型已重新匯出)"
+        top1, top3 = float(report["top1_agreement"]), float(report["top3_agreement"])
+        samples = int(report["samples"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        return False, f"評估報告格式錯誤 ({type(e).__name__}: {e})"
+    if top1 < min_top1:
+        return False, f"Top-1 一致率 {top1:.1%} < {min_top1:.1%}"
+    if top3 < min_top3:
+        return False, f"Top-3 一致率 {top3:.1%} < {min_top3:.1%}"
+    return True, f"Top-1 {top1:.1%} / Top-3 {top3:.1%} ({samples} 筆)"
+
+
+def load_runner(backend=MODEL_BACKEND, path=None):
+    if backend not in MODEL_RUNNERS:
+        raise ValueError(f"未知的 MODEL_BACKEND: {backend} (可用: {', '.join(MODEL_RUNNERS)})")
+    return MODEL_RUNNERS[backend](path or model_path(backend))
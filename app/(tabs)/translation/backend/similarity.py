@@ -0,0 +1,110 @@
+# //Soul/app/(tabs)/translation/backend/similarity.py
+# (v9 - 重複影格過濾的相似度後端: skimage SSIM / OpenCV box-filter SSIM)
+
+import os
+import cv2
+import numpy as np
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+# opencv: 與 skimage 相同公式的 box-filter SSIM (預設)；skimage: v9 原始實作
+SSIM_BACKEND = os.getenv("SSIM_BACKEND", "opencv")
+
+# skimage.metrics.structural_similarity 的預設參數 (v9 僅傳入 data_range=255)
+SSIM_WIN_SIZE = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+SSIM_DATA_RANGE = 255
+
+# ----------------------------------------------------
+# 2. 後端
+# ----------------------------------------------------
+# 每個後端提供:
+#   prepare(mask, hands_pts) -> state   每個通過像素檢查的影格呼叫一次 (mask 為共用緩衝區，需自行複製)
+#   score(prev_state, state) -> float   與上一個保留影格的相似度 (>= similarity_threshold 視為重複)
+
+class SkimageSSIM:
+    """v9 原始實作: skimage.metrics.structural_similarity (延遲導入 scikit-image)"""
+    name = "skimage"
+
+    def __init__(self):
+        from skimage.metrics import structural_similarity
+        self._ssim = structural_similarity
+
+    def prepare(self, mask, hands_pts):
+        return mask.copy()
+
+    def score(self, prev_state, state):
+        return float(self._ssim(prev_state, state, data_range=SSIM_DATA_RANGE))
+
+
+class OpenCVSSIM:
+    """
+    以 cv2.boxFilter 重現 skimage 的預設 SSIM: 7x7 均勻視窗、樣本共變異數 (NP / (NP - 1))、
+    K1=0.01、K2=0.03，平均時裁掉邊緣 3 px。
+    骨架遮罩大部分是 0: 兩張圖在視窗內皆為 0 的位置 SSIM 恰為 1，
+    因此只在兩格骨架的聯集外框 (外擴視窗) 內計算，其餘位置以 1 計入平均。
+    """
+    name = "opencv"
+
+    def __init__(self, win_size=SSIM_WIN_SIZE, data_range=SSIM_DATA_RANGE, k1=SSIM_K1, k2=SSIM_K2):
+        self.ksize = (win_size, win_size)
+        self.pad = (win_size - 1) // 2
+        np_ = win_size * win_size
+        self.cov_norm = np_ / (np_ - 1)
+        self.c1 = (k1 * data_range) ** 2
+        self.c2 = (k2 * data_range) ** 2
+
+    def _mean(self, image):
+        return cv2.boxFilter(image, cv2.CV_64F, self.ksize, normalize=True, borderType=cv2.BORDER_REFLECT)
+
+    def prepare(self, mask, hands_pts):
+        return mask.copy(), cv2.boundingRect(mask)
+
+    def _ssim_map(self, x, y):
+        ux, uy = self._mean(x), self._mean(y)
+        vx = self.cov_norm * (self._mean(x * x) - ux * ux)
+        vy = self.cov_norm * (self._mean(y * y) - uy * uy)
+        vxy = self.cov_norm * (self._mean(x * y) - ux * uy)
+        numerator = (2 * ux * uy + self.c1) * (2 * vxy + self.c2)
+        denominator = (ux * ux + uy * uy + self.c1) * (vx + vy + self.c2)
+        return numerator / denominator
+
+    def score(self, prev_state, state):
+        (x, (ax, ay, aw, ah)), (y, (bx, by, bw, bh)) = prev_state, state
+        height, width = x.shape
+        p = self.pad
+        valid = (width - 2 * p) * (height - 2 * p)
+        if aw * ah == 0 and bw * bh == 0: return 1.0
+        if aw * ah == 0: ax, ay, aw, ah = bx, by, bw, bh
+        if bw * bh == 0: bx, by, bw, bh = ax, ay, aw, ah
+        left, top = min(ax, bx), min(ay, by)
+        right, bottom = max(ax + aw, bx + bw), max(ay + ah, by + bh)
+
+        # 輸出範圍: 外框外擴 p (更遠處視窗內皆為 0)；輸入再外擴 p，讓輸出位置的視窗完整落在裁切內
+        out_x0, out_y0 = max(left - p, p), max(top - p, p)
+        out_x1, out_y1 = min(right + p, width - p), min(bottom + p, height - p)
+        if out_x0 >= out_x1 or out_y0 >= out_y1: return 1.0
+        in_x0, in_y0 = max(out_x0 - p, 0), max(out_y0 - p, 0)
+        in_x1, in_y1 = min(out_x1 + p, width), min(out_y1 + p, height)
+
+        crop = (slice(in_y0, in_y1), slice(in_x0, in_x1))
+        s = self._ssim_map(x[crop].astype(np.float64), y[crop].astype(np.float64))
+        s = s[out_y0 - in_y0:out_y1 - in_y0, out_x0 - in_x0:out_x1 - in_x0]
+        return float(1.0 - np.sum(1.0 - s, dtype=np.float64) / valid)
+
+
+SIMILARITY_BACKENDS = {
+    "skimage": SkimageSSIM,
+    "opencv": OpenCVSSIM,
+}
+
+def get_similarity_backend(name=SSIM_BACKEND):
+    """依名稱建立相似度後端 (預設讀取 SSIM_BACKEND)；已是後端物件則直接回傳"""
+    if not isinstance(name, str):
+        return name
+    backend = SIMILARITY_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"未知的 SSIM_BACKEND: {name} (可用: {', '.join(SIMILARITY_BACKENDS)})")
+    return backend()
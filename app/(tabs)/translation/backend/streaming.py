@@ -0,0 +1,182 @@
+# //Soul/app/(tabs)/translation/backend/streaming.py
+# (v9 - WebSocket 串流辨識: 影格邊收邊取樣 → 逐格 v9 特徵 → 最近 40 格滑動視窗的 Top-3)
+
+import os
+import queue
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+from feature_loader import FeatureExtractor, MAX_SEQ_LENGTH, TARGET_FPS
+from video_source import iter_sampled_frames
+from holistic_pool import HolisticPool
+from inference_pool import InferenceExecutor, QueueFullError, InferenceTimeoutError
+import model_infer
+import metrics
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+STREAM_MAX_SESSIONS = int(os.getenv("STREAM_MAX_SESSIONS", 4))   # 同時進行的串流連線上限 (每條佔一個 Holistic + 一條執行緒)
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 64))      # 尚未處理的影格上限；超過時丟棄新影格
+STREAM_PREDICT_WORKERS = int(os.getenv("STREAM_PREDICT_WORKERS", 1))        # 串流預測專用的執行緒數
+STREAM_PREDICT_TIMEOUT = float(os.getenv("STREAM_PREDICT_TIMEOUT", 2))      # 單格預測的等待上限 (秒)；逾時送出 busy
+
+_session_slots = threading.BoundedSemaphore(STREAM_MAX_SESSIONS)
+# 💥 串流專用的 Holistic 實例池: 每條連線整段期間佔用一個實例，與翻譯請求的池分開，
+# 串流數量再多也不會讓 /translate 等不到實例 (大小與連線上限相同，取得名額後必定借得到)
+stream_holistic_pool = HolisticPool(size=STREAM_MAX_SESSIONS, name="stream")
+# 💥 串流預測專用的工作池 (保留給串流的容量): 每格只預測一個 (1, 40, 636) 視窗 (數毫秒)，
+# 若與翻譯請求共用 infer_executor，INFER_WORKERS=1 時每格都要排在數秒的整支影片後面。
+# 取捨: 串流的 Holistic 在各連線自己的執行緒執行，不經過准入控制，由 STREAM_MAX_SESSIONS 限制總量；
+# 同時進行的翻譯請求因此會與最多 STREAM_MAX_SESSIONS 條串流分享 CPU (上傳影片變慢，而非串流延遲數秒)。
+stream_executor = InferenceExecutor(kind="thread", workers=STREAM_PREDICT_WORKERS, queue_size=STREAM_MAX_SESSIONS,
+                                    timeout=STREAM_PREDICT_TIMEOUT, wait_budget=0)
+_RESET = object() # 佇列中的重設標記 (客戶端開始新的一段手語)
+
+
+class StreamError(Exception):
+    """串流參數錯誤或無法開始 (回傳給客戶端後關閉連線)"""
+
+# ----------------------------------------------------
+# 2. 影格解碼
+# ----------------------------------------------------
+def decode_frame(payload, frame_format, width=None, height=None):
+    """jpeg: 任何 cv2.imdecode 可讀的影像；raw: width x height 的 BGR24 位元組"""
+    if frame_format == "raw":
+        if len(payload) != width * height * 3:
+            raise StreamError(f"raw 影格大小錯誤: {len(payload)} bytes (預期 {width * height * 3})")
+        return np.frombuffer(payload, dtype=np.uint8).reshape(height, width, 3)
+    frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise StreamError("無法解碼 JPEG 影格")
+    return frame
+
+# ----------------------------------------------------
+# 3. 串流工作階段
+# ----------------------------------------------------
+class StreamSession:
+    """
+    一條 WebSocket 連線的處理狀態。
+    submit() 在 event loop 中收下原始影格 (不解碼)；背景執行緒依 fps 取樣 10 Hz 影格後才解碼，
+    逐格 push 進 FeatureExtractor，每保留一格就以最近 MAX_SEQ_LENGTH 格預測一次，
+    結果透過 emit (執行緒安全的回呼) 交回 event loop。
+    predict(特徵, 模型版本) → Top-3: 預設直接呼叫 model_infer.predict_features；
+    API 傳入經 stream_executor 執行的版本，佇列已滿 / 逾時時略過該格並送出 busy。
+    """
+
+    def __init__(self, emit, frame_format="jpeg", fps=TARGET_FPS, width=None, height=None, predict=None):
+        if frame_format not in ("jpeg", "raw"):
+            raise StreamError(f"未知的影格格式: {frame_format} (可用: jpeg, raw)")
+        if frame_format == "raw" and not (width and height):
+            raise StreamError("raw 影格需要 width 與 height")
+        if fps <= 0:
+            raise StreamError("fps 必須大於 0")
+        self.model_version = model_infer.pick_model() # 💥 整條連線固定使用同一個模型版本
+        if self.model_version is None:
+            raise StreamError("模型尚未載入")
+        if not _session_slots.acquire(blocking=False):
+            raise StreamError(f"串流連線已滿 ({STREAM_MAX_SESSIONS})")
+        metrics.STREAM_SESSIONS.inc()
+
+        self.emit = emit
+        self.predict = predict or model_infer.predict_features
+        self.frame_format = frame_format
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.received = 0
+        self.dropped = 0
+        self.skipped = 0 # 工作池拒絕 / 逾時而未預測的格數
+        self.window = deque(maxlen=MAX_SEQ_LENGTH)
+        self._frames = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self._stopped = False
+        self._finishing = False
+        self._reset_requested = False
+        self._thread = threading.Thread(target=self._run, name="v9-stream", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload):
+        """收下一格原始資料；佇列已滿時丟棄並回傳 False"""
+        self.received += 1
+        try:
+            self._frames.put_nowait(payload)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def reset(self):
+        """客戶端送出 reset: 清除特徵狀態與滑動視窗，取樣重新從第 0 格開始"""
+        try:
+            self._frames.put_nowait(_RESET)
+            return True
+        except queue.Full:
+            return False
+
+    def finish(self):
+        """
+        客戶端送出 end: 處理完已收的影格後送出 final。
+        在 event loop 中呼叫，不可阻塞: 佇列已滿時不放結束標記，由背景執行緒消化完佇列後依 _finishing 結束。
+        """
+        self._finishing = True
+        try:
+            self._frames.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def close(self):
+        """連線中斷: 盡快停止，不再送出結果"""
+        self._stopped = True
+        try:
+            self._frames.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _payloads(self):
+        while True:
+            if self._finishing and self._frames.empty(): # finish() 時佇列已滿、未放入結束標記
+                self._reset_requested = False
+                return
+            payload = self._frames.get()
+            if payload is None or payload is _RESET or self._stopped:
+                self._reset_requested = payload is _RESET and not self._stopped
+                return
+            yield payload
+
+    def _run(self):
+        last_top3 = None
+        try:
+            with FeatureExtractor(pool=stream_holistic_pool) as extractor:
+                while True:
+                    # 取樣只依影格序號與 fps，先取樣再解碼，丟棄的影格不必解 JPEG
+                    for payload in iter_sampled_frames(frames=self._payloads(), fps=self.fps):
+                        vector = extractor.push(decode_frame(payload, self.frame_format, self.width, self.height))
+                        if vector is None: continue
+                        self.window.append(vector)
+                        try:
+                            last_top3 = self.predict(np.array(self.window), self.model_version)
+                        except (QueueFullError, InferenceTimeoutError) as e:
+                            self.skipped += 1 # 工作池壅塞: 略過這一格的預測，視窗照常更新
+                            self.emit({"type": "busy", "frames": len(self.window), "error": str(e)})
+                            continue
+                        self.emit({"type": "prediction", "frames": len(self.window), "top3": last_top3})
+                    if self._stopped: return
+                    if not self._reset_requested: break
+                    extractor.reset()
+                    self.window.clear()
+                    last_top3 = None
+                    self.emit({"type": "reset"})
+            if not self._stopped:
+                self.emit({"type": "final", "frames": len(self.window), "top3": last_top3,
+                           "received": self.received, "dropped": self.dropped, "skipped": self.skipped})
+        except Exception as e:
+            print(f"❌ 串流處理錯誤: {e}")
+            if not self._stopped:
+                self.emit({"type": "error", "error": str(e)})
+        finally:
+            metrics.STREAM_SESSIONS.dec()
+            _session_slots.release()
+            self.emit(None) # 通知 event loop 結束
@@ -0,0 +1,87 @@
+# //Soul/app/(tabs)/translation/backend/tools/bench_batching.py
+# (v9 - 微批次 vs 逐筆 model.predict: 併發下的吞吐量與延遲)
+#
+# 用法: python tools/bench_batching.py [--concurrency 8] [--requests 200] [--batch-size 16] [--wait-ms 5] [--stand-in]
+# --stand-in: 模型檔無法載入時 (例如 LFS 指標檔) 改用相同輸入/輸出形狀的隨機 TCN。
+# 兩種模式的 Top-3 必須相同。
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tensorflow import keras
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+import model_infer
+from model_registry import ModelVersion
+from feature_loader import MAX_SEQ_LENGTH, POSE_DIMENSION, CLASS_NAMES
+
+
+def stand_in_model():
+    inputs = keras.Input((MAX_SEQ_LENGTH, POSE_DIMENSION))
+    x = keras.layers.Conv1D(128, 3, padding="causal", activation="relu")(inputs)
+    x = keras.layers.Conv1D(128, 3, padding="causal", dilation_rate=2, activation="relu")(x)
+    x = keras.layers.GlobalAveragePooling1D()(x)
+    return keras.Model(inputs, keras.layers.Dense(len(CLASS_NAMES), activation="softmax")(x))
+
+
+def run(version, sequences, concurrency, batching):
+    """以 concurrency 條執行緒送出所有序列；回傳 (Top-3 列表, 總耗時, 每筆延遲)"""
+    version.batch = batching
+
+    def timed(features):
+        start = time.perf_counter()
+        top3 = model_infer.predict_features(features, version)
+        return top3, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, sequences))
+    return [r[0] for r in results], time.perf_counter() - start, np.array([r[1] for r in results])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 微批次基準")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=model_infer.INFER_BATCH_SIZE)
+    parser.add_argument("--wait-ms", type=float, default=model_infer.INFER_BATCH_WAIT_MS)
+    parser.add_argument("--stand-in", action="store_true")
+    args = parser.parse_args()
+
+    if args.stand_in:
+        runner = stand_in_model()
+    elif model_infer.load_v9_model():
+        runner = model_infer.pick_model().runner
+    else:
+        sys.exit(1)
+    version = ModelVersion("bench", runner, None, batch_size=args.batch_size, batch_wait_ms=args.wait_ms)
+
+    rng = np.random.default_rng(0)
+    sequences = [rng.normal(size=(rng.integers(5, MAX_SEQ_LENGTH + 1), POSE_DIMENSION)).astype(np.float32)
+                 for _ in range(args.requests)]
+    version.predict_batch(np.zeros((args.batch_size, MAX_SEQ_LENGTH, POSE_DIMENSION), dtype=np.float32)) # 暖機
+
+    single, single_time, single_latency = run(version, sequences, args.concurrency, batching=False)
+    batched, batched_time, batched_latency = run(version, sequences, args.concurrency, batching=True)
+    version.batcher.close()
+
+    report = lambda name, total, latency: print(
+        f"{name} {args.requests / total:7.1f} 筆/s  p50 {np.percentile(latency, 50) * 1000:6.1f} ms  "
+        f"p95 {np.percentile(latency, 95) * 1000:6.1f} ms")
+    report("逐筆:  ", single_time, single_latency)
+    report("微批次:", batched_time, batched_latency)
+    print(f"批次統計: {version.batcher.stats()}")
+
+    mismatches = sum([r["label"] for r in a] != [r["label"] for r in b] for a, b in zip(single, batched))
+    print(f"Top-3 不一致: {mismatches} / {args.requests}")
+    sys.exit(0 if mismatches == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# //Soul/app/(tabs)/translation/backend/tools/bench_decode.py
+# (v9 - 解碼 + 10 Hz 取樣的耗時比較，不含 MediaPipe)
+#
+# 用法: python tools/bench_decode.py [影片路徑 ...] [--runs 5]
+# transcode: 舊路徑 (ffmpeg -r 30 轉檔 + cap.read() 每一格 + 每 3 格取 1)
+# read:      cap.read() 每一格 + 依時間戳取樣
+# grab:      cap.grab() 前進，只 retrieve() 被取樣的影格
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import ffmpeg
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from video_source import iter_capture_frames, iter_sampled_frames, TARGET_FPS, SAMPLE_RATE
+
+
+def decode_transcode(video_path):
+    with tempfile.TemporaryDirectory() as tmp:
+        transcoded_path = os.path.join(tmp, "30fps.mp4")
+        ffmpeg.input(video_path).output(transcoded_path, r=TARGET_FPS).run(overwrite_output=True, quiet=True)
+        return sum(1 for i, _ in enumerate(iter_capture_frames(transcoded_path)) if i % SAMPLE_RATE == 0)
+
+
+def decode_read(video_path):
+    return sum(1 for _ in iter_sampled_frames(video_path, decode="read"))
+
+
+def decode_grab(video_path):
+    return sum(1 for _ in iter_sampled_frames(video_path, decode="grab"))
+
+
+MODES = {"transcode": decode_transcode, "read": decode_read, "grab": decode_grab}
+
+
+def bench(video_path, runs):
+    print(f"\n🎬 {video_path}")
+    baseline = None
+    for name, fn in MODES.items():
+        fn(video_path) # 暖身 (檔案快取)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            sampled = fn(video_path)
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        baseline = baseline or best
+        print(f"  {name:<10} {best * 1000:8.1f} ms/影片  (取樣 {sampled} 格, {baseline / best:4.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 解碼模式效能比較")
+    parser.add_argument("videos", nargs="*", default=[os.path.join(BACKEND_DIR, "temp_videos", "video.mp4")])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    for video_path in args.videos:
+        bench(video_path, args.runs)
+
+
+if __name__ == "__main__":
+    main()
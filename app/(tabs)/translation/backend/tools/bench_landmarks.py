@@ -0,0 +1,153 @@
+# //Soul/app/(tabs)/translation/backend/tools/bench_landmarks.py
+# (v9 - 關鍵點 → 636 維特徵的每格成本: 舊版逐點 list 建構 / 分段標準化 vs NumPy 向量化)
+#
+# 用法: python tools/bench_landmarks.py [--frames 2000]
+# 以隨機 MediaPipe landmark (含手部/臉部缺失的情況) 驗證兩者輸出逐位元相同，並比較耗時。
+
+import os
+import sys
+import time
+import argparse
+from types import SimpleNamespace
+
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from feature_loader import (
+    extract_pose_landmarks,
+    calculate_mp_displacement_features,
+    hand_points_to_pixels,
+    normalize_landmarks,
+    FACE_IDX,
+    POSE_IDX,
+    HAND_DIM,
+    FACE_KEYPOINT_DIM,
+    POSE_SPATIAL_DIM,
+    TOTAL_SPATIAL_DIM,
+    IMAGE_WIDTH,
+    IMAGE_HEIGHT,
+)
+
+# ----------------------------------------------------
+# 1. 舊版實作 (逐點建構 Python list，作為對照)
+# ----------------------------------------------------
+def legacy_calculate_mp_displacement_features(current_hand_pts, prev_hand_pts):
+    dx_dy_dz = []
+    for i in range(21):
+        prev_x, prev_y, prev_z = prev_hand_pts[i]
+        curr_x, curr_y, curr_z = current_hand_pts[i]
+        dx = curr_x - prev_x; dy = curr_y - prev_y; dz = curr_z - prev_z
+        dx_dy_dz.extend([dx, dy, dz])
+    return np.array(dx_dy_dz)
+
+def legacy_extract_pose_landmarks(results):
+    keypoints = []
+    current_hand_pts_L, current_hand_pts_R = [(0.0, 0.0, 0.0)] * 21, [(0.0, 0.0, 0.0)] * 21
+    for landmarks, hand_type in [(results.left_hand_landmarks, 'L'), (results.right_hand_landmarks, 'R')]:
+        if landmarks:
+            pts = [item for lm in landmarks.landmark for item in (lm.x, lm.y, lm.z)]
+            hand_pts_list = [(lm.x, lm.y, lm.z) for lm in landmarks.landmark]
+            keypoints.extend(pts)
+            if hand_type == 'L': current_hand_pts_L = hand_pts_list
+            else: current_hand_pts_R = hand_pts_list
+        else:
+            keypoints.extend([0.0] * HAND_DIM)
+    if results.face_landmarks:
+        keypoints.extend([item for i in FACE_IDX for item in (results.face_landmarks.landmark[i].x, results.face_landmarks.landmark[i].y, results.face_landmarks.landmark[i].z)])
+    else: keypoints.extend([0.0] * FACE_KEYPOINT_DIM)
+    if results.pose_landmarks:
+        keypoints.extend([item for i in POSE_IDX for item in (results.pose_landmarks.landmark[i].x, results.pose_landmarks.landmark[i].y, results.pose_landmarks.landmark[i].z)])
+    else: keypoints.extend([0.0] * POSE_SPATIAL_DIM)
+    spatial_coords_raw = np.array(keypoints).flatten()
+    if spatial_coords_raw.size != TOTAL_SPATIAL_DIM:
+        return np.array([0.0] * TOTAL_SPATIAL_DIM), current_hand_pts_L, current_hand_pts_R
+    return spatial_coords_raw, current_hand_pts_L, current_hand_pts_R
+
+def legacy_normalize_landmarks(spatial_coords):
+    if spatial_coords.size != TOTAL_SPATIAL_DIM: return spatial_coords
+    lh_raw = spatial_coords[:HAND_DIM].reshape(21, 3); rh_raw = spatial_coords[HAND_DIM:HAND_DIM*2].reshape(21, 3)
+    face_raw = spatial_coords[HAND_DIM*2 : HAND_DIM*2 + FACE_KEYPOINT_DIM].reshape(len(FACE_IDX), 3)
+    pose_raw = spatial_coords[HAND_DIM*2 + FACE_KEYPOINT_DIM:].reshape(len(POSE_IDX), 3)
+    shoulder_left = pose_raw[1]; shoulder_right = pose_raw[2]; center_point = np.array([0.5, 0.5, 0.0])
+    if np.all(shoulder_left != 0) and np.all(shoulder_right != 0): center_point = (shoulder_left + shoulder_right) / 2.0
+    elif np.all(pose_raw[0] != 0): center_point = pose_raw[0]
+    elif np.all(lh_raw[0] != 0): center_point = lh_raw[0]
+    scale_factor = 1.0; target_length = 0.15
+    if np.all(shoulder_left != 0) and np.all(shoulder_right != 0):
+        reference_dist = np.linalg.norm(shoulder_right - shoulder_left)
+        if reference_dist > 1e-4: scale_factor = target_length / reference_dist
+    lh_norm = np.nan_to_num((lh_raw - center_point) * scale_factor); rh_norm = np.nan_to_num((rh_raw - center_point) * scale_factor)
+    face_norm = np.nan_to_num((face_raw - center_point) * scale_factor); pose_norm = np.nan_to_num((pose_raw - center_point) * scale_factor)
+    return np.concatenate([lh_norm.flatten(), rh_norm.flatten(), face_norm.flatten(), pose_norm.flatten()])
+
+def legacy_hand_points_to_pixels(hand_pts, w_res, h_res):
+    return np.array([[int(x * w_res), int(y * h_res)] for x, y, z in hand_pts], dtype=np.float32).reshape(-1, 1, 2)
+
+# ----------------------------------------------------
+# 2. 隨機 MediaPipe 結果
+# ----------------------------------------------------
+def random_landmarks(rng, count):
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in rng.uniform(-0.2, 1.2, size=(count, 3)):
+        lm = landmarks.landmark.add()
+        lm.x, lm.y, lm.z = x, y, z
+    return landmarks
+
+def random_results(rng):
+    maybe = lambda count, p: random_landmarks(rng, count) if rng.random() < p else None
+    return SimpleNamespace(
+        left_hand_landmarks=maybe(21, 0.7),
+        right_hand_landmarks=maybe(21, 0.7),
+        face_landmarks=maybe(468, 0.9),
+        pose_landmarks=maybe(33, 0.95),
+    )
+
+# ----------------------------------------------------
+# 3. 每格流程 (空間特徵 + 標準化 + LK 像素座標 + MP 位移)
+# ----------------------------------------------------
+def run_frames(frames, extract, normalize, displacement, to_pixels):
+    outputs = []
+    prev_L = prev_R = None
+    for results in frames:
+        spatial, curr_L, curr_R = extract(results)
+        standardized = normalize(spatial)
+        if prev_L is not None:
+            pix = np.concatenate([to_pixels(prev_L, IMAGE_WIDTH, IMAGE_HEIGHT), to_pixels(prev_R, IMAGE_WIDTH, IMAGE_HEIGHT)])
+            mp_disp = np.concatenate([displacement(curr_L, prev_L), displacement(curr_R, prev_R)])
+            outputs.append((standardized, pix, mp_disp))
+        prev_L, prev_R = curr_L, curr_R
+    return outputs
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 關鍵點向量化微基準")
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [random_results(rng) for _ in range(args.frames)]
+
+    legacy, legacy_time = timed(run_frames, frames, legacy_extract_pose_landmarks, legacy_normalize_landmarks,
+                                legacy_calculate_mp_displacement_features, legacy_hand_points_to_pixels)
+    vectorized, vectorized_time = timed(run_frames, frames, extract_pose_landmarks, normalize_landmarks,
+                                        calculate_mp_displacement_features, hand_points_to_pixels)
+
+    identical = all(
+        a.dtype == b.dtype and np.array_equal(a, b)
+        for old, new in zip(legacy, vectorized) for a, b in zip(old, new)
+    )
+    print(f"逐位元相同: {'✅' if identical else '❌'}")
+    print(f"舊版:   {legacy_time / args.frames * 1e6:7.1f} µs/格")
+    print(f"向量化: {vectorized_time / args.frames * 1e6:7.1f} µs/格  ({legacy_time / vectorized_time:.1f}x)")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
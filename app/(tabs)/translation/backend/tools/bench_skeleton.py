@@ -0,0 +1,73 @@
+# //Soul/app/(tabs)/translation/backend/tools/bench_skeleton.py
+# (v9 - 手部骨架遮罩: 舊版兩張 BGR 畫布 + cv2.add + 取紅色通道 vs 單通道共用遮罩)
+#
+# 用法: python tools/bench_skeleton.py [--frames 3000]
+# 以隨機手部關鍵點 (含超出畫面、單手/雙手缺失) 驗證兩者遮罩逐位元相同、
+# min_skeleton_pixels 判斷一致，並比較耗時。
+
+import os
+import sys
+import time
+import argparse
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from feature_loader import draw_hand_skeleton, SkeletonCanvas, IMAGE_WIDTH, IMAGE_HEIGHT
+
+MIN_SKELETON_PIXELS = 50
+
+
+def legacy_mask(frame, left, right):
+    """舊路徑 (extract_feature_sequence v9 原始寫法)"""
+    hand_skeleton = cv2.add(draw_hand_skeleton(frame, left), draw_hand_skeleton(frame, right))
+    return hand_skeleton[:, :, 2]
+
+
+def to_landmarks(points):
+    if points is None: return None
+    return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in points])
+
+
+def random_hand(rng):
+    if rng.random() < 0.3: return None
+    center = rng.uniform(-0.1, 1.1, size=3)
+    return (center + rng.normal(0, rng.uniform(0.01, 0.2), size=(21, 3))).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 骨架遮罩微基準")
+    parser.add_argument("--frames", type=int, default=3000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    hands = [(random_hand(rng), random_hand(rng)) for _ in range(args.frames)]
+    landmarks = [(to_landmarks(l), to_landmarks(r)) for l, r in hands]
+    frame = np.zeros((IMAGE_HEIGHT, IMAGE_WIDTH, 3), dtype=np.uint8)
+    canvas = SkeletonCanvas()
+
+    start = time.perf_counter()
+    legacy = [legacy_mask(frame, l, r) for l, r in landmarks]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    masks = [canvas.render(l, r).copy() for l, r in hands]
+    canvas_time = time.perf_counter() - start
+
+    mismatches = sum(not np.array_equal(a, b) for a, b in zip(legacy, masks))
+    decisions = sum(
+        (cv2.countNonZero(a) < MIN_SKELETON_PIXELS) != (cv2.countNonZero(b) < MIN_SKELETON_PIXELS)
+        for a, b in zip(legacy, masks)
+    )
+    print(f"遮罩不一致: {mismatches} / {args.frames}，min_skeleton_pixels 判斷不一致: {decisions}")
+    print(f"舊版:       {legacy_time / args.frames * 1e6:7.1f} µs/格")
+    print(f"單通道遮罩: {canvas_time / args.frames * 1e6:7.1f} µs/格  ({legacy_time / canvas_time:.1f}x)")
+    sys.exit(0 if mismatches == 0 and decisions == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# //Soul/app/(tabs)/translation/backend/tools/bench_suite.py
+# (v9 - 翻譯管線基準: 固定影片集的各階段耗時 / 取樣 FPS / 峰值記憶體 + 本機 uvicorn 併發 HTTP 延遲 → JSON)
+#
+# 用法: python tools/bench_suite.py [--videos 影片 ...] [--synthetic 2s@640x480 5s@1280x720 ...] [--runs 3]
+#                                  [--concurrency 1 4] [--requests 16] [--no-http] [--stand-in]
+#                                  [--output 結果.json] [--baseline 舊結果.json] [--threshold 0.1]
+#       python tools/bench_suite.py --diff 舊結果.json 新結果.json [--threshold 0.1]
+# - 影片集: temp_videos/video.mp4 + 以固定亂數種子產生的合成影片 (存於 --corpus-dir，已存在則重用)。
+# - 行程內: 每支影片執行 extract_feature_sequence + predict_features，取 --runs 次的中位數 (先暖機一次)；
+#   各階段耗時來自 metrics 的請求 trace (decode / preprocess / holistic / landmarks / lk_flow / similarity / pad / predict)。
+# - HTTP: 以目前的環境變數啟動 uvicorn (FEATURE_CACHE=off)，N 個客戶端同時上傳影片到 /translate。
+# - 峰值 RSS: 本行程取 getrusage，伺服器取 /proc/<pid>/status 的 VmHWM (僅 Linux；process 模式不含子行程)。
+# --baseline / --diff: 比較兩份結果，變慢 (或 FPS / 吞吐量下降) 超過 --threshold 的項目列為退步並以狀態碼 1 結束。
+# --stand-in: 模型檔無法載入時 (例如 LFS 指標檔)，以 v9 架構 + 隨機權重代替 (行程內與伺服器共用)。
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+DEFAULT_SYNTHETIC = ["2s@640x480", "5s@640x480", "5s@1280x720"]
+SYNTHETIC_FPS = 30
+# 記錄在結果中的設定 (比較兩份結果時先確認設定相同)
+CONFIG_ENV = (
+    "VIDEO_DECODER", "CAPTURE_DECODE", "MODEL_BACKEND", "MODEL_VARIANT", "KERAS_CALL", "KERAS_JIT",
+    "INFER_EXECUTOR", "INFER_WORKERS", "INFER_BATCH", "SSIM_BACKEND", "INFER_BATCH_SIZE",
+    "TF_INTRA_OP_THREADS", "TF_INTER_OP_THREADS", "RUNTIME_THREADS",
+)
+HIGHER_IS_BETTER = ("_fps", "_rps")
+
+# ----------------------------------------------------
+# 1. 影片集
+# ----------------------------------------------------
+def parse_synthetic(spec):
+    """'5s@1280x720' → (秒數, 寬, 高)"""
+    try:
+        seconds, size = spec.split("@")
+        width, height = size.lower().split("x")
+        return float(seconds.rstrip("s")), int(width), int(height)
+    except ValueError:
+        raise ValueError(f"未知的合成影片格式: {spec} (例如 5s@1280x720)")
+
+
+def write_synthetic(path, seconds, width, height, seed=0):
+    """移動的膚色橢圓 + 雜訊背景 (固定種子)；沒有真人，Holistic 仍會完整執行"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(40, 90, size=(height, width, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), SYNTHETIC_FPS, (width, height))
+    for i in range(int(seconds * SYNTHETIC_FPS)):
+        frame = background.copy()
+        phase = i / SYNTHETIC_FPS
+        for k, (cx, cy) in enumerate([(0.35, 0.55), (0.65, 0.55)]):
+            x = int(width * (cx + 0.1 * np.sin(2 * np.pi * (phase + k / 2))))
+            y = int(height * (cy + 0.1 * np.cos(2 * np.pi * phase)))
+            cv2.ellipse(frame, (x, y), (width // 16, height // 10), 0, 0, 360, (120, 160, 210), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def build_corpus(videos, synthetic, corpus_dir):
+    """回傳 [{"name", "path", "sha256"}]；合成影片依規格命名，已存在則重用"""
+    from feature_cache import hash_file
+    corpus = [{"name": os.path.basename(path), "path": path} for path in videos if os.path.exists(path)]
+    os.makedirs(corpus_dir, exist_ok=True)
+    for spec in synthetic:
+        seconds, width, height = parse_synthetic(spec)
+        path = os.path.join(corpus_dir, f"synthetic_{seconds:g}s_{width}x{height}.mp4")
+        if not os.path.exists(path):
+            print(f"🎞️ 產生合成影片 {spec} → {path}")
+            write_synthetic(path, seconds, width, height)
+        corpus.append({"name": spec, "path": path})
+    for clip in corpus:
+        clip["sha256"] = hash_file(clip["path"])
+    return corpus
+
+# ----------------------------------------------------
+# 2. 行程內: 各階段耗時
+# ----------------------------------------------------
+def run_clip(path, version):
+    import metrics
+    from feature_loader import extract_feature_sequence
+    from model_infer import predict_features
+
+    start = time.perf_counter()
+    with metrics.collect() as trace:
+        with metrics.stage("extract"):
+            features, _ = extract_feature_sequence(path, with_indices=True)
+        predict_features(features, version)
+    snapshot = trace.snapshot()
+    snapshot["stages"]["total"] = time.perf_counter() - start
+    return snapshot
+
+
+def bench_pipeline(corpus, version, runs):
+    results = {}
+    for clip in corpus:
+        run_clip(clip["path"], version) # 暖機 (檔案快取、Holistic 追蹤器)
+        snapshots = [run_clip(clip["path"], version) for _ in range(runs)]
+        stages = {name: statistics.median(s["stages"].get(name, 0.0) for s in snapshots)
+                  for name in snapshots[0]["stages"]}
+        counts = snapshots[0]["counts"]
+        sampled = counts.get("frames_sampled", 0)
+        results[clip["name"]] = {
+            "stages_s": {name: round(seconds, 6) for name, seconds in sorted(stages.items())},
+            "frames": counts,
+            "decoded_fps": round(counts.get("frames_read", 0) / stages["total"], 2),
+            "sampled_fps": round(sampled / stages["total"], 2),
+        }
+        print(f"  {clip['name']:<24} {stages['total'] * 1000:8.1f} ms  "
+              f"取樣 {sampled:4d} 格  {results[clip['name']]['sampled_fps']:6.1f} 格/s  "
+              f"(holistic {stages.get('holistic', 0.0) * 1000:.1f} ms)")
+    return results
+
+# ----------------------------------------------------
+# 3. HTTP: 本機 uvicorn + N 個併發客戶端
+# ----------------------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_mb(pid="self"):
+    """Linux: VmHWM (峰值常駐記憶體)"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def start_server(port, timeout=300):
+    import httpx
+    env = dict(os.environ, FEATURE_CACHE="off", URL_CACHE="off")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn 啟動失敗 (結束碼 {server.returncode})")
+        try:
+            state = httpx.get(f"http://127.0.0.1:{port}/health", timeout=2).json()["model"]
+            if state == "ready":
+                return server
+            if state == "failed":
+                server.terminate()
+                raise RuntimeError("伺服器模型載入失敗")
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"uvicorn 在 {timeout} 秒內未就緒")
+
+
+def bench_http(corpus, concurrency_levels, requests):
+    import httpx
+    port = free_port()
+    server = start_server(port)
+    url = f"http://127.0.0.1:{port}/translate"
+    payloads = []
+    for clip in corpus:
+        with open(clip["path"], "rb") as f:
+            payloads.append((clip["name"], f.read()))
+    results = {}
+    try:
+        with httpx.Client(timeout=300) as client:
+            client.post(url, files={"file": ("warmup.mp4", payloads[0][1], "video/mp4")}) # 暖機
+
+            def send(i):
+                name, data = payloads[i % len(payloads)]
+                start = time.perf_counter()
+                status = client.post(url, files={"file": (f"{i}.mp4", data, "video/mp4")}).status_code
+                return status, time.perf_counter() - start
+
+            for concurrency in concurrency_levels:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    responses = list(pool.map(send, range(requests)))
+                elapsed = time.perf_counter() - start
+                latencies = np.array([latency for status, latency in responses if status == 200])
+                statuses = {}
+                for status, _ in responses:
+                    statuses[str(status)] = statuses.get(str(status), 0) + 1
+                results[f"c{concurrency}"] = {
+                    "concurrency": concurrency,
+                    "requests": requests,
+                    "status": statuses,
+                    "p50_s": round(float(np.percentile(latencies, 50)), 4) if latencies.size else None,
+                    "p95_s": round(float(np.percentile(latencies, 95)), 4) if latencies.size else None,
+                    "throughput_rps": round(latencies.size / elapsed, 3),
+                }
+                r = results[f"c{concurrency}"]
+                print(f"  併發 {concurrency:3d}: p50 {r['p50_s']} s  p95 {r['p95_s']} s  "
+                      f"{r['throughput_rps']} 筆/s  狀態 {statuses}")
+        return results, peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+# ----------------------------------------------------
+# 4. 結果 JSON 與比較
+# ----------------------------------------------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(result):
+    """比較用的扁平指標: {名稱: 數值}"""
+    flat = {}
+    for name, clip in result.get("pipeline", {}).items():
+        for stage, seconds in clip["stages_s"].items():
+            flat[f"pipeline.{name}.{stage}_s"] = seconds
+        flat[f"pipeline.{name}.sampled_fps"] = clip["sampled_fps"]
+    for level, r in result.get("http", {}).items():
+        for key in ("p50_s", "p95_s", "throughput_rps"):
+            if r.get(key) is not None: flat[f"http.{level}.{key}"] = r[key]
+    for key, value in result.get("memory", {}).items():
+        if value is not None: flat[f"memory.{key}"] = value
+    return flat
+
+
+def compare(baseline, current, threshold):
+    """回傳退步項目數；相對變化超過 threshold 才列出"""
+    if baseline.get("config") != current.get("config"):
+        print("⚠️ 兩份結果的設定不同，比較僅供參考")
+    if baseline.get("corpus") != current.get("corpus"):
+        print("⚠️ 兩份結果的影片集不同 (sha256)，比較僅供參考")
+    old, new = flatten(baseline), flatten(current)
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        if not old[key]: continue
+        change = (new[key] - old[key]) / old[key]
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        if abs(change) < threshold: continue
+        mark = "❌ 退步" if worse > 0 else "✅ 改善"
+        regressions += worse > 0
+        print(f"{mark} {key:<48} {old[key]:>10.4g} → {new[key]:>10.4g} ({change:+.1%})")
+    print(f"比較 {len(old.keys() & new.keys())} 項，退步 {regressions} 項 (門檻 {threshold:.0%})")
+    return regressions
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 翻譯管線基準")
+    parser.add_argument("--videos", nargs="*", default=[os.path.join(BACKEND_DIR, "temp_videos", "video.mp4")])
+    parser.add_argument("--synthetic", nargs="*", default=DEFAULT_SYNTHETIC, help="合成影片規格 (秒數@寬x高)")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "v9_bench_corpus"))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--concurrency", nargs="*", type=int, default=[1, 4])
+    parser.add_argument("--requests", type=int, default=16, help="每個併發等級送出的請求數")
+    parser.add_argument("--no-http", action="store_true", help="只跑行程內的管線")
+    parser.add_argument("--stand-in", action="store_true")
+    parser.add_argument("--output", default=None, help="結果 JSON (預設 bench_<時間>.json)")
+    parser.add_argument("--baseline", default=None, help="與此結果 JSON 比較")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="只比較兩份結果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="相對變化超過此比例才列出 / 判定退步")
+    args = parser.parse_args()
+
+    if args.diff:
+        sys.exit(1 if compare(load_json(args.diff[0]), load_json(args.diff[1]), args.threshold) else 0)
+
+    if args.stand_in:
+        # 必須在匯入 model_runtime 前設定；伺服器子行程也繼承此環境變數
+        stand_in_path = os.path.join(args.corpus_dir, "stand_in_v9.h5")
+        os.environ["MODEL_BACKEND"] = "keras"
+        os.environ["KERAS_MODEL_PATH"] = stand_in_path
+        os.makedirs(args.corpus_dir, exist_ok=True)
+        from export_model import stand_in_model
+        stand_in_model().save(stand_in_path)
+
+    import model_infer
+    from holistic_pool import warm_holistic_pool
+    if not model_infer.load_v9_model():
+        sys.exit(1)
+    warm_holistic_pool(1)
+    version = model_infer.pick_model()
+
+    corpus = build_corpus(args.videos, args.synthetic, args.corpus_dir)
+    result = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {name: os.environ[name] for name in CONFIG_ENV if name in os.environ},
+        "model_sha256": version.sha256,
+        "stand_in": args.stand_in,
+        "runs": args.runs,
+        "corpus": {clip["name"]: clip["sha256"] for clip in corpus},
+    }
+
+    print(f"\n⏱️ 行程內管線 ({args.runs} 次中位數)")
+    result["pipeline"] = bench_pipeline(corpus, version, args.runs)
+    model_infer.close_models()
+    result["memory"] = {"bench_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+    if not args.no_http and args.concurrency:
+        print(f"\n🌐 HTTP /translate ({args.requests} 筆 / 等級)")
+        result["http"], result["memory"]["server_peak_rss_mb"] = bench_http(corpus, args.concurrency, args.requests)
+
+    output = args.output or f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 結果: {output}")
+
+    if args.baseline:
+        print()
+        sys.exit(1 if compare(load_json(args.baseline), result, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
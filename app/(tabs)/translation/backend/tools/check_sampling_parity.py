@@ -0,0 +1,97 @@
+# //Soul/app/(tabs)/translation/backend/tools/check_sampling_parity.py
+# (v9 - 比對「ffmpeg 30fps 轉檔 + 每 3 格取 1」與「依時間戳取樣 (免轉檔)」兩條路徑)
+#
+# 用法: python tools/check_sampling_parity.py [影片路徑] [--atol 0.05] [--fixture-fps 25]
+# 1. 取樣一致性: 轉檔路徑的每個取樣格，是否與時間戳取樣 (read / grab 模式) 挑中的原始影格相同
+# 2. 特徵一致性: 兩條路徑的 (T, 636) 特徵陣列 (舊路徑多一次有損重新編碼，故以 atol 比較)
+# 未指定影片時以 hand_fixture.make_hand_clip() 產生 --fixture-fps 的手部測試影片 (非 30 FPS 才會實際重採樣)。
+# 任一路徑沒有特徵 (未偵測到手部) 時視為失敗: 沒有比較到任何數值的檢查不算通過。
+
+import os
+import sys
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+import ffmpeg
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from feature_loader import extract_feature_sequence, TARGET_FPS, SAMPLE_RATE
+from video_source import iter_capture_frames, iter_sampled_frames
+from hand_fixture import make_hand_clip
+
+THUMB_SIZE = (80, 60)
+
+
+def transcode_30fps(video_path, out_path):
+    """舊路徑: ffmpeg -r 30 轉檔"""
+    ffmpeg.input(video_path).output(out_path, r=TARGET_FPS, vcodec="libx264", qp=0).run(overwrite_output=True, quiet=True)
+
+
+def thumbnail(frame):
+    return cv2.resize(frame, THUMB_SIZE).astype(np.float32)
+
+
+def check_selection(video_path, transcoded_path, decode):
+    source = [thumbnail(frame) for frame, _ in iter_capture_frames(video_path)]
+    reference = [thumbnail(frame) for frame, _ in iter_capture_frames(transcoded_path)][::SAMPLE_RATE]
+    chosen = [thumbnail(frame) for frame in iter_sampled_frames(video_path, decode=decode)]
+
+    mismatches = 0
+    for i, (ref, frame) in enumerate(zip(reference, chosen)):
+        errors = np.array([np.mean((ref - src) ** 2) for src in source])
+        # 靜止畫面可能有多個同樣接近的原始影格，只要誤差等同最佳者即視為一致
+        if np.mean((ref - frame) ** 2) > errors.min() + 1.0:
+            mismatches += 1
+            print(f"  ✗ [{decode}] 取樣 #{i}: 轉檔路徑 ≈ 原始第 {int(errors.argmin())} 格，時間戳取樣挑了不同影格")
+
+    print(f"[{decode}] 取樣數: 轉檔路徑 {len(reference)} / 時間戳取樣 {len(chosen)}，不一致 {mismatches} 格")
+    return mismatches == 0 and len(reference) == len(chosen)
+
+
+def check_features(video_path, transcoded_path, atol):
+    old = extract_feature_sequence(
+        frames=(frame for frame, _ in iter_capture_frames(transcoded_path)), fps=TARGET_FPS)
+    new = extract_feature_sequence(video_path, decode="read")
+
+    if old is None or new is None:
+        print(f"特徵: 轉檔路徑 {'None' if old is None else old.shape} / 時間戳取樣 {'None' if new is None else new.shape}")
+        if old is None and new is None:
+            print("❌ 兩條路徑都沒有特徵 (影片中未偵測到手部)，atol 比較沒有執行；請改用有手部動作的影片")
+        return False
+
+    print(f"特徵: 轉檔路徑 {old.shape} / 時間戳取樣 {new.shape}")
+    if old.shape != new.shape:
+        return False
+    max_diff = float(np.max(np.abs(old - new))) if old.size else 0.0
+    print(f"最大絕對差: {max_diff:.6f} (atol={atol})")
+    return max_diff <= atol
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 時間戳取樣 vs 30fps 轉檔 一致性檢查")
+    parser.add_argument("video", nargs="?", default=None, help="預設: 產生手部測試影片")
+    parser.add_argument("--atol", type=float, default=0.05)
+    parser.add_argument("--fixture-fps", type=float, default=25.0, help="產生測試影片時的影格率")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.video is None:
+            args.video = os.path.join(tmp, "hand_fixture.mp4")
+            count = make_hand_clip(args.video, fps=args.fixture_fps)
+            print(f"🎬 手部測試影片: {count} 格，{args.fixture_fps:g} FPS")
+        transcoded_path = os.path.join(tmp, "30fps.mp4")
+        transcode_30fps(args.video, transcoded_path)
+
+        selection_ok = all([check_selection(args.video, transcoded_path, decode) for decode in ("read", "grab")])
+        features_ok = check_features(args.video, transcoded_path, args.atol)
+
+    print("✅ 一致" if selection_ok and features_ok else "❌ 不一致")
+    sys.exit(0 if selection_ok and features_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# //Soul/app/(tabs)/translation/backend/tools/check_similarity_parity.py
+# (v9 - 相似度後端一致性: 以 skimage SSIM 為基準，比較 similarity_threshold = 0.99 下保留的影格)
+#
+# 用法: python tools/check_similarity_parity.py [--sequences 200] [--frames 60] [--backends opencv]
+#       python tools/check_similarity_parity.py --video 影片路徑   (另以真實影片比對 (T, 636) 特徵)
+# 以隨機手部動作序列 (靜止、次像素抖動、小幅/大幅移動、手部出現消失) 模擬 v9 過濾流程:
+#   1. 分數差: 同一組 (上一保留格, 目前格) 的 SSIM 與基準的最大絕對差
+#   2. 保留影格: 每個序列保留的影格索引是否與基準完全相同
+# 每個後端都必須完全一致 (結束碼以此判定)。
+
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from feature_loader import SkeletonCanvas, extract_feature_sequence
+from similarity import get_similarity_backend
+
+MIN_SKELETON_PIXELS = 50
+SIMILARITY_THRESHOLD = 0.99
+REFERENCE = "skimage"
+
+# ----------------------------------------------------
+# 1. 隨機手部動作序列
+# ----------------------------------------------------
+def random_hand_shape(rng):
+    """以手腕為原點的 (21, 3) 手型 (約 0.1 ~ 0.3 畫面寬)"""
+    return rng.normal(0, rng.uniform(0.03, 0.1), size=(21, 3))
+
+def random_sequence(rng, frames):
+    shapes = [random_hand_shape(rng), random_hand_shape(rng)]
+    centers = [rng.uniform(0.2, 0.8, size=3), rng.uniform(0.2, 0.8, size=3)]
+    present = [rng.random() < 0.8, rng.random() < 0.8]
+    sequence = []
+    for _ in range(frames):
+        hands = []
+        for i in range(2):
+            if rng.random() < 0.03: present[i] = not present[i]
+            # 運動幅度: 靜止 / 次像素 / 1~數像素 / 大幅 (單位: 正規化座標)
+            step = rng.choice([0.0, 0.001, 0.004, 0.015, 0.05], p=[0.3, 0.2, 0.2, 0.2, 0.1])
+            centers[i] = np.clip(centers[i] + rng.normal(0, step, size=3), 0.0, 1.0)
+            shapes[i] = shapes[i] + rng.normal(0, step / 4, size=(21, 3))
+            hands.append((centers[i] + shapes[i]).astype(np.float32) if present[i] else None)
+        sequence.append(tuple(hands))
+    return sequence
+
+# ----------------------------------------------------
+# 2. v9 過濾流程 (同 extract_feature_sequence 的步驟 4)
+# ----------------------------------------------------
+def run_filter(sequence, backend, canvas):
+    """回傳 (保留的影格索引, [(上一保留格, 目前格, 分數)], 秒數)"""
+    kept, scores = [], []
+    prev_state, prev_index = None, None
+    elapsed = 0.0
+    for index, hands_pts in enumerate(sequence):
+        mask = canvas.render(*hands_pts)
+        if cv2.countNonZero(mask) < MIN_SKELETON_PIXELS: continue
+        start = time.perf_counter()
+        state = backend.prepare(mask, hands_pts)
+        score = backend.score(prev_state, state) if prev_state is not None else None
+        elapsed += time.perf_counter() - start
+        if score is not None:
+            scores.append((prev_index, index, score))
+            if score >= SIMILARITY_THRESHOLD: continue
+        prev_state, prev_index = state, index
+        kept.append(index)
+    return kept, scores, elapsed
+
+def score_pairs(sequence, backend, canvas, pairs):
+    """在基準的 (上一保留格, 目前格) 上計算分數，讓分數差與保留決策分開比較"""
+    diffs = []
+    for prev_index, index, reference_score in pairs:
+        prev_state = backend.prepare(canvas.render(*sequence[prev_index]), sequence[prev_index])
+        state = backend.prepare(canvas.render(*sequence[index]), sequence[index])
+        diffs.append(abs(backend.score(prev_state, state) - reference_score))
+    return diffs
+
+# ----------------------------------------------------
+# 3. 真實影片 (完整特徵提取)
+# ----------------------------------------------------
+def check_video(video_path, backends):
+    reference = extract_feature_sequence(video_path, similarity=REFERENCE)
+    ok = True
+    for name in backends:
+        features = extract_feature_sequence(video_path, similarity=name)
+        same = (reference is None and features is None) or (
+            reference is not None and features is not None and
+            reference.shape == features.shape and np.array_equal(reference, features))
+        shape = lambda a: "None" if a is None else a.shape
+        print(f"🎬 [{name}] 特徵 {shape(features)} vs 基準 {shape(reference)}: {'相同' if same else '不同'}")
+        ok = ok and same
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 SSIM 後端一致性檢查")
+    parser.add_argument("--sequences", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--backends", nargs="+", default=["opencv"])
+    parser.add_argument("--atol", type=float, default=1e-9, help="opencv 與 skimage 分數的容許誤差")
+    parser.add_argument("--video", help="另以真實影片比對特徵")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    sequences = [random_sequence(rng, args.frames) for _ in range(args.sequences)]
+    canvas = SkeletonCanvas()
+
+    reference = get_similarity_backend(REFERENCE)
+    reference_runs = [run_filter(seq, reference, canvas) for seq in sequences]
+    reference_time = sum(run[2] for run in reference_runs)
+    comparisons = sum(len(run[1]) for run in reference_runs)
+    print(f"基準 {REFERENCE}: {comparisons} 次比較，{reference_time / max(comparisons, 1) * 1e6:7.1f} µs/格")
+
+    ok = True
+    for name in args.backends:
+        backend = get_similarity_backend(name)
+        runs = [run_filter(seq, backend, canvas) for seq in sequences]
+        elapsed = sum(run[2] for run in runs)
+        same_sequences = sum(run[0] == ref[0] for run, ref in zip(runs, reference_runs))
+        decisions = sum(len(set(run[0]) ^ set(ref[0])) for run, ref in zip(runs, reference_runs))
+        diffs = [d for seq, ref in zip(sequences, reference_runs) for d in score_pairs(seq, backend, canvas, ref[1])]
+        max_diff = max(diffs) if diffs else 0.0
+
+        print(f"[{name}] {elapsed / max(comparisons, 1) * 1e6:7.1f} µs/格 ({reference_time / max(elapsed, 1e-12):.1f}x)，"
+              f"最大分數差 {max_diff:.2e}，保留影格一致的序列 {same_sequences}/{len(sequences)}，"
+              f"保留決策不同 {decisions} 格")
+        ok = ok and max_diff <= args.atol and same_sequences == len(sequences)
+
+    if args.video:
+        ok = check_video(args.video, args.backends) and ok
+
+    print("✅ 一致" if ok else "❌ 不一致")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# //Soul/app/(tabs)/translation/backend/tools/eval_quantized.py
+# (v9 - 量化 TFLite 版本評估: 與 float 模型的 Top-1 / Top-3 一致率、準確率、檔案大小與延遲 → 載入門檻報告)
+#
+# 用法: python tools/eval_quantized.py --dataset 資料夾 [...] [--variants dynamic float16 int8]
+#                                     [--reference-backend tflite] [--min-top1 0.98] [--min-top3 0.95]
+# --dataset: <資料夾>/<類別名稱>/**/*.npy (例如訓練時的 pose.npy) 為有標籤資料，會另外回報準確率；
+#            其他 .npy / 特徵快取 .npz 只計算一致率。
+# 每個版本寫下 <模型檔>.eval.json；load_v9_model() 只載入報告與檔案相符且達門檻的版本 (MODEL_VARIANT)。
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from feature_loader import CLASS_NAMES, POSE_DIMENSION
+from feature_cache import FEATURE_CACHE_DIR, hash_file
+from model_runtime import load_runner, model_path, eval_report_path, QUANT_MIN_TOP1, QUANT_MIN_TOP3
+from export_model import load_feature_arrays, pad_batch
+
+
+def load_dataset(paths, random_count):
+    """回傳 (序列列表, 標籤陣列或 None)；標籤取自類別名稱資料夾"""
+    sequences, labels, unlabelled = [], [], []
+    for path in paths:
+        class_dirs = [name for name in CLASS_NAMES if os.path.isdir(os.path.join(path, name))]
+        if not class_dirs:
+            unlabelled.append(path)
+            continue
+        for name in class_dirs:
+            for file in sorted(glob.glob(os.path.join(path, name, "**", "*.npy"), recursive=True)):
+                features = np.load(file, allow_pickle=False)
+                if features.ndim == 2 and features.shape[0] > 0 and features.shape[1] == POSE_DIMENSION:
+                    sequences.append(features.astype(np.float32))
+                    labels.append(CLASS_NAMES.index(name))
+
+    if sequences:
+        print(f"有標籤資料: {len(sequences)} 筆")
+        if unlabelled:
+            sequences += load_feature_arrays(unlabelled, 0)
+            labels += [-1] * (len(sequences) - len(labels))
+        return sequences, np.array(labels)
+    return load_feature_arrays(unlabelled, random_count), None
+
+
+def top_k(probabilities, k):
+    return np.argsort(probabilities, axis=1)[:, ::-1][:, :k]
+
+
+def latency_ms(runner, batch, repeats=50):
+    """單筆 (batch=1) 的平均延遲"""
+    sample = batch[:1]
+    runner.predict(sample)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        runner.predict(sample)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def evaluate(variant, path, batch, reference, labels):
+    runner = load_runner("tflite", path)
+    outputs = runner.predict(batch)
+    report = {
+        "variant": variant,
+        "model_path": os.path.basename(path),
+        "model_sha256": hash_file(path),
+        "samples": int(batch.shape[0]),
+        "top1_agreement": float(np.mean(outputs.argmax(axis=1) == reference.argmax(axis=1))),
+        "top3_agreement": float(np.mean([set(a) == set(b) for a, b in zip(top_k(outputs, 3), top_k(reference, 3))])),
+        "max_abs_diff": float(np.max(np.abs(outputs - reference))),
+        "size_bytes": os.path.getsize(path),
+        "latency_ms": round(latency_ms(runner, batch), 3),
+    }
+    if labels is not None:
+        known = labels >= 0
+        report["accuracy"] = {
+            "top1": float(np.mean(outputs[known].argmax(axis=1) == labels[known])),
+            "top3": float(np.mean([label in row for label, row in zip(labels[known], top_k(outputs[known], 3))])),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 量化版本評估與載入門檻")
+    parser.add_argument("--dataset", nargs="*", default=[os.path.join(FEATURE_CACHE_DIR, "features")])
+    parser.add_argument("--variants", nargs="+", choices=["dynamic", "float16", "int8"], default=["dynamic", "float16", "int8"])
+    parser.add_argument("--reference-backend", choices=["keras", "tflite", "onnx"], default="tflite")
+    parser.add_argument("--model-dir", default=None, help="模型檔所在資料夾 (預設與 MODEL_PATHS 相同)")
+    parser.add_argument("--random", type=int, default=256, help="沒有資料時的隨機序列數 (只能檢查一致率)")
+    parser.add_argument("--min-top1", type=float, default=QUANT_MIN_TOP1)
+    parser.add_argument("--min-top3", type=float, default=QUANT_MIN_TOP3)
+    args = parser.parse_args()
+
+    locate = lambda path: path if args.model_dir is None else os.path.join(args.model_dir, os.path.basename(path))
+    sequences, labels = load_dataset(args.dataset, args.random)
+    batch = pad_batch(sequences)
+
+    reference_path = locate(model_path(args.reference_backend, "float"))
+    reference = load_runner(args.reference_backend, reference_path).predict(batch)
+    print(f"float 參考 ({args.reference_backend}): {os.path.getsize(reference_path) / 1024:.0f} KB")
+    if labels is not None:
+        known = labels >= 0
+        print(f"float 準確率: Top-1 {np.mean(reference[known].argmax(axis=1) == labels[known]):.1%}")
+
+    ok = True
+    for variant in args.variants:
+        path = locate(model_path("tflite", variant))
+        if not os.path.exists(path):
+            print(f"⚠️ {variant}: 找不到 {path} (請先執行 tools/export_model.py --quantize {variant})")
+            ok = False
+            continue
+        report = evaluate(variant, path, batch, reference, labels)
+        passed = report["top1_agreement"] >= args.min_top1 and report["top3_agreement"] >= args.min_top3
+        with open(eval_report_path(path), "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        accuracy = f"  準確率 Top-1 {report['accuracy']['top1']:.1%}" if "accuracy" in report else ""
+        print(f"{'✅' if passed else '❌'} {variant:7s} {report['size_bytes'] / 1024:6.0f} KB  {report['latency_ms']:6.2f} ms/筆  "
+              f"Top-1 一致 {report['top1_agreement']:.1%}  Top-3 一致 {report['top3_agreement']:.1%}{accuracy}")
+        ok = ok and passed
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
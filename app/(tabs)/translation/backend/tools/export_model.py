@@ -0,0 +1,398 @@
+# //Soul/app/(tabs)/translation/backend/tools/export_model.py
+# (v9 - 將 TCN (.h5) 匯出為 TFLite / ONNX: BN 折疊進卷積 / Dense，並以已存的特徵檢查輸出一致性)
+#
+# 用法: python tools/export_model.py [--format tflite onnx] [--features 特徵檔或目錄 ...] [--atol 1e-4] [--stand-in]
+#                                   [--quantize dynamic float16 int8]
+# --quantize: 另外匯出量化的 TFLite (<檔名>.<variant>.tflite)；int8 以 --features 的特徵校正。
+#             量化版本需再以 tools/eval_quantized.py 評估，通過門檻後才能以 MODEL_VARIANT 載入。
+# --features: .npy (T, 636) 或特徵快取的 .npz (預設讀取 FEATURE_CACHE_DIR/features)；沒有特徵檔時改用隨機序列。
+# --stand-in: 模型檔無法載入時 (例如 LFS 指標檔)，以 v9 架構 (model_v9.txt) + 隨機權重 / BN 統計值代替。
+# 匯出後以 MODEL_BACKEND=tflite 或 onnx 啟動伺服器即可不經 Keras 推論。
+# --format 預設只包含已安裝所需套件的格式 (onnx 需 onnx + onnxruntime，不在 requirements.txt，見 README)；
+# 明確指定但缺少套件的格式直接以狀態碼 1 結束。
+#
+# 推論時的 v9 TCN: Masking → Conv1D(relu) → BN → Conv1D(relu) → BN → GAP → Dense(relu) → Dense(softmax)
+# - Dropout / SpatialDropout1D 推論時為恆等。
+# - Conv1D 不支援遮罩 (Keras 會丟棄遮罩)，GAP 對全部 40 格取平均；Masking 只把全 0 格維持為 0，等同恆等。
+# - BN 接在 relu 之後，無法折疊進前一層，改折疊進下一個線性層 (卷積 / Dense) 的權重。
+#   causal 卷積的補 0 位置在 BN 之後 (BN 輸出空間的 0)，前幾格的偏移量因此隨時間不同，以 (T, C) 偏移表保持完全等價。
+
+import os
+import sys
+import glob
+import argparse
+import importlib.util
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from feature_loader import MAX_SEQ_LENGTH, POSE_DIMENSION, CLASS_NAMES, pad_feature_batch
+from feature_cache import FEATURE_CACHE_DIR
+from model_runtime import load_runner, model_path, MODEL_PATHS
+
+ACTIVATIONS = ("linear", "relu", "softmax")
+
+# ----------------------------------------------------
+# 1. 折疊: Keras 層 → 線性運算清單
+# ----------------------------------------------------
+def conv1d(x, kernel, dilation, pad):
+    """NumPy 一維卷積 (B, T, Cin) x (K, Cin, Cout)，pad = (左, 右) 補 0"""
+    x = np.pad(x, ((0, 0), pad, (0, 0)))
+    length = x.shape[1] - (kernel.shape[0] - 1) * dilation
+    return sum(x[:, k * dilation:k * dilation + length] @ kernel[k] for k in range(kernel.shape[0]))
+
+
+def conv_padding(layer, kernel_size, dilation):
+    total = (kernel_size - 1) * dilation
+    padding = layer.get_config()["padding"]
+    if padding == "causal": return (total, 0)
+    if padding == "same": return (total // 2, total - total // 2)
+    if padding == "valid": return (0, 0)
+    raise ValueError(f"未支援的 Conv1D padding: {padding}")
+
+
+def activation_name(layer):
+    name = layer.get_config().get("activation", "linear")
+    if name not in ACTIVATIONS:
+        raise ValueError(f"未支援的激活函數: {layer.name} / {name} (可用: {', '.join(ACTIVATIONS)})")
+    return name
+
+
+def fold_model(model):
+    """
+    回傳運算清單 (輸入 (B, T, 636) → 輸出 (B, 類別數))，每項為 dict:
+    conv: kernel (K, Cin, Cout), bias (Cout,) 或 (T, Cout), dilation, pad, activation
+    mean: 對時間軸取平均
+    dense: kernel (Cin, Cout), bias (Cout,), activation
+    affine: scale, shift (無法折疊的 BN)
+    """
+    length = model.input_shape[1]
+    ops, pending = [], None # pending: 尚未折疊、作用於目前張量的 BN (scale, shift)
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind in ("InputLayer", "Masking", "Dropout", "SpatialDropout1D"):
+            continue
+
+        if kind == "Conv1D":
+            config = layer.get_config()
+            if config["strides"] not in (1, (1,), [1]):
+                raise ValueError(f"未支援的 Conv1D strides: {config['strides']}")
+            kernel, bias = layer.get_weights() if config["use_bias"] else (layer.get_weights()[0], None)
+            dilation = config["dilation_rate"][0] if isinstance(config["dilation_rate"], (list, tuple)) else config["dilation_rate"]
+            pad = conv_padding(layer, kernel.shape[0], dilation)
+            bias = np.zeros(kernel.shape[2]) if bias is None else bias.astype(np.float64)
+            kernel = kernel.astype(np.float64)
+            if pending is not None:
+                scale, shift = pending
+                # 偏移量通過卷積 (含補 0)，每個時間點的結果不同
+                bias = bias + conv1d(np.broadcast_to(shift, (1, length, shift.shape[0])), kernel, dilation, pad)[0]
+                kernel = kernel * scale[None, :, None]
+                pending = None
+            ops.append(dict(kind="conv", kernel=kernel, bias=bias, dilation=dilation, pad=pad,
+                            activation=activation_name(layer)))
+            length = length + sum(pad) - (kernel.shape[0] - 1) * dilation
+
+        elif kind == "BatchNormalization":
+            config = layer.get_config()
+            weights = dict(zip([w.name.split("/")[-1].split(":")[0] for w in layer.weights], layer.get_weights()))
+            gamma = weights.get("gamma", 1.0) if config.get("scale", True) else 1.0
+            beta = weights.get("beta", 0.0) if config.get("center", True) else 0.0
+            scale = np.asarray(gamma, np.float64) / np.sqrt(weights["moving_variance"].astype(np.float64) + config["epsilon"])
+            shift = np.asarray(beta, np.float64) - weights["moving_mean"].astype(np.float64) * scale
+            last = ops[-1] if ops else None
+            if pending is None and last is not None and last["kind"] in ("conv", "dense") and last["activation"] == "linear":
+                # 前一層為線性: 直接折疊進其輸出通道
+                last["kernel"] = last["kernel"] * scale
+                last["bias"] = last["bias"] * scale + shift
+            elif pending is None:
+                pending = (scale, shift)
+            else:
+                pending = (pending[0] * scale, pending[1] * scale + shift)
+
+        elif kind == "GlobalAveragePooling1D":
+            # 平均為線性，pending 的 BN 可以穿過 (之後折疊進 Dense)；時間相關的偏移平均後變成常數
+            ops.append(dict(kind="mean"))
+
+        elif kind == "Dense":
+            config = layer.get_config()
+            kernel, bias = layer.get_weights() if config["use_bias"] else (layer.get_weights()[0], None)
+            kernel = kernel.astype(np.float64)
+            bias = np.zeros(kernel.shape[1]) if bias is None else bias.astype(np.float64)
+            if pending is not None:
+                scale, shift = pending
+                bias = bias + shift @ kernel
+                kernel = kernel * scale[:, None]
+                pending = None
+            ops.append(dict(kind="dense", kernel=kernel, bias=bias, activation=activation_name(layer)))
+
+        else:
+            raise ValueError(f"未支援的層: {layer.name} ({kind})")
+
+    if pending is not None:
+        ops.append(dict(kind="affine", scale=pending[0], shift=pending[1]))
+
+    for op in ops:
+        for key in ("kernel", "bias", "scale", "shift"):
+            if key in op: op[key] = np.asarray(op[key], dtype=np.float32)
+    return ops
+
+
+def run_folded(ops, batch):
+    """以 NumPy 執行折疊後的運算清單 (驗證折疊本身)"""
+    x = batch.astype(np.float64)
+    for op in ops:
+        if op["kind"] == "conv":
+            x = conv1d(x, op["kernel"], op["dilation"], op["pad"]) + op["bias"]
+        elif op["kind"] == "mean":
+            x = x.mean(axis=1)
+        elif op["kind"] == "dense":
+            x = x @ op["kernel"] + op["bias"]
+        elif op["kind"] == "affine":
+            x = x * op["scale"] + op["shift"]
+        if op.get("activation") == "relu":
+            x = np.maximum(x, 0)
+        elif op.get("activation") == "softmax":
+            x = np.exp(x - x.max(axis=-1, keepdims=True))
+            x = x / x.sum(axis=-1, keepdims=True)
+    return x
+
+# ----------------------------------------------------
+# 2. 匯出
+# ----------------------------------------------------
+def export_tflite(ops, path, quantize="float", calibration=None):
+    """
+    quantize: float | dynamic (權重 int8) | float16 (權重 float16) | int8 (權重與激活皆 int8，以 calibration 校正)
+    輸入 / 輸出維持 float32，執行端不需改變。
+    """
+    import tensorflow as tf
+
+    def forward(x):
+        for op in ops:
+            if op["kind"] == "conv":
+                x = tf.pad(x, [[0, 0], list(op["pad"]), [0, 0]])
+                x = tf.nn.conv1d(x, op["kernel"], stride=1, padding="VALID", dilations=op["dilation"]) + op["bias"]
+            elif op["kind"] == "mean":
+                x = tf.reduce_mean(x, axis=1)
+            elif op["kind"] == "dense":
+                x = tf.matmul(x, op["kernel"]) + op["bias"]
+            elif op["kind"] == "affine":
+                x = x * op["scale"] + op["shift"]
+            if op.get("activation") == "relu":
+                x = tf.nn.relu(x)
+            elif op.get("activation") == "softmax":
+                x = tf.nn.softmax(x, axis=-1)
+        return x
+
+    function = tf.function(forward, input_signature=[tf.TensorSpec([None, MAX_SEQ_LENGTH, POSE_DIMENSION], tf.float32)])
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([function.get_concrete_function()])
+    if quantize != "float":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        converter.representative_dataset = lambda: ([sample[None]] for sample in calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+
+def export_onnx(ops, path, opset=17):
+    import onnx
+    from onnx import helper, numpy_helper, TensorProto
+
+    nodes, initializers = [], []
+    def const(name, value):
+        initializers.append(numpy_helper.from_array(np.asarray(value, dtype=np.float32), name))
+        return name
+
+    # ONNX Conv 為 (B, C, T)
+    nodes.append(helper.make_node("Transpose", ["input"], ["x0"], perm=[0, 2, 1]))
+    x, channels_first = "x0", True
+    for i, op in enumerate(ops):
+        out = f"x{i + 1}"
+        if op["kind"] == "conv":
+            kernel = const(f"conv{i}_w", op["kernel"].transpose(2, 1, 0)) # (Cout, Cin, K)
+            bias = op["bias"].T if op["bias"].ndim == 2 else op["bias"][:, None] # (Cout, T) / (Cout, 1)
+            nodes.append(helper.make_node("Conv", [x, kernel], [out + "_c"], pads=list(op["pad"]),
+                                          dilations=[op["dilation"]], kernel_shape=[op["kernel"].shape[0]]))
+            nodes.append(helper.make_node("Add", [out + "_c", const(f"conv{i}_b", bias)], [out + "_a"]))
+        elif op["kind"] == "mean":
+            nodes.append(helper.make_node("ReduceMean", [x], [out + "_a"], axes=[2], keepdims=0))
+            channels_first = False
+        elif op["kind"] == "dense":
+            nodes.append(helper.make_node("Gemm", [x, const(f"dense{i}_w", op["kernel"]), const(f"dense{i}_b", op["bias"])],
+                                          [out + "_a"]))
+        elif op["kind"] == "affine":
+            shape = (-1, 1) if channels_first else (-1,)
+            nodes.append(helper.make_node("Mul", [x, const(f"affine{i}_s", op["scale"].reshape(shape))], [out + "_m"]))
+            nodes.append(helper.make_node("Add", [out + "_m", const(f"affine{i}_b", op["shift"].reshape(shape))], [out + "_a"]))
+        activation = op.get("activation", "linear")
+        if activation == "relu":
+            nodes.append(helper.make_node("Relu", [out + "_a"], [out]))
+        elif activation == "softmax":
+            nodes.append(helper.make_node("Softmax", [out + "_a"], [out], axis=-1))
+        else:
+            nodes.append(helper.make_node("Identity", [out + "_a"], [out]))
+        x = out
+    nodes.append(helper.make_node("Identity", [x], ["probabilities"]))
+
+    graph = helper.make_graph(
+        nodes, "v9_tcn",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch", MAX_SEQ_LENGTH, POSE_DIMENSION])],
+        [helper.make_tensor_value_info("probabilities", TensorProto.FLOAT, ["batch", len(CLASS_NAMES)])],
+        initializers,
+    )
+    onnx_model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", opset)])
+    onnx.checker.check_model(onnx_model)
+    onnx.save(onnx_model, path)
+
+
+EXPORTERS = {
+    "tflite": export_tflite,
+    "onnx": export_onnx,
+}
+
+# 匯出 + 驗證各格式需要的套件 (模組名稱 → pip 套件名稱)
+EXPORT_PACKAGES = {
+    "tflite": {"tensorflow": "tensorflow"},
+    "onnx": {"onnx": "onnx", "onnxruntime": "onnxruntime"},
+}
+
+
+def missing_packages(fmt):
+    """回傳該格式缺少的 pip 套件名稱"""
+    return [package for module, package in EXPORT_PACKAGES[fmt].items() if importlib.util.find_spec(module) is None]
+
+# ----------------------------------------------------
+# 3. 一致性檢查用的特徵
+# ----------------------------------------------------
+def load_feature_arrays(paths, random_count, seed=0):
+    """讀取 .npy / 特徵快取 .npz (目錄則讀其中所有檔案)；皆無時產生隨機 (T, 636) 序列"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.npy")) + glob.glob(os.path.join(path, "*.npz")))
+        elif os.path.exists(path):
+            files.append(path)
+
+    sequences = []
+    for path in files:
+        if path.endswith(".npz"):
+            with np.load(path, allow_pickle=False) as data:
+                features = data["features"]
+        else:
+            features = np.load(path, allow_pickle=False)
+        if features.ndim == 2 and features.shape[0] > 0 and features.shape[1] == POSE_DIMENSION:
+            sequences.append(features.astype(np.float32))
+    print(f"特徵檔: {len(sequences)} 筆 (讀取 {len(files)} 個檔案)")
+
+    if not sequences:
+        rng = np.random.default_rng(seed)
+        sequences = [rng.normal(size=(rng.integers(5, MAX_SEQ_LENGTH * 2), POSE_DIMENSION)).astype(np.float32)
+                     for _ in range(random_count)]
+        print(f"沒有可用的特徵檔，改用 {random_count} 筆隨機序列")
+    return sequences
+
+
+def pad_batch(sequences):
+    """與 model_infer 相同: 超過 40 格保留最後 40 格，不足時在後面補 0"""
+    return pad_feature_batch(sequences)
+
+
+def stand_in_model(seed=0):
+    """model_v9.txt 的 TCN 架構 + 隨機權重；BN 統計值也隨機化，才能驗證折疊"""
+    from tensorflow import keras
+    from tensorflow.keras import layers
+    model = keras.Sequential([
+        keras.Input((MAX_SEQ_LENGTH, POSE_DIMENSION)),
+        layers.Masking(mask_value=0.0),
+        layers.SpatialDropout1D(0.2),
+        layers.Conv1D(128, 5, padding="causal", activation="relu"),
+        layers.BatchNormalization(),
+        layers.Dropout(0.3),
+        layers.Conv1D(256, 5, padding="causal", activation="relu"),
+        layers.BatchNormalization(),
+        layers.Dropout(0.3),
+        layers.GlobalAveragePooling1D(),
+        layers.Dense(128, activation="relu"),
+        layers.Dropout(0.4),
+        layers.Dense(len(CLASS_NAMES), activation="softmax"),
+    ])
+    rng = np.random.default_rng(seed)
+    for layer in model.layers:
+        if isinstance(layer, layers.BatchNormalization):
+            n = layer.get_weights()[0].shape[0]
+            layer.set_weights([rng.uniform(0.5, 1.5, n), rng.normal(0, 0.1, n), rng.normal(0, 0.5, n), rng.uniform(0.5, 2, n)])
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 TCN 匯出 (TFLite / ONNX) + 一致性檢查")
+    parser.add_argument("--format", nargs="+", choices=list(EXPORTERS), default=None,
+                        help="預設: 所需套件已安裝的格式")
+    parser.add_argument("--model", default=MODEL_PATHS["keras"])
+    parser.add_argument("--features", nargs="*", default=[os.path.join(FEATURE_CACHE_DIR, "features")])
+    parser.add_argument("--random", type=int, default=64, help="沒有特徵檔時的隨機序列數")
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--stand-in", action="store_true")
+    parser.add_argument("--output-dir", default=None, help="預設與 MODEL_PATHS 相同 (模型檔旁)")
+    parser.add_argument("--quantize", nargs="*", choices=["dynamic", "float16", "int8"], default=[])
+    args = parser.parse_args()
+
+    missing = {fmt: missing_packages(fmt) for fmt in (args.format or EXPORTERS)}
+    if args.format is None:
+        args.format = [fmt for fmt, packages in missing.items() if not packages]
+        for fmt, packages in missing.items():
+            if packages: print(f"⚠️ 略過 {fmt}: 未安裝 {', '.join(packages)} (pip install {' '.join(packages)})")
+    elif any(missing.values()):
+        for fmt, packages in missing.items():
+            if packages: print(f"❌ {fmt}: 未安裝 {', '.join(packages)} (pip install {' '.join(packages)})")
+        sys.exit(1)
+    if not args.format and not args.quantize:
+        sys.exit("❌ 沒有可匯出的格式 (所需套件皆未安裝)")
+
+    if args.stand_in:
+        keras_model = stand_in_model()
+    else:
+        keras_model = load_runner("keras", args.model).model
+
+    batch = pad_batch(load_feature_arrays(args.features, args.random))
+    reference = keras_model.predict(batch, verbose=0)
+
+    ops = fold_model(keras_model)
+    folded_diff = float(np.max(np.abs(run_folded(ops, batch) - reference)))
+    print(f"折疊後運算: {[op['kind'] for op in ops]}，NumPy 對照最大絕對差 {folded_diff:.2e}")
+    ok = folded_diff <= args.atol
+
+    for fmt in args.format:
+        path = MODEL_PATHS[fmt] if args.output_dir is None else os.path.join(args.output_dir, os.path.basename(MODEL_PATHS[fmt]))
+        try:
+            EXPORTERS[fmt](ops, path)
+            outputs = load_runner(fmt, path).predict(batch)
+        except ImportError as e:
+            print(f"❌ {fmt}: 缺少套件 ({e})")
+            ok = False
+            continue
+        max_diff = float(np.max(np.abs(outputs - reference)))
+        agree = float(np.mean(outputs.argmax(axis=1) == reference.argmax(axis=1)))
+        print(f"{fmt:6s} → {path} ({os.path.getsize(path) / 1024:.0f} KB)  最大絕對差 {max_diff:.2e}  Top-1 一致 {agree:.1%}")
+        ok = ok and max_diff <= args.atol and agree == 1.0
+
+    # 量化版本只回報差異，是否可用由 tools/eval_quantized.py 的一致率門檻決定
+    for variant in args.quantize:
+        path = model_path("tflite", variant)
+        if args.output_dir is not None: path = os.path.join(args.output_dir, os.path.basename(path))
+        export_tflite(ops, path, variant, calibration=batch)
+        outputs = load_runner("tflite", path).predict(batch)
+        agree = float(np.mean(outputs.argmax(axis=1) == reference.argmax(axis=1)))
+        print(f"{variant:7s} → {path} ({os.path.getsize(path) / 1024:.0f} KB)  "
+              f"最大絕對差 {float(np.max(np.abs(outputs - reference))):.2e}  Top-1 一致 {agree:.1%}")
+
+    print("✅ 一致" if ok else "❌ 不一致")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
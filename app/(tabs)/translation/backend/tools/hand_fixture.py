@@ -0,0 +1,61 @@
+# //Soul/app/(tabs)/translation/backend/tools/hand_fixture.py
+# (v9 - 一致性檢查用的測試影片: 以 repo 內的手語示範圖產生有手部動作的短片)
+#
+# 用法: python tools/hand_fixture.py 輸出路徑.mp4 [--fps 25] [--seconds 4] [--width 640 --height 480]
+# temp_videos/video.mp4 偵測不到手部，拿來做一致性檢查時特徵兩邊都是 None，atol 比較根本沒有執行。
+# 此處把 assets/images/translate-demo.png (右手舉在額頭旁) 平移 / 縮放 / 小角度旋轉成連續畫面，
+# 每格 Holistic 都偵測得到右手，像素 / SSIM 過濾後仍保留足夠的格數。其他檢查工具以 make_hand_clip() 產生預設影片。
+
+import os
+import sys
+import math
+import argparse
+
+import cv2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(BACKEND_DIR))))
+SOURCE_IMAGE = os.path.join(REPO_DIR, "assets", "images", "translate-demo.png")
+ANCHOR = (0.35, 0.2) # 手部在原圖中的大約位置 (比例)，作為旋轉 / 縮放中心並放在畫面中央偏上
+
+
+def make_hand_clip(out_path, fps=25.0, seconds=4.0, size=(640, 480), source=SOURCE_IMAGE):
+    """寫出 mp4 (mp4v) 並回傳格數；鏡頭以一個週期左右平移、縮放，手部旋轉兩個來回"""
+    image = cv2.imread(source)
+    if image is None:
+        raise FileNotFoundError(f"找不到測試影片的來源圖片: {source}")
+    width, height = size
+    count = max(2, int(round(fps * seconds)))
+    anchor_x, anchor_y = image.shape[1] * ANCHOR[0], image.shape[0] * ANCHOR[1]
+
+    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    if not writer.isOpened():
+        raise RuntimeError(f"無法寫入測試影片: {out_path}")
+    try:
+        for i in range(count):
+            t = i / (count - 1)
+            scale = height / image.shape[0] * (1.6 + 0.3 * math.sin(2 * math.pi * t))
+            matrix = cv2.getRotationMatrix2D((anchor_x, anchor_y), 8 * math.sin(4 * math.pi * t), scale)
+            matrix[0, 2] += width * 0.5 - anchor_x + 60 * math.sin(2 * math.pi * t)
+            matrix[1, 2] += height * 0.35 - anchor_y
+            writer.write(cv2.warpAffine(image, matrix, size, borderMode=cv2.BORDER_REPLICATE))
+    finally:
+        writer.release()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產生有手部動作的 v9 測試影片")
+    parser.add_argument("output")
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    count = make_hand_clip(args.output, args.fps, args.seconds, (args.width, args.height))
+    print(f"✅ 已產生 {args.output} ({count} 格，{args.fps:g} FPS)")
+
+
+if __name__ == "__main__":
+    main()
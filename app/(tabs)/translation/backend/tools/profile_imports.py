@@ -0,0 +1,102 @@
+# //Soul/app/(tabs)/translation/backend/tools/profile_imports.py
+# (v9 - 啟動匯入耗時: python -X importtime 報告 + 重量級模組不可在匯入 main 時載入)
+#
+# 用法: python tools/profile_imports.py [--module main] [--top 15] [--max-seconds 2.0]
+#                                      [--forbid tensorflow keras mediapipe skimage] [--json 報告.json]
+# 在新的子行程中匯入 --module (預設 main)，列出最耗時的套件 (self 時間加總) 與 main 直接匯入的模組 (累計時間)。
+# --forbid 的模組出現在匯入清單中 (應延遲到背景暖機才導入)，或總耗時超過 --max-seconds 時以狀態碼 1 結束。
+# 另外核對 feature_loader.HAND_CONNECTIONS 與 mediapipe 的定義一致 (寫死常數以免為此導入 mediapipe)。
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+DEFAULT_FORBID = ["tensorflow", "keras", "mediapipe", "skimage", "ffmpeg"]
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile(module):
+    """回傳 [(self 微秒, 累計微秒, 深度, 模組名稱)]"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=BACKEND_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"❌ 匯入 {module} 失敗:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            entries.append((int(match[1]), int(match[2]), (len(match[3]) - 1) // 2, match[4]))
+    return entries
+
+
+def check_hand_connections():
+    """None = 一致；否則回傳錯誤訊息"""
+    from feature_loader import HAND_CONNECTIONS
+    try:
+        import mediapipe as mp
+    except ImportError:
+        return None
+    if set(HAND_CONNECTIONS) != set(mp.solutions.hands.HAND_CONNECTIONS):
+        return "feature_loader.HAND_CONNECTIONS 與 mediapipe 的 HAND_CONNECTIONS 不一致"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v9 啟動匯入耗時")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-seconds", type=float, default=None, help="匯入總耗時上限 (秒)")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBID, help="匯入時不得載入的模組")
+    parser.add_argument("--json", default=None, help="另存報告 JSON")
+    args = parser.parse_args()
+
+    entries = profile(args.module)
+    total = next(cumulative for _, cumulative, depth, name in entries if depth == 0 and name == args.module) / 1e6
+    by_package = Counter()
+    for self_us, _, _, name in entries:
+        by_package[name.split(".")[0]] += self_us
+    direct = sorted(((cumulative, name) for _, cumulative, depth, name in entries if depth == 1), reverse=True)
+
+    print(f"⏱️ import {args.module}: {total:.2f} s ({len(entries)} 個模組)")
+    print(f"\n套件 (self 時間加總) 前 {args.top}:")
+    for name, self_us in by_package.most_common(args.top):
+        print(f"  {self_us / 1e6:7.3f} s  {name}")
+    print(f"\n{args.module} 直接匯入 (累計) 前 {args.top}:")
+    for cumulative, name in direct[:args.top]:
+        print(f"  {cumulative / 1e6:7.3f} s  {name}")
+
+    imported = {name.split(".")[0] for _, _, _, name in entries}
+    loaded = [name for name in args.forbid if name in imported]
+    errors = [f"匯入 {args.module} 時載入了 {', '.join(loaded)} (應延遲導入)"] if loaded else []
+    if args.max_seconds is not None and total > args.max_seconds:
+        errors.append(f"匯入耗時 {total:.2f} s 超過上限 {args.max_seconds:.2f} s")
+    constants_error = check_hand_connections()
+    if constants_error: errors.append(constants_error)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "total_seconds": round(total, 4),
+                "packages": {name: round(us / 1e6, 4) for name, us in by_package.most_common()},
+                "direct": {name: round(us / 1e6, 4) for us, name in direct},
+                "forbidden_loaded": loaded,
+            }, f, ensure_ascii=False, indent=2)
+
+    print()
+    for error in errors:
+        print(f"❌ {error}")
+    if not errors:
+        print(f"✅ 未載入 {', '.join(args.forbid)}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# //Soul/app/(tabs)/translation/backend/url_cache.py
+# (v9 - /translate-by-url 的 URL 結果快取: TTL + ETag / Last-Modified 條件式重新驗證，行程內 + 可選的共用磁碟儲存)
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+
+import httpx
+
+from downloader import open_http_client
+
+# ----------------------------------------------------
+# 1. 設定 (環境變數)
+# ----------------------------------------------------
+URL_CACHE = os.getenv("URL_CACHE", "on")                           # on | off
+URL_CACHE_TTL = float(os.getenv("URL_CACHE_TTL", 3600))            # 驗證後多久內不再連線確認 (秒)
+URL_CACHE_MAX_ENTRIES = int(os.getenv("URL_CACHE_MAX_ENTRIES", 1024))
+URL_CACHE_DIR = os.getenv("URL_CACHE_DIR", "")                     # 設定後多個 uvicorn worker 共用命中 (空字串 = 只用行程內)
+REVALIDATE_TIMEOUT = float(os.getenv("URL_CACHE_REVALIDATE_TIMEOUT", 5))
+
+# ----------------------------------------------------
+# 2. 儲存 (行程內 LRU / 磁碟 JSON)
+# ----------------------------------------------------
+class MemoryStore:
+    """行程內 LRU (OrderedDict)"""
+
+    def __init__(self, max_entries=URL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None: self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url, entry):
+        with self._lock:
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, url):
+        with self._lock:
+            self._entries.pop(url, None)
+
+
+class DiskStore:
+    """<目錄>/<sha256(url)>.json；寫入先寫暫存檔再 os.replace，超過 max_entries 時刪除 mtime 最舊者"""
+
+    def __init__(self, directory, max_entries=URL_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def put(self, url, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+        self._prune()
+
+    def delete(self, url):
+        try:
+            os.remove(self._path(url))
+        except OSError:
+            pass
+
+    def _prune(self):
+        with os.scandir(self.directory) as it:
+            files = [(entry.stat().st_mtime, entry.path) for entry in it if entry.name.endswith(".json")]
+        for _, path in sorted(files)[:max(0, len(files) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# ----------------------------------------------------
+# 3. URL 結果快取
+# ----------------------------------------------------
+class UrlCache:
+    """
+    以 URL 為鍵保存 Top-3 與下載時的 ETag / Last-Modified。
+    - 上次驗證後 ttl 秒內: 直接命中，不連線
+    - 超過 ttl: 以 HEAD + If-None-Match / If-Modified-Since 重新驗證，304 (或驗證標頭未變) 即命中
+    - 管線或模型雜湊不同、驗證失敗、無驗證標頭且已過期: 視為未命中，重新下載
+    """
+
+    def __init__(self, ttl=URL_CACHE_TTL, directory=URL_CACHE_DIR, max_entries=URL_CACHE_MAX_ENTRIES,
+                 enabled=URL_CACHE == "on"):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.stores = [MemoryStore(max_entries)]
+        if directory:
+            self.stores.append(DiskStore(directory, max_entries))
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "revalidated": 0, "misses": 0, "stale": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _load(self, url):
+        for i, store in enumerate(self.stores):
+            entry = store.get(url)
+            if entry is not None:
+                if i > 0: self.stores[0].put(url, entry) # 磁碟命中回填行程內
+                return entry
+        return None
+
+    def _save(self, url, entry):
+        for store in self.stores:
+            store.put(url, entry)
+
+    def _drop(self, url):
+        for store in self.stores:
+            store.delete(url)
+
+    async def _revalidate(self, url, entry):
+        """條件式 HEAD；回傳來源是否未變更"""
+        headers = {}
+        if entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+        if not headers: return False
+        try:
+            r = await open_http_client().head(url, headers=headers, timeout=REVALIDATE_TIMEOUT)
+        except httpx.HTTPError as e:
+            print(f"⚠️ URL 快取重新驗證失敗: {e}")
+            return False
+        if r.status_code == 304:
+            return True
+        if r.status_code != 200:
+            return False
+        # 部分來源忽略 HEAD 的條件標頭，改比對驗證標頭本身
+        etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+        if entry.get("etag") and etag:
+            return etag == entry["etag"]
+        return bool(entry.get("last_modified")) and last_modified == entry["last_modified"]
+
+    async def lookup(self, url, pipeline, model_hash):
+        """回傳快取的 Top-3，或 None (需下載並推論)"""
+        if not self.enabled: return None
+        entry = await asyncio.to_thread(self._load, url) # 💥 磁碟讀寫不在 event loop 執行緒進行
+        if entry is None or entry.get("pipeline") != pipeline or entry.get("model_hash") != model_hash:
+            self._count("misses")
+            return None
+
+        if time.time() - entry["validated_at"] < self.ttl:
+            self._count("hits")
+            return entry["top3"]
+
+        if await self._revalidate(url, entry):
+            entry["validated_at"] = time.time()
+            await asyncio.to_thread(self._save, url, entry)
+            self._count("revalidated")
+            return entry["top3"]
+
+        await asyncio.to_thread(self._drop, url)
+        self._count("stale")
+        return None
+
+    def store(self, url, download_info, pipeline, model_hash, top3):
+        """下載 + 推論成功後寫入 (推論錯誤或模型未載入的結果不快取)；會寫磁碟，async 路由中以 asyncio.to_thread 呼叫"""
+        if not self.enabled or model_hash is None: return
+        if not top3 or "error" in top3[0] or top3[0].get("label") == "模型尚未載入": return
+        now = time.time()
+        self._save(url, {
+            "url": url,
+            "etag": download_info.etag,
+            "last_modified": download_info.last_modified,
+            "pipeline": pipeline,
+            "model_hash": model_hash,
+            "top3": top3,
+            "stored_at": now,
+            "validated_at": now,
+        })
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters["enabled"] = self.enabled
+        counters["shared"] = len(self.stores) > 1
+        return counters
+
+
+url_cache = UrlCache()
@@ -0,0 +1,284 @@
+# //Soul/app/(tabs)/translation/backend/video_source.py
+# (v9 - 影格來源: cv2 直接解碼 + 依時間戳取樣，或 ffmpeg 管線輸出 raw BGR 影格)
+
+import os
+import struct
+import cv2
+import numpy as np
+
+import metrics
+
+# 💥 v9 訓練影片為 30 FPS，固定每 3 格取 1 (10 Hz)
+TARGET_FPS = 30
+SAMPLE_RATE = 3
+
+# 取樣規則版本 (特徵快取鍵的一部分)；挑選的影格改變時遞增 (FEATURE_PIPELINE_VERSION 綁定模型，不隨之變動)
+SAMPLER_VERSION = "s2"
+
+# grab: 只 retrieve 被取樣的影格 (預設)；read: 逐格 read()，以下一格時間戳推算時長 (VFR 完全對齊 ffmpeg)
+CAPTURE_DECODE = os.getenv("CAPTURE_DECODE", "grab")
+
+
+class VideoOpenError(Exception):
+    """無法開啟 / 解碼影片檔 (與「偵測不到手部」區分: 不寫入特徵快取，回應 400)"""
+
+
+# ----------------------------------------------------
+# 1. MP4/MOV 起始偏移 (edit list)
+# ----------------------------------------------------
+def _iter_boxes(f, start, end):
+    """列出 [start, end) 範圍內的 MP4 box: (type, 內容起點, 結尾)"""
+    boxes = []
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8: break
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size: break
+        boxes.append((box_type, offset + header_size, offset + size))
+        offset += size
+    return boxes
+
+def _find_box(f, start, end, box_type):
+    return next(((s, e) for t, s, e in _iter_boxes(f, start, end) if t == box_type), None)
+
+def _leading_empty_edit(f, trak, movie_timescale):
+    """影像/音訊軌 edit list 開頭的空白 (media_time == -1) 長度 (秒)"""
+    edts = _find_box(f, *trak, b"edts")
+    elst = _find_box(f, *edts, b"elst") if edts else None
+    if elst is None: return 0.0
+    f.seek(elst[0])
+    version = f.read(1)[0]
+    f.read(3)
+    entry_count = struct.unpack(">I", f.read(4))[0]
+    empty = 0
+    for _ in range(entry_count):
+        if version == 1:
+            segment_duration, media_time = struct.unpack(">Qq", f.read(16))
+        else:
+            segment_duration, media_time = struct.unpack(">Ii", f.read(8))
+        f.read(4) # media_rate
+        if media_time != -1: break
+        empty += segment_duration
+    return empty / movie_timescale
+
+def _handler_type(f, trak):
+    mdia = _find_box(f, *trak, b"mdia")
+    hdlr = _find_box(f, *mdia, b"hdlr") if mdia else None
+    if hdlr is None: return None
+    f.seek(hdlr[0] + 8)
+    return f.read(4)
+
+def video_start_offset(video_path):
+    """
+    手機錄影的 MP4 常在影像軌前放一段空白 edit (例如音訊先開始)。
+    ffmpeg 轉檔以整個檔案的起點為 0，cv2 的 CAP_PROP_POS_MSEC 則以影像軌第一格為 0；
+    回傳兩者之差 (秒)，讓時間戳取樣與 30fps 轉檔路徑對齊。非 MP4/MOV 或無法解析時回傳 0。
+    """
+    try:
+        with open(video_path, "rb") as f:
+            f.seek(0, 2)
+            moov = _find_box(f, 0, f.tell(), b"moov")
+            if moov is None: return 0.0
+            boxes = _iter_boxes(f, *moov)
+            mvhd = next(((s, e) for t, s, e in boxes if t == b"mvhd"), None)
+            if mvhd is None: return 0.0
+            f.seek(mvhd[0])
+            version = f.read(1)[0]
+            f.seek(mvhd[0] + (20 if version == 1 else 12))
+            movie_timescale = struct.unpack(">I", f.read(4))[0]
+            if movie_timescale == 0: return 0.0
+
+            video_start, track_starts = None, []
+            for box_type, s, e in boxes:
+                if box_type != b"trak": continue
+                start = _leading_empty_edit(f, (s, e), movie_timescale)
+                track_starts.append(start)
+                if video_start is None and _handler_type(f, (s, e)) == b"vide":
+                    video_start = start
+            if video_start is None: return 0.0
+            return max(video_start - min(track_starts), 0.0)
+    except (OSError, struct.error, IndexError, TypeError):
+        return 0.0
+
+# ----------------------------------------------------
+# 2. cv2 解碼 + 依時間戳取樣 (不需轉檔)
+# ----------------------------------------------------
+def iter_capture_frames(video_path):
+    """以 cv2.VideoCapture 逐格讀取影片檔，產生 (frame, 呈現時間秒數)"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise VideoOpenError(f"cv2.VideoCapture 無法開啟 {video_path}")
+    start_offset = video_start_offset(video_path)
+    try:
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret: break
+            yield frame, start_offset + cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+    finally:
+        cap.release()
+
+class FrameSampler:
+    """
+    依呈現時間挑選影格，結果等同「ffmpeg -r 30 (cfr) 轉檔後每 sample_rate 格取 1」，
+    但不需要轉檔。沿用 ffmpeg cfr 的丟格/補格規則 (|delta| > 1.1 格才丟或補)。
+    """
+
+    def __init__(self, target_fps=TARGET_FPS, sample_rate=SAMPLE_RATE):
+        self.target_fps = target_fps
+        self.sample_rate = sample_rate
+        self.next_pts = 0   # 下一個 target_fps 輸出格的編號
+
+    def step(self, ts, duration):
+        """
+        ts: 本格呈現時間 (秒)；duration: 本格時長 (以 target_fps 格為單位)。
+        回傳 (上一格被取樣的次數, 本格被取樣的次數)；上一格僅在 VFR 空檔補格時出現。
+        """
+        # 💥 ffmpeg 以有理數時間戳計算，24 → 30 FPS 等會剛好落在 .5 (四捨五入到偶數)；
+        # 浮點時間戳相減會變成 1.4999... 而進位方向不同，因此先去掉微小誤差
+        delta0 = round(ts * self.target_fps - self.next_pts, 6)
+        delta = round(delta0 + duration, 6)
+        if delta0 < 0 and delta > 0:
+            delta0 = 0.0
+        nb_frames, nb_prev = 1, 0
+        if delta < -1.1:
+            nb_frames = 0
+        elif delta > 1.1:
+            nb_frames = round(delta)
+            if delta0 > 1.1:
+                nb_prev = round(delta0 - 0.6)
+
+        prev_hits = curr_hits = 0
+        for i in range(nb_frames):
+            if self.next_pts % self.sample_rate == 0:
+                if i < nb_prev: prev_hits += 1
+                else: curr_hits += 1
+            self.next_pts += 1
+        return prev_hits, curr_hits
+
+def iter_time_sampled_frames(timed_frames, fps=None, target_fps=TARGET_FPS, sample_rate=SAMPLE_RATE):
+    """
+    以 FrameSampler 從 (frame, 秒) 迭代器中挑出 10 Hz 影格。
+    fps: 來源影格率；提供時每格時長固定為 1/fps，否則以下一格的時間戳推算 (VFR，與 ffmpeg 完全一致)
+    """
+    sampler = FrameSampler(target_fps, sample_rate)
+    last_frame = None
+    read = 0
+
+    def emit(frame, ts, duration):
+        nonlocal last_frame
+        prev_hits, curr_hits = sampler.step(ts, duration)
+        for _ in range(prev_hits):
+            yield last_frame if last_frame is not None else frame
+        for _ in range(curr_hits):
+            yield frame
+        last_frame = frame
+
+    pending = None
+    prev_duration = 1.0
+    try:
+        for frame, ts in timed_frames:
+            read += 1
+            if fps:
+                yield from emit(frame, ts, target_fps / fps)
+                continue
+            if pending is not None:
+                prev_duration = max(ts - pending[1], 0.0) * target_fps
+                yield from emit(pending[0], pending[1], prev_duration)
+            pending = (frame, ts)
+        if pending is not None:
+            yield from emit(pending[0], pending[1], prev_duration)
+    finally:
+        metrics.count("frames_read", read)
+
+def iter_capture_sampled_frames(video_path, target_fps=TARGET_FPS, sample_rate=SAMPLE_RATE):
+    """
+    grab() 逐格前進，只對被取樣的影格 retrieve() (省下丟棄影格的色彩轉換與複製)。
+    取樣前無法得知下一格的時間戳，每格時長以容器的平均 FPS 估計；
+    CFR 影片與 iter_time_sampled_frames 結果相同，VFR 影片可能差一格。
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise VideoOpenError(f"cv2.VideoCapture 無法開啟 {video_path}")
+    start_offset = video_start_offset(video_path)
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or target_fps
+    duration = target_fps / source_fps
+    sampler = FrameSampler(target_fps, sample_rate)
+    last_frame = None   # 上一格 (僅在上一格有 retrieve 時保留)
+    read = 0
+    try:
+        while cap.grab():
+            read += 1
+            ts = start_offset + cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            prev_hits, curr_hits = sampler.step(ts, duration)
+            if prev_hits + curr_hits == 0:
+                last_frame = None
+                continue
+            ret, frame = cap.retrieve()
+            if not ret: break
+            for _ in range(prev_hits):
+                yield last_frame if last_frame is not None else frame
+            for _ in range(curr_hits):
+                yield frame
+            last_frame = frame
+    finally:
+        cap.release()
+        metrics.count("frames_read", read)
+
+def iter_sampled_frames(video_path=None, frames=None, fps=None, timestamps=None, decode=CAPTURE_DECODE):
+    """
+    特徵提取器的統一入口: 產生 10 Hz 的取樣影格。
+    未提供 frames 時解碼 video_path (decode: grab | read)；
+    提供 frames 時搭配 timestamps 或 fps，兩者皆無則視為已是 30 FPS。
+    """
+    if frames is None:
+        if decode == "grab":
+            return iter_capture_sampled_frames(video_path)
+        return iter_time_sampled_frames(iter_capture_frames(video_path))
+    if timestamps is not None:
+        return iter_time_sampled_frames(zip(frames, timestamps), fps=fps)
+    fps = fps or TARGET_FPS
+    return iter_time_sampled_frames(((frame, i / fps) for i, frame in enumerate(frames)), fps=fps)
+
+# ----------------------------------------------------
+# 3. ffmpeg 管線 (VIDEO_DECODER=ffmpeg)
+# ----------------------------------------------------
+def iter_ffmpeg_frames(video_path, width, height, fps=TARGET_FPS):
+    """
+    以 ffmpeg 解碼 video_path，重採樣為 fps 並縮放為 width x height，
+    逐格產生 (height, width, 3) uint8 BGR 影格。
+    不會產生中間 mp4 檔 (取代舊的 30fps_<uuid>.mp4 轉檔)。
+    """
+    import ffmpeg # 💥 延遲導入: 只有 VIDEO_DECODER=ffmpeg 才需要
+    frame_size = width * height * 3
+    process = (
+        ffmpeg
+        .input(video_path)
+        .filter("fps", fps=fps)
+        .filter("scale", width, height, flags="bilinear")
+        .output("pipe:", format="rawvideo", pix_fmt="bgr24")
+        .global_args("-loglevel", "error")
+        .run_async(pipe_stdout=True)
+    )
+    count = 0
+    try:
+        while True:
+            buffer = process.stdout.read(frame_size)
+            if len(buffer) < frame_size:
+                break
+            count += 1
+            yield np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+        if count == 0 and process.wait() != 0:
+            raise VideoOpenError(f"ffmpeg 無法解碼 {video_path}")
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
@@ -1,12 +1,25 @@
 # translation_server.py
 # 專門用於啟動 FastAPI 翻譯服務 (不使用 ngrok)
 # 適合：Render/Railway 等雲端平台部署
+#
+# 💥 正式環境模式 (不使用 --reload，開發時自動重載請用 dev_server.py):
+# - 主行程先匯入 TensorFlow / MediaPipe / OpenCV 與後端模組，再 fork 出 WEB_CONCURRENCY 個 worker 共用同一個 socket；
+#   每個 worker 不必再花數秒匯入，匯入後的記憶體頁也以 copy-on-write 共用。
+# - 模型與 Holistic 圖在 fork 之後才由各 worker 載入: TensorFlow / MediaPipe 執行過運算後會建立執行緒池，
+#   fork 出的子行程沒有這些執行緒，第一次推論就會卡住 (v9 模型本身只有數 MB，載入 + 暖機不到 1 秒)。
+# - SIGTERM / SIGINT: 轉送給所有 worker，各自停止接受新連線、等待進行中的請求 (最多 GRACEFUL_TIMEOUT 秒) 後結束。
+# - worker 異常結束時自動補上；不支援 fork 的平台 (Windows) 或 WEB_CONCURRENCY=1 時以單一行程執行。
 
-import subprocess
-import sys
-from pathlib import Path
 import os
+import sys
+import time
+import glob
+import shutil
 import signal
+import socket
+import tempfile
+import traceback
+from pathlib import Path
 
 # 設定路徑
 BASE_DIR = Path(__file__).resolve().parent
@@ -14,57 +27,167 @@ FASTAPI_DIR = BASE_DIR / "app" / "(tabs)" / "translation" / "backend"
 
 # 服務設定
 FASTAPI_APP = "main:app"
+FASTAPI_HOST = os.getenv("HOST", "0.0.0.0")  # 使用 0.0.0.0 讓服務可以被外部訪問
 FASTAPI_PORT = int(os.getenv("PORT", 8000))  # 使用環境變數或預設 8000
+CPU_COUNT = os.cpu_count() or 1
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 0)) or CPU_COUNT   # worker 行程數 (預設 = CPU 核心數)
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", 30))         # 收到 SIGTERM 後等待進行中請求的秒數
+# fork 前匯入，不載入模型 (後端模組本身延遲導入 TensorFlow / MediaPipe，因此在此明確列出)
+# 💥 MODEL_BACKEND=tflite / onnx 不需要 TensorFlow: 部署環境可以不安裝 (見 README)，此時不預先匯入
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "keras")
+PRELOAD_MODULES = (("tensorflow", "keras") if MODEL_BACKEND == "keras" else ()) + ("mediapipe", "model_infer")
+
+# 💥 每個 worker 分到的核心數: 後端的執行緒預設都以 os.cpu_count() 計算，N 個 worker 會超額使用 CPU。
+# 必須在匯入後端模組前設定 (模組在匯入時讀取環境變數)；已明確設定的值不覆寫。
+PER_WORKER_THREADS = max(1, CPU_COUNT // WEB_CONCURRENCY)
+for name in ("INFER_WORKERS", "TF_INTRA_OP_THREADS", "RUNTIME_THREADS"):
+    os.environ.setdefault(name, str(PER_WORKER_THREADS))
+
+# 💥 /metrics 合併所有 worker: 各 worker 把數值寫到共用目錄 (未指定時建立暫存目錄，結束時刪除)
+METRICS_DIR_CREATED = WEB_CONCURRENCY > 1 and not os.getenv("METRICS_MULTIPROC_DIR")
+if METRICS_DIR_CREATED:
+    os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="v9-metrics-")
 
 print("🐍 FastAPI Translation Server")
 print("=" * 50)
 print(f"📂 工作目錄: {FASTAPI_DIR}")
 print(f"🔌 Port: {FASTAPI_PORT}")
+print(f"👷 Workers: {WEB_CONCURRENCY} (每個 worker {PER_WORKER_THREADS} 核心)")
 print("=" * 50)
 
-def start_fastapi():
-    """啟動 FastAPI 服務"""
+def open_socket():
+    """主行程建立監聽 socket，所有 worker 共用 (由核心分配連線)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((FASTAPI_HOST, FASTAPI_PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def preload():
+    """fork 前匯入後端模組 (不執行任何 TensorFlow 運算，也不建立執行緒)"""
     os.chdir(FASTAPI_DIR)
+    sys.path.insert(0, str(FASTAPI_DIR))
     print(f"📂 切換目錄到：{FASTAPI_DIR}")
-    print(f"🚀 啟動 FastAPI server (Port {FASTAPI_PORT})...")
-
-    python_path = sys.executable
-    
-    # 使用 0.0.0.0 讓服務可以被外部訪問
-    proc = subprocess.Popen([
-        python_path, "-m", "uvicorn", FASTAPI_APP,
-        "--port", str(FASTAPI_PORT),
-        "--host", "0.0.0.0",
-        "--reload"  # 開發時自動重載
-    ])
-    return proc
-
-# 啟動服務
-print("🔄 啟動 FastAPI 服務...")
-fastapi_proc = start_fastapi()
-
-print("\n" + "=" * 60)
-print("🎉 FastAPI 服務已啟動！")
-print("=" * 60)
-print(f"📱 本地訪問: http://localhost:{FASTAPI_PORT}")
-print(f"📱 API 文檔: http://localhost:{FASTAPI_PORT}/docs")
-print(f"🌐 網路訪問: http://0.0.0.0:{FASTAPI_PORT}")
-print("=" * 60)
-print("💡 這個腳本不使用 ngrok，適合雲端平台部署")
-print("💡 如需測試，請使用 dev_server.py")
-print("按 Ctrl+C 停止服務")
-print("=" * 60)
-
-try:
-    # 等待服務運行
-    fastapi_proc.wait()
-except KeyboardInterrupt:
-    print("\n🛑 正在停止服務...")
-    
+    start = time.time()
+    for module in PRELOAD_MODULES:
+        __import__(module)
+    print(f"✅ 已預先匯入 {', '.join(PRELOAD_MODULES)} ({time.time() - start:.1f} s)")
+
+def run_worker(sock):
+    """單一 worker: uvicorn 在 SIGTERM / SIGINT 時停止接受連線，等待進行中請求後執行 shutdown 事件"""
+    import uvicorn
+    from main import app
+    config = uvicorn.Config(app, timeout_graceful_shutdown=GRACEFUL_TIMEOUT)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def spawn_worker(sock):
+    sys.stdout.flush() # 避免未輸出的緩衝區被複製到子行程後重複印出
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            run_worker(sock)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    print(f"🚀 worker {pid} 已啟動")
+    return pid
+
+# ----------------------------------------------------
+# 主行程: 監管 worker 與優雅關閉
+# ----------------------------------------------------
+stopping = False
+
+def request_stop(signum, frame):
+    global stopping
+    if not stopping:
+        print(f"\n🛑 收到 {signal.Signals(signum).name}，等待進行中的請求完成 (最多 {GRACEFUL_TIMEOUT:.0f} 秒)...")
+    stopping = True
+
+def reap(workers):
+    """回收已結束的 worker；回傳 [(pid, 結束碼)]"""
+    exited = []
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0: break
+        if pid in workers:
+            workers.discard(pid)
+            exited.append((pid, os.waitstatus_to_exitcode(status)))
+    return exited
+
+def supervise(sock):
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    workers = {spawn_worker(sock) for _ in range(WEB_CONCURRENCY)}
+
+    while not stopping:
+        for pid, code in reap(workers):
+            print(f"⚠️ worker {pid} 意外結束 (結束碼 {code})，重新啟動...")
+            time.sleep(1) # 避免啟動即失敗時無限快速重啟
+            workers.add(spawn_worker(sock))
+        time.sleep(0.5)
+
+    # 💥 優雅關閉: worker 各自排空請求；超過期限仍未結束則強制終止
+    sock.close()
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.time() + GRACEFUL_TIMEOUT + 5
+    while workers and time.time() < deadline:
+        for pid, code in reap(workers):
+            print(f"✅ worker {pid} 已停止 (結束碼 {code})")
+        time.sleep(0.2)
+    for pid in workers:
+        print(f"⚠️ worker {pid} 未在期限內結束，強制終止")
+        os.kill(pid, signal.SIGKILL)
+    reap(workers)
+
+def reset_metrics_dir():
+    """清掉上次執行留下的 worker 指標檔 (counter 從 0 開始)"""
+    metrics_dir = os.getenv("METRICS_MULTIPROC_DIR")
+    if not metrics_dir: return
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "metrics_*.json*")):
+        os.remove(path)
+    print(f"📊 /metrics 合併目錄: {metrics_dir}")
+
+def main():
+    sock = open_socket()
+    reset_metrics_dir()
+    preload()
+
+    print("\n" + "=" * 60)
+    print("🎉 FastAPI 服務啟動中！")
+    print("=" * 60)
+    print(f"📱 本地訪問: http://localhost:{FASTAPI_PORT}")
+    print(f"📱 API 文檔: http://localhost:{FASTAPI_PORT}/docs")
+    print(f"🌐 網路訪問: http://{FASTAPI_HOST}:{FASTAPI_PORT}")
+    print("=" * 60)
+    print("💡 這個腳本不使用 ngrok，也不自動重載，適合雲端平台部署")
+    print("💡 如需測試，請使用 dev_server.py")
+    print("按 Ctrl+C 停止服務")
+    print("=" * 60)
+
     try:
-        fastapi_proc.terminate()
-        print("✅ FastAPI 已停止")
-    except:
-        pass
-    
+        if WEB_CONCURRENCY == 1 or not hasattr(os, "fork"):
+            run_worker(sock) # 單一行程 (uvicorn 自行處理 SIGTERM / Ctrl+C)
+        else:
+            supervise(sock)
+    finally:
+        if METRICS_DIR_CREATED:
+            shutil.rmtree(os.environ["METRICS_MULTIPROC_DIR"], ignore_errors=True)
     print("🎯 服務已停止")
+
+if __name__ == "__main__":
+    main()